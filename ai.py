@@ -0,0 +1,215 @@
+"""
+A computer player that thinks ahead, instead of picking moves at random.
+
+Pyokemon.random_move is easy to beat. ExpectimaxAI looks at every move it
+could make, every move the other side might make, and everything the dice
+could do -- who goes first, whether each attack hits, how much damage it
+does -- and picks the move that gives it the best chance of winning on
+average. That's called expectimax: we take the *max* over our own choices
+and the *expected* (average) value over everything we don't control.
+
+Looking ahead gets expensive fast, so:
+
+* Iterative deepening: first we look one round ahead, then two, then
+  three, until we run out of time. We always have an answer from the last
+  search that finished.
+* A transposition table: the same situation (both HPs and all the PP) comes
+  up again and again down different paths, so we remember what each one was
+  worth and don't work it out twice.
+* When we stop looking ahead, we guess how good things look from how many
+  rounds each side needs to knock the other out.
+
+The odds for each attack are the exact ones from solver.py.
+"""
+from time import perf_counter
+
+import pyokemans as pk
+import solver
+
+# A PP this big can't run out within any search we have time for, so PPs
+# are capped at this when packed into a state key (see ExpectimaxAI._key).
+_PP_CAP = 0xFFFF
+
+
+class _OutOfTime(Exception):
+    pass
+
+
+class ExpectimaxAI(object):
+    """
+    Picks moves by expectimax. One ExpectimaxAI can play any number of
+    battles; it remembers what it worked out for as long as the same two
+    pyokemon are fighting.
+
+    :param time_budget: Seconds to think about each move. None means no limit,
+        which makes the AI's choices the same every time.
+    :param max_depth: The most rounds to look ahead.
+    :param table_size: How many situations to remember before starting afresh.
+    """
+    def __init__(self, time_budget=0.05, max_depth=20, table_size=500000):
+        self.time_budget = time_budget
+        self.max_depth = max_depth
+        self.table_size = table_size
+        self.table = {}
+        self._matchup = None
+        # How many situations the last choose() looked at (including the ones
+        # it only guessed at), and how many rounds ahead it got.
+        self.nodes = 0
+        self.depth = 0
+
+    def choose(self, me, opponent, first=None):
+        """
+        Returns the move (one of me.moves, or pk.Struggle) that gives me the
+        best chance of beating opponent.
+
+        :param first: The chance that me attacks first in a round. By
+            default we assume me is the second pyokemon passed to
+            engine.fight_round, like the wild pyokemon in game.wild_battle.
+        """
+        if first is None:
+            first = 1 - solver.first_chance(opponent.speed, me.speed)
+        self._prepare(me, opponent, first)
+        state = (me.hp, opponent.hp, tuple(m.pp for m in me.moves), tuple(m.pp for m in opponent.moves))
+
+        self.nodes = 0
+        self._deadline = None
+        best = None
+        for depth in range(1, self.max_depth + 1):
+            try:
+                _, best = self._value(*state, depth)
+            except _OutOfTime:
+                break
+            self.depth = depth
+            # The first search always finishes; after that we keep an eye on the clock.
+            if self.time_budget is not None:
+                self._deadline = self._started + self.time_budget
+        return pk.Struggle if best < 0 else me.moves[best]
+
+    def _prepare(self, me, opponent, first):
+        self._started = perf_counter()
+        matchup = (me.attack, me.defense, me.speed, me.type_id, tuple(m.definition for m in me.moves),
+                   opponent.attack, opponent.defense, opponent.speed, opponent.type_id,
+                   tuple(m.definition for m in opponent.moves), first)
+        if matchup == self._matchup:
+            return
+        # A different fight: what we remembered about the old one is no use.
+        self._matchup = matchup
+        self.table = {}
+        self._first = first
+        mine = [(m.power, m.type_id) for m in me.moves] + [(pk.Struggle.power, pk.Struggle.type_id)]
+        theirs = [(m.power, m.type_id) for m in opponent.moves] + [(pk.Struggle.power, pk.Struggle.type_id)]
+        # _mine[slot] is ((damage, probability), ...) for me using that move,
+        # misses included. Slot -1 (the last one) is Struggle.
+        self._mine = [_outcomes(me, opponent, power, move_type) for power, move_type in mine]
+        self._theirs = [_outcomes(opponent, me, power, move_type) for power, move_type in theirs]
+        self._my_mean = [sum(d * p for d, p in o) for o in self._mine]
+        self._their_mean = [sum(d * p for d, p in o) for o in self._theirs]
+
+    @staticmethod
+    def _key(my_hp, their_hp, my_pps, their_pps):
+        # Packs the whole situation into one int, 16 bits per number.
+        # Ints make quick dictionary keys, and take less room than tuples.
+        key = my_hp << 16 | their_hp
+        for pp in my_pps + their_pps:
+            key = key << 16 | min(pp, _PP_CAP)
+        return key
+
+    def _guess(self, my_hp, their_hp, my_pps, their_pps):
+        """
+        How good things look, between 0 and 1, without looking any further:
+        compares how many rounds each side needs to knock the other out with
+        its best move on average.
+        """
+        mine = max([self._my_mean[s] for s, pp in enumerate(my_pps) if pp > 0] or [self._my_mean[-1]])
+        theirs = max([self._their_mean[s] for s, pp in enumerate(their_pps) if pp > 0] or [self._their_mean[-1]])
+        if mine == 0:
+            return 0.0 if theirs else 0.5
+        if theirs == 0:
+            return 1.0
+        my_rounds = their_hp / mine
+        their_rounds = my_hp / theirs
+        return their_rounds / (my_rounds + their_rounds)
+
+    def _value(self, my_hp, their_hp, my_pps, their_pps, depth):
+        """
+        Returns (chance of winning, best move slot) at the start of a round,
+        looking depth rounds ahead. Slot -1 means Struggle.
+        """
+        key = self._key(my_hp, their_hp, my_pps, their_pps)
+        known = self.table.get(key)
+        if known is not None and known[0] >= depth:
+            return known[1], known[2]
+
+        self.nodes += 1
+        if self._deadline is not None and perf_counter() > self._deadline:
+            raise _OutOfTime()
+
+        mine = [s for s, pp in enumerate(my_pps) if pp > 0] or [-1]
+        theirs = [s for s, pp in enumerate(their_pps) if pp > 0] or [-1]
+        first = self._first
+        best, best_slot = -1.0, mine[0]
+        for slot in mine:
+            my_after = _use(my_pps, slot)
+            total = 0.0
+            for their_slot in theirs:
+                their_after = _use(their_pps, their_slot)
+                total += (first * self._me_first(my_hp, their_hp, my_after, their_after, slot, their_slot, depth) +
+                          (1 - first) * self._them_first(my_hp, their_hp, my_after, their_after, slot, their_slot, depth))
+            total /= len(theirs)
+            if total > best:
+                best, best_slot = total, slot
+
+        if len(self.table) >= self.table_size:
+            self.table = {}
+        self.table[key] = (depth, best, best_slot)
+        return best, best_slot
+
+    def _next(self, my_hp, their_hp, my_pps, their_pps, depth):
+        # The value of the next round, or our guess if we can't look that far.
+        if depth == 1:
+            self.nodes += 1
+            return self._guess(my_hp, their_hp, my_pps, their_pps)
+        return self._value(my_hp, their_hp, my_pps, their_pps, depth - 1)[0]
+
+    def _me_first(self, my_hp, their_hp, my_pps, their_pps, slot, their_slot, depth):
+        value = 0.0
+        for damage, p in self._mine[slot]:
+            left = their_hp - damage
+            if left <= 0:
+                # They fainted before they could hit back: we won.
+                value += p
+                continue
+            for their_damage, q in self._theirs[their_slot]:
+                if their_damage < my_hp:
+                    value += p * q * self._next(my_hp - their_damage, left, my_pps, their_pps, depth)
+        return value
+
+    def _them_first(self, my_hp, their_hp, my_pps, their_pps, slot, their_slot, depth):
+        value = 0.0
+        for their_damage, q in self._theirs[their_slot]:
+            left = my_hp - their_damage
+            if left <= 0:
+                # We fainted before we could hit back: we lost.
+                continue
+            for damage, p in self._mine[slot]:
+                if damage >= their_hp:
+                    value += q * p
+                else:
+                    value += q * p * self._next(left, their_hp - damage, my_pps, their_pps, depth)
+        return value
+
+
+def _use(pps, slot):
+    """The PPs after using the move in slot. Struggle (-1) doesn't use any."""
+    if slot < 0:
+        return pps
+    return pps[:slot] + (pps[slot] - 1,) + pps[slot + 1:]
+
+
+def _outcomes(attacker, defender, power, move_type):
+    """((damage, probability), ...) for one attack, misses included, like engine.attack."""
+    table = pk.type_table()
+    multiplier = table.multipliers[(move_type * table.size + attacker.type_id) * table.size + defender.type_id]
+    miss = solver.miss_chance(attacker.speed, defender.speed)
+    hits = solver.hit_damage(attacker.attack, power, multiplier, defender.defense)
+    return ((0, miss),) + tuple((damage, (1 - miss) * p) for damage, p in hits)
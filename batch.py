@@ -0,0 +1,222 @@
+"""
+Fight lots of battles at once with NumPy.
+
+engine.battle fights one battle at a time, one Python object at a time.
+That's fine for playing, but if you want to know "how often does a level 7
+Pikachu beat a level 4 Squirtle?" you need hundreds of thousands of battles,
+and Python loops over objects get slow.
+
+The trick here is to turn the problem sideways. Instead of N Pyokemon
+objects, each with an hp, an attack, and so on, we keep one array of N hp
+values, one array of N attack values, and so on. Every turn, NumPy updates
+all N battles in one go. The rules are the same as engine.attack and
+engine.fight_round:
+
+* each side picks a random move with PP left (or Struggle),
+* a speed roll of randint(0, 10) + speed decides who goes first,
+* an attack misses if expovariate(defender.speed / attacker.speed) is under
+  rules.active.miss_threshold,
+* damage is ceil((randint(floor(attack/2), attack) + power) * (multiplier / defense)).
+
+This module needs NumPy (pip install numpy); the rest of the game doesn't.
+"""
+import random
+
+import numpy as np
+
+import engine
+import pyokemans as pk
+import rules
+
+# Most pyokemon know two moves; nobody can know more than five.
+MAX_MOVES = 5
+
+
+def multiplier_table():
+    """
+    Returns pk.type_table() as a 3D array of damage multipliers, indexed by
+    [move type ID, attacker type ID, defender type ID], with the same-type
+    bonus already added in.
+    """
+    table = pk.type_table()
+    n = table.size
+    return np.array(table.multipliers).reshape(n, n, n)
+
+
+class Side(object):
+    """
+    One side of N battles, stored as arrays. Row i of every array is the
+    pyokemon fighting in battle i.
+    """
+    def __init__(self, pkmns):
+        n = len(pkmns)
+        self.hp = np.array([p.hp for p in pkmns], dtype=np.int64)
+        self.attack = np.array([p.attack for p in pkmns], dtype=np.int64)
+        self.defense = np.array([p.defense for p in pkmns], dtype=np.int64)
+        self.speed = np.array([p.speed for p in pkmns], dtype=np.int64)
+        self.pktype = np.array([p.type_id for p in pkmns], dtype=np.int64)
+        # Empty move slots have no PP, so they are never chosen.
+        self.power = np.zeros((n, MAX_MOVES), dtype=np.int64)
+        self.movetype = np.zeros((n, MAX_MOVES), dtype=np.int64)
+        self.pp = np.zeros((n, MAX_MOVES), dtype=np.int64)
+        for row, p in enumerate(pkmns):
+            for slot, move in enumerate(p.moves):
+                self.power[row, slot] = move.power
+                self.movetype[row, slot] = move.type_id
+                self.pp[row, slot] = move.pp
+
+    @classmethod
+    def repeat(cls, pkmn, n):
+        """A side where all N battles are fought by copies of the same pyokemon."""
+        side = cls([pkmn])
+        for name in ('hp', 'attack', 'defense', 'speed', 'pktype', 'power', 'movetype', 'pp'):
+            value = getattr(side, name)
+            setattr(side, name, np.repeat(value, n, axis=0))
+        return side
+
+    @classmethod
+    def concatenate(cls, sides):
+        """Glues several sides together into one bigger side."""
+        side = cls([])
+        for name in ('hp', 'attack', 'defense', 'speed', 'pktype', 'power', 'movetype', 'pp'):
+            setattr(side, name, np.concatenate([getattr(s, name) for s in sides]))
+        return side
+
+    def __len__(self):
+        return len(self.hp)
+
+    def choose(self, idx, rng):
+        """
+        Picks a random move slot with PP left for each battle in idx, like
+        Pyokemon.random_move. Returns -1 for battles that have to Struggle.
+        """
+        available = self.pp[idx] > 0
+        count = available.sum(axis=1)
+        # Pick the r-th available slot, where r is uniform over 0..count-1.
+        r = np.floor(rng.random(len(idx)) * count)
+        slot = np.argmax(np.cumsum(available, axis=1) > r[:, None], axis=1)
+        return np.where(count > 0, slot, -1)
+
+
+def _attack(att, dfn, idx, slot, table, struggle, rng):
+    """Every battle in idx has att attack dfn with the move in slot. Returns a mask of who fainted."""
+    if len(idx) == 0:
+        return np.zeros(0, dtype=bool)
+    known = slot >= 0
+    safe = np.where(known, slot, 0)
+    power = np.where(known, att.power[idx, safe], struggle[0])
+    movetype = np.where(known, att.movetype[idx, safe], struggle[1])
+    # Reduce the move's PP by one.
+    att.pp[idx[known], slot[known]] -= 1
+
+    # NumPy's exponential takes a scale, which is 1 / lambda.
+    missed = rng.exponential(att.speed[idx] / dfn.speed[idx]) < rules.active.miss_threshold
+    multiplier = table[movetype, att.pktype[idx], dfn.pktype[idx]]
+    roll = rng.integers(att.attack[idx] // 2, att.attack[idx] + 1)
+    damage = np.ceil((roll + power) * (multiplier / dfn.defense[idx])).astype(np.int64)
+    damage[missed] = 0
+    dfn.hp[idx] = np.maximum(dfn.hp[idx] - damage, 0)
+    return dfn.hp[idx] == 0
+
+
+def simulate(a, b, seed=None, max_turns=10000):
+    """
+    Fights battle i between a[i] and b[i] for every i, until one side faints.
+    a and b are Sides of the same length, and get changed in place.
+
+    Returns (winner, turns): winner[i] is 0 if a won, 1 if b won, or -1
+    if nobody fainted within max_turns; turns[i] is the number of rounds fought.
+    """
+    rng = np.random.default_rng(seed)
+    table = multiplier_table()
+    struggle = (pk.Struggle.power, pk.Struggle.type_id)
+    n = len(a)
+    winner = np.full(n, -1, dtype=np.int64)
+    turns = np.zeros(n, dtype=np.int64)
+    active = np.arange(n)
+
+    for turn in range(1, max_turns + 1):
+        if len(active) == 0:
+            break
+        turns[active] = turn
+        a_slot = a.choose(active, rng)
+        b_slot = b.choose(active, rng)
+        # Random integer between 0 and 10 plus their speed; ties go to b.
+        a_first = (rng.integers(0, 11, len(active)) + a.speed[active] >
+                   rng.integers(0, 11, len(active)) + b.speed[active])
+
+        # Whoever is faster attacks first...
+        first_a, first_b = active[a_first], active[~a_first]
+        b_fainted = _attack(a, b, first_a, a_slot[a_first], table, struggle, rng)
+        a_fainted = _attack(b, a, first_b, b_slot[~a_first], table, struggle, rng)
+        winner[first_a[b_fainted]] = 0
+        winner[first_b[a_fainted]] = 1
+
+        # ...and the other one hits back if they are still standing.
+        back_b = ~b_fainted
+        back_a = ~a_fainted
+        a_fainted = _attack(b, a, first_a[back_b], b_slot[a_first][back_b], table, struggle, rng)
+        b_fainted = _attack(a, b, first_b[back_a], a_slot[~a_first][back_a], table, struggle, rng)
+        winner[first_a[back_b][a_fainted]] = 1
+        winner[first_b[back_a][b_fainted]] = 0
+
+        active = active[winner[active] == -1]
+
+    return winner, turns
+
+
+def win_rate(pkmn_a, pkmn_b, n=100000, seed=None):
+    """
+    Fights n copies of pkmn_a against n copies of pkmn_b and returns the
+    fraction that pkmn_a won. The pyokemon themselves are not changed.
+    """
+    winner, _ = simulate(Side.repeat(pkmn_a, n), Side.repeat(pkmn_b, n), seed=seed)
+    return np.mean(winner == 0)
+
+
+def win_rates(species, levels, n=10000, seed=None):
+    """
+    Fights every (species, level) against every other (species, level),
+    n times each, all in one big batch.
+
+    Returns a dict mapping ((species_a, level_a), (species_b, level_b)) to
+    the fraction of battles the first one won.
+    """
+    entries = [(s, level) for s in species for level in levels]
+    protos = {entry: entry[0](entry[1]) for entry in entries}
+    pairs = [(x, y) for x in entries for y in entries]
+    a = Side.concatenate([Side.repeat(protos[x], n) for x, _ in pairs])
+    b = Side.concatenate([Side.repeat(protos[y], n) for _, y in pairs])
+    winner, _ = simulate(a, b, seed=seed)
+    wins = (winner == 0).reshape(len(pairs), n).mean(axis=1)
+    return {((x[0].__name__, x[1]), (y[0].__name__, y[1])): rate
+            for (x, y), rate in zip(pairs, wins)}
+
+
+def scalar_win_rate(species_a, level_a, species_b, level_b, n=10000, seed=None):
+    """
+    The slow way: fights n battles one at a time with engine.battle, for
+    checking the batch simulator against.
+    """
+    rng = random.Random(seed)
+    wins = 0
+    for _ in range(n):
+        a, b = species_a(level_a), species_b(level_b)
+        rounds = engine.battle(a, b, rng=rng)
+        if rounds[-1].fainter is b:
+            wins += 1
+    return wins / n
+
+
+if __name__ == '__main__':
+    # Compare the two simulators on a few matchups. With n battles each, the
+    # rates should agree to within a few standard errors of sqrt(p(1-p)/n).
+    n = 20000
+    for sa, la, sb, lb in [(pk.Charmander, 5, pk.Bulbasaur, 5),
+                           (pk.Squirtle, 3, pk.Pikachu, 3),
+                           (pk.Pidgey, 10, pk.Diglett, 8)]:
+        fast = win_rate(sa(la), sb(lb), n=n, seed=1)
+        slow = scalar_win_rate(sa, la, sb, lb, n=n, seed=1)
+        stderr = (2 * slow * (1 - slow) / n) ** 0.5
+        print("{} {} vs {} {}: batch {:.4f}, scalar {:.4f} ({:+.1f} standard errors)"
+              .format(sa.__name__, la, sb.__name__, lb, fast, slow, (fast - slow) / max(stderr, 1e-9)))
@@ -0,0 +1,112 @@
+"""
+Record a game as a seed and a list of answers, and play it back later.
+
+If you know which generator rolled the dice, what seed it started from, and
+what the player typed at every prompt, you know everything that happened in
+a game. That's a lot smaller than a transcript of everything that was
+printed, and it can be played back exactly without asking anybody anything:
+
+    import battlelog, game
+    result, log = battlelog.record(game.wild_battle, me)
+    ...
+    battlelog.replay(log, game.wild_battle, me_as_it_was_before)
+
+Replaying only gives the same game if everything starts out the same as it
+did the first time -- same trainer, same pyokemon, same HP.
+"""
+import json
+import os
+from collections import namedtuple
+
+import rng as rngs
+from presenters import Presenter
+
+# kind is the name of the generator (see rng.KINDS), seed is what it was
+# seeded with, and choices is every answer the player gave, in order.
+BattleLog = namedtuple("BattleLog", ["kind", "seed", "choices"])
+
+
+class Recorder(object):
+    """
+    Wraps a presenter and writes down every answer it gives. Everything
+    other than ask() is passed straight through to the wrapped presenter.
+    """
+    def __init__(self, inner):
+        self.inner = inner
+        self.choices = []
+
+    def ask(self, prompt):
+        answer = self.inner.ask(prompt)
+        self.choices.append(answer)
+        return answer
+
+    def __getattr__(self, name):
+        # Only called for attributes we don't have ourselves, so this sends
+        # say(), attacked() and everything else on to the inner presenter.
+        return getattr(self.inner, name)
+
+
+class Player(object):
+    """
+    Wraps a presenter and answers questions from a list instead of asking it.
+    Everything other than ask() is passed straight through.
+    """
+    def __init__(self, inner, choices):
+        self.inner = inner
+        self.choices = list(choices)
+        self.asked = 0
+
+    def ask(self, prompt):
+        if self.asked >= len(self.choices):
+            raise EOFError("The log has no answer for: {}. "
+                           "Did the game start out the same way?".format(prompt))
+        answer = self.choices[self.asked]
+        self.asked += 1
+        return answer
+
+    def __getattr__(self, name):
+        return getattr(self.inner, name)
+
+
+def record(play, *args, seed=None, kind='counter', presenter=None, **kwargs):
+    """
+    Calls play(*args, presenter=..., rng=..., **kwargs) -- for example
+    game.wild_battle -- and writes down the seed and every answer given.
+
+    Returns (whatever play returned, BattleLog).
+
+    :param seed: The seed to use. None picks one at random.
+    :param kind: Which kind of generator to use (see rng.KINDS).
+    :param presenter: The presenter to play with. Defaults to game.presenter.
+    """
+    if seed is None:
+        seed = int.from_bytes(os.urandom(8), 'big')
+    if presenter is None:
+        import game
+        presenter = game.presenter
+    recorder = Recorder(presenter)
+    result = play(*args, presenter=recorder, rng=rngs.make(kind, seed), **kwargs)
+    return result, BattleLog(kind, seed, recorder.choices)
+
+
+def replay(log, play, *args, presenter=None, **kwargs):
+    """
+    Plays a BattleLog back through play(*args, ...), without asking for any
+    input. Pass a presenter (like presenters.TextPresenter()) to watch it
+    happen; by default nothing is shown.
+
+    Returns whatever play returned.
+    """
+    player = Player(Presenter() if presenter is None else presenter, log.choices)
+    return play(*args, presenter=player, rng=rngs.make(log.kind, log.seed), **kwargs)
+
+
+def dumps(log):
+    """Turns a BattleLog into a short string of JSON."""
+    return json.dumps([log.kind, log.seed, log.choices], separators=(',', ':'))
+
+
+def loads(text):
+    """Turns a string from dumps() back into a BattleLog."""
+    kind, seed, choices = json.loads(text)
+    return BattleLog(kind, seed, choices)
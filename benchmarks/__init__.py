@@ -0,0 +1,5 @@
+"""
+Benchmarks for the game. Run them from the top of the repository, like:
+
+    python -m benchmarks.memory
+"""
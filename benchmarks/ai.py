@@ -0,0 +1,71 @@
+"""
+How fast does ai.ExpectimaxAI think, and does thinking help?
+
+Fights wild battles between a random-move trainer pyokemon and a wild
+pyokemon whose moves are picked by ExpectimaxAI, for a few different time
+budgets. For each budget it reports how long a decision took, how many
+situations per second the search looked at, how far ahead it got, and how
+often the AI won. For comparison, the "random" row is solver.py's exact
+chance of the wild pyokemon winning when it picks at random too.
+
+    python -m benchmarks.ai [battles] [budget in ms ...]
+"""
+import random
+import sys
+import time
+
+import engine
+import pyokemans as pk
+import solver
+from ai import ExpectimaxAI
+
+TRAINER_SPECIES = [pk.Charmander, pk.Squirtle, pk.Bulbasaur]
+WILD_SPECIES = [pk.Diglett, pk.Pidgey, pk.Pikachu]
+
+
+def matchups(battles, seed=0):
+    r = random.Random(seed)
+    return [(r.choice(TRAINER_SPECIES), r.randint(2, 10), r.choice(WILD_SPECIES), r.randint(2, 10))
+            for _ in range(battles)]
+
+
+def fight(ai, trainer_pkmn, wild_pkmn, rng, latencies, nodes, depths):
+    """Fights until someone faints. Returns True if the wild pyokemon (and so the AI) won."""
+    while True:
+        started = time.perf_counter()
+        move = ai.choose(wild_pkmn, trainer_pkmn)
+        elapsed = time.perf_counter() - started
+        latencies.append(elapsed)
+        nodes.append((ai.nodes, elapsed))
+        depths.append(ai.depth)
+        fainter = engine.fight_round(trainer_pkmn, wild_pkmn, p2move=move, rng=rng).fainter
+        if fainter:
+            return fainter is trainer_pkmn
+
+
+def percentile(ordered, p):
+    return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+
+def main(battles=200, *budgets):
+    budgets = [b / 1000 for b in budgets] or [0.001, 0.01, 0.05]
+    games = matchups(battles)
+    baseline = sum(solver.odds(b(lb), a(la)).p1_wins for a, la, b, lb in games) / battles
+    print("{:>9} {:>9} {:>9} {:>9} {:>12} {:>7} {:>7}".format(
+        "budget", "p50 ms", "p99 ms", "max ms", "nodes/s", "depth", "wins"))
+    print("{:>9} {:>9} {:>9} {:>9} {:>12} {:>7} {:>7.3f}".format("random", "", "", "", "", "", baseline))
+    for budget in budgets:
+        ai = ExpectimaxAI(time_budget=budget)
+        rng = random.Random(1)
+        latencies, nodes, depths = [], [], []
+        wins = sum(fight(ai, a(la), b(lb), rng, latencies, nodes, depths) for a, la, b, lb in games)
+        latencies.sort()
+        print("{:>9} {:>9.2f} {:>9.2f} {:>9.2f} {:>12.0f} {:>7.1f} {:>7.3f}".format(
+            "{:g} ms".format(1000 * budget),
+            *[1000 * percentile(latencies, p) for p in (50, 99, 100)],
+            sum(n for n, _ in nodes) / sum(t for _, t in nodes),
+            sum(depths) / len(depths), wins / battles))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,98 @@
+"""
+Does cluster.py cope when workers misbehave, and what does it cost?
+
+Everything runs on localhost:
+
+* a tournament fought by cluster.run with a few workers, against the same
+  matches fought one after another with tournament.fight,
+* the same tournament with two workers that go wrong: one is killed
+  (SIGKILL) as soon as it's been given a batch, and one takes a batch and
+  then never answers. The coordinator has to give their batches to somebody
+  else: the killed one's straight away, and the silent one's once the queue
+  runs dry and somebody steals it.
+
+Both have to come out exactly the same as fighting the matches locally, and
+the killed worker's batch has to have been given out again.
+
+    python -m benchmarks.cluster [workers] [repeats]
+"""
+import asyncio
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import time
+
+import cluster
+import tournament
+
+
+def silent_worker(host, port):
+    """Asks for a batch, then never answers."""
+    sock = socket.create_connection((host, port))
+    sock.sendall(cluster.FRAME.pack(cluster.READY, 0))
+    time.sleep(3600)
+
+
+def doomed_worker(host, port):
+    """Asks for a batch, and is killed as soon as it has one."""
+    sock = socket.create_connection((host, port))
+    sock.sendall(cluster.FRAME.pack(cluster.READY, 0))
+    _, size = cluster.FRAME.unpack(cluster._receive(sock, cluster.FRAME.size))
+    cluster._receive(sock, size)
+    os.kill(os.getpid(), signal.SIGKILL)
+
+
+def troubled(matches, workers, timeout):
+    coordinator = cluster.Coordinator(matches, batch_size=64, timeout=timeout)
+
+    async def main():
+        server = await coordinator.serve('127.0.0.1', 0)
+        address = server.sockets[0].getsockname()[:2]
+        silent = multiprocessing.Process(target=silent_worker, args=address)
+        silent.start()
+        doomed = multiprocessing.Process(target=doomed_worker, args=address)
+        doomed.start()
+        # Only start the others once it's dead, so it can't be beaten to
+        # its batch.
+        await asyncio.get_running_loop().run_in_executor(None, doomed.join)
+        processes = [multiprocessing.Process(target=cluster.work, args=address) for _ in range(workers)]
+        for process in processes:
+            process.start()
+        async with server:
+            await coordinator.wait()
+        silent.kill()
+        return processes
+
+    for process in asyncio.run(main()):
+        process.join()
+    return coordinator
+
+
+def main(workers=4, repeats=100):
+    matches = list(tournament.schedule(levels=(2, 5, 10, 20), repeats=repeats))
+    started = time.perf_counter()
+    expected = [tournament.fight(match) for match in matches]
+    local = time.perf_counter() - started
+    print("{:,} matches, one after another: {:,.0f} matches/s".format(len(matches), len(matches) / local))
+    print("{} bytes per match sent, {} bytes per result back".format(cluster.SPEC.size, cluster.OUTCOME.size))
+
+    started = time.perf_counter()
+    coordinator = cluster.run(matches, workers=workers)
+    seconds = time.perf_counter() - started
+    print("{} workers: {:,.0f} matches/s, {} stolen, results {}".format(
+        workers, len(matches) / seconds, coordinator.stolen,
+        "the same" if coordinator.results == expected else "DIFFERENT"))
+
+    started = time.perf_counter()
+    coordinator = troubled(matches, workers, timeout=5)
+    print("one killed, one silent: {:.1f}s, {} given out again, {} stolen, results {}".format(
+        time.perf_counter() - started, coordinator.requeued, coordinator.stolen,
+        "the same" if coordinator.results == expected else "DIFFERENT"))
+    assert coordinator.requeued >= 1, "The killed worker's batch was never given out again"
+    assert coordinator.results == expected, "Results differ from fighting the matches locally"
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,71 @@
+"""
+Is looking damage up in damage.py's tables quicker than doing the sums?
+
+Times working out the damage for a few thousand hits: the old way (roll with
+randint, then add, multiply, divide and round), the way engine.attack does
+it now (the same, rolling with randrange), by table lookup (DamageTable.roll,
+written out) and by DamageTable.sample's alias table. The attacks are
+drawn from real pyokemon at levels 2 to 30, so most of them share tables.
+The ways take turns, and we keep the best of several repeats, so a busy
+machine doesn't favour one of them.
+
+    python -m benchmarks.damage [hits]
+"""
+import random
+import sys
+import timeit
+from math import ceil, floor
+
+import damage
+import pyokemans as pk
+
+SPECIES = [pk.Charmander, pk.Squirtle, pk.Bulbasaur, pk.Diglett, pk.Pidgey, pk.Pikachu]
+
+
+def hits(n, seed=0):
+    """(attack, power, multiplier, defense) for n hits between random pyokemon."""
+    r = random.Random(seed)
+    table = pk.type_table()
+    found = []
+    for _ in range(n):
+        attacker = r.choice(SPECIES)(r.randint(2, 30))
+        defender = r.choice(SPECIES)(r.randint(2, 30))
+        move = r.choice(attacker.moves)
+        multiplier = table.multipliers[(move.type_id * table.size + attacker.type_id) * table.size + defender.type_id]
+        found.append((attacker.attack, move.power, multiplier, defender.defense))
+    return found
+
+
+def main(n=5000):
+    cases = hits(n)
+    rng = random.Random(1)
+
+    def sums():
+        for attack, power, multiplier, defense in cases:
+            ceil((rng.randint(floor(attack/2), attack) + power) * (multiplier / defense))
+
+    def randrange_sums():
+        for attack, power, multiplier, defense in cases:
+            low = attack // 2
+            ceil((low + rng.randrange(attack - low + 1) + power) * (multiplier / defense))
+
+    def lookup():
+        for attack, power, multiplier, defense in cases:
+            by_roll = damage.damage_table(attack, power, multiplier, defense).by_roll
+            by_roll[rng.randrange(len(by_roll))]
+
+    def alias():
+        for attack, power, multiplier, defense in cases:
+            damage.damage_table(attack, power, multiplier, defense).sample(rng)
+
+    best = {}
+    for _ in range(7):
+        for name, run in [("sums", sums), ("randrange", randrange_sums), ("lookup", lookup), ("alias", alias)]:
+            best[name] = min(best.get(name, float('inf')), timeit.timeit(run, number=1))
+    for name, seconds in best.items():
+        print("{:<10} {:>14,.0f} hits/s {:>+8.1%}".format(name, n / seconds, best["sums"] / seconds - 1))
+    print(damage.cache_info())
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
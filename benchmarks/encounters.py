@@ -0,0 +1,90 @@
+"""
+Does recycling wild pyokemon (encounters.EncounterPool) pay off?
+
+Compares making every wild pyokemon from scratch, the way game.wild_battle
+used to, with drawing them from a pool and releasing them afterwards. For
+each we report:
+
+* encounters per second, for getting a wild pyokemon and letting it go,
+  and for whole wild battles (the player fights with their first move),
+* how many new pyokemon each encounter cost,
+* how many bytes of new pyokemon and moves each encounter allocated. To
+  measure that we hold on to every wild pyokemon until the end, so freshly
+  made ones add up while recycled ones are counted once.
+
+    python -m benchmarks.encounters [encounters]
+"""
+import contextlib
+import gc
+import io
+import random
+import sys
+import time
+import tracemalloc
+
+import game
+import pyokemans as pk
+from encounters import EncounterPool
+from benchmarks.suite import _Scripted
+
+TRAINER_SPECIES = [pk.Charmander, pk.Squirtle, pk.Bulbasaur]
+
+
+def fresh_pool():
+    """A pool that never keeps anything, so every encounter makes a new pyokemon, like before."""
+    return EncounterPool(batch_size=1, keep=0)
+
+
+def encounters(pool, n, seen):
+    rng = random.Random(0)
+    for i in range(n):
+        wild = seen[i] = pool.draw(rng)
+        pool.release(wild)
+
+
+def battles(pool, n):
+    rng = random.Random(0)
+    player = _Scripted(["fight", "1"])
+    for _ in range(n):
+        trainer = pk.Trainer("bench")
+        trainer.add_pkmn(rng.choice(TRAINER_SPECIES)(rng.randint(3, 8)))
+        game.wild_battle(trainer, presenter=player, rng=rng, pool=pool)
+
+
+def best_time(run, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def measure(make_pool, n):
+    seen = [None] * n
+    encounter_time = best_time(lambda: encounters(make_pool(), n, seen))
+    with contextlib.redirect_stdout(io.StringIO()):
+        battle_time = best_time(lambda: battles(make_pool(), n // 10))
+
+    pool = make_pool()
+    seen = [None] * n
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    encounters(pool, n, seen)
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return n / encounter_time, (n // 10) / battle_time, pool.made / n, (after - before) / n
+
+
+def main(n=100000):
+    print("{:<10} {:>16} {:>14} {:>14} {:>12}".format(
+        "", "encounters/s", "battles/s", "made/enc", "bytes/enc"))
+    for name, make_pool in [("fresh", fresh_pool), ("pooled", EncounterPool)]:
+        print("{:<10} {:>16,.0f} {:>14,.0f} {:>14.4f} {:>12.1f}".format(name, *measure(make_pool, n)))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,85 @@
+"""
+Does stopping and resuming a jobs.Job change its answer, and what do the
+checkpoints cost?
+
+* Runs a battle campaign straight through with no checkpoints, then with
+  checkpoints every 10 seconds (the default) and every 0.1 seconds, and
+  compares battles per second.
+* Runs it again in pieces of random size, starting a new Job from the
+  checkpoint file each time like a restarted program would, and checks the
+  final table is byte-for-byte the same.
+* Starts jobs.py in its own process, kills it (SIGKILL, no chance to clean
+  up) part way through, starts it again, and checks that too.
+
+    python -m benchmarks.jobs [repeats]
+"""
+import os
+import pickle
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import jobs
+import tournament
+
+
+def campaign(repeats, path=None, interval=10.0):
+    tasks = jobs.battle_tasks(tournament.species_classes(), (2, 5, 10, 20), repeats)
+    return jobs.Job("campaign", tasks, jobs.battle_step, tournament.Table(), random.Random(0), path, interval)
+
+
+def main(repeats=200):
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'campaign.ckpt')
+
+    def timed(interval):
+        if os.path.exists(path):
+            os.remove(path)
+        job = campaign(repeats, None if interval is None else path, interval or 10.0)
+        started = time.perf_counter()
+        total = job.run()
+        return len(job.tasks) / (time.perf_counter() - started), job.checkpoints, total
+
+    best = {}
+    for _ in range(3):
+        for interval in (None, 10.0, 0.1):
+            speed, checkpoints, straight = timed(interval)
+            if speed > best.get(interval, (0,))[0]:
+                best[interval] = (speed, checkpoints)
+    for interval, (speed, checkpoints) in best.items():
+        print("{:<22} {:>10,.0f} battles/s {:>+7.1%} {:>5} checkpoints".format(
+            "no checkpoints" if interval is None else "every {}s".format(interval),
+            speed, speed / best[None][0] - 1, checkpoints))
+    expected = pickle.dumps(straight)
+
+    os.remove(path)
+    r = random.Random(1)
+    pieces = 0
+    while True:
+        job = campaign(repeats, path)
+        if job.finished:
+            break
+        job.run(limit=r.randint(1, len(job.tasks) // 5))
+        pieces += 1
+    print("{} pieces: {}".format(pieces, "same table" if pickle.dumps(job.total) == expected else "DIFFERENT"))
+
+    # jobs.py's own campaign, killed and restarted.
+    os.remove(path)
+    command = [sys.executable, 'jobs.py', path]
+    straight = subprocess.run(command, capture_output=True, text=True).stdout.splitlines()[1:]
+    os.remove(path)
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+    time.sleep(3)
+    process.kill()
+    process.wait()
+    resumed = subprocess.run(command, capture_output=True, text=True).stdout.splitlines()
+    print("killed and restarted ({}): {}".format(
+        resumed[0], "same table" if resumed[1:] == straight else "DIFFERENT"))
+    os.remove(path)
+    os.rmdir(directory)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,71 @@
+"""
+How does league.py cope with a big league?
+
+Builds a league of 100,000 trainers (rosters of 1 to 6 pyokemon, levels 2
+to 30) and reports:
+
+* how many roster-vs-roster matches per second it fights, in parallel batches,
+* how long one rating update takes, early on and after a million of them
+  -- it shouldn't change, since an update never looks at old matches,
+* how long leaderboard queries take: a trainer's rank, who's in a given
+  place, and the top ten.
+
+    python -m benchmarks.league [trainers] [matches] [workers]
+"""
+import random
+import sys
+import time
+
+import pyokemans as pk
+from league import League, MatchResult
+
+SPECIES = [pk.Charmander, pk.Squirtle, pk.Bulbasaur, pk.Diglett, pk.Pidgey, pk.Pikachu]
+UPDATES = 1000000
+
+
+def trainers(n, seed=0):
+    r = random.Random(seed)
+    found = []
+    for i in range(n):
+        trainer = pk.Trainer("Trainer {}".format(i))
+        for _ in range(r.randint(1, 6)):
+            trainer.add_pkmn(r.choice(SPECIES)(r.randint(2, 30)))
+        found.append(trainer)
+    return found
+
+
+def per_call(run, calls):
+    started = time.perf_counter()
+    run()
+    return (time.perf_counter() - started) / calls
+
+
+def main(size=100000, matches=10000, workers=None):
+    started = time.perf_counter()
+    league = League(trainers(size))
+    print("{:,} trainers set up in {:.1f}s".format(size, time.perf_counter() - started))
+
+    pairs = league.pairings()[:matches]
+    seconds = per_call(lambda: league.play(pairs, workers=workers), len(pairs))
+    print("{:,} matches: {:,.0f} matches/s".format(len(pairs), 1 / seconds))
+
+    r = random.Random(1)
+    results = [MatchResult(r.randrange(size), r.randrange(size), r.randint(0, 1), 0) for _ in range(UPDATES)]
+    tenth = UPDATES // 10
+    timings = []
+    for start in range(0, UPDATES, tenth):
+        batch = results[start:start + tenth]
+        timings.append(per_call(lambda: [league.record(result) for result in batch], len(batch)))
+    print("rating update: {:.2f} us for the first {:,}, {:.2f} us for the last {:,}".format(
+        1e6 * timings[0], tenth, 1e6 * timings[-1], tenth))
+
+    players = [r.randrange(size) for _ in range(10000)]
+    places = [r.randint(1, size) for _ in range(10000)]
+    print("rank: {:.2f} us, at: {:.2f} us, top 10: {:.2f} us".format(
+        1e6 * per_call(lambda: [league.rank(player) for player in players], len(players)),
+        1e6 * per_call(lambda: [league.board.at(place) for place in places], len(places)),
+        1e6 * per_call(lambda: [league.leaderboard(10) for _ in range(1000)], 1000)))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,57 @@
+"""
+How many bytes does one pyokemon take up?
+
+Makes a big population of pyokemon, both as normal Pyokemon and as
+compact.CompactPyokemon, and uses tracemalloc to count how much memory
+Python allocated per creature. Half of each population gets into a fight
+first, so not everybody is sitting at full PP.
+
+    python -m benchmarks.memory [number of creatures]
+"""
+import gc
+import random
+import sys
+import tracemalloc
+
+import engine
+import pyokemans as pk
+from compact import CompactPyokemon
+
+SPECIES = [pk.Charmander, pk.Squirtle, pk.Bulbasaur, pk.Diglett, pk.Pidgey, pk.Pikachu]
+
+
+def make_population(make, n, seed=0):
+    random.seed(seed)
+    population = [make(SPECIES[i % len(SPECIES)], random.randint(2, 30)) for i in range(n)]
+    for a, b in zip(population[::4], population[1::4]):
+        engine.fight_round(a, b)
+    return population
+
+
+def bytes_per_creature(make, n):
+    """Returns the number of bytes allocated per creature for a population of n."""
+    # Make one small population first, so one-time costs like the compact
+    # module's shared tables aren't counted against every creature.
+    make_population(make, 100)
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    population = make_population(make, n)
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    total = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    # The list holding the population is 8 bytes per creature; that isn't the creature's fault.
+    return (total - sys.getsizeof(population)) / n
+
+
+def main(n=100000):
+    normal = bytes_per_creature(lambda species, level: species(level), n)
+    compact = bytes_per_creature(CompactPyokemon, n)
+    print("{} creatures".format(n))
+    print("Pyokemon:        {:8.1f} bytes per creature".format(normal))
+    print("CompactPyokemon: {:8.1f} bytes per creature ({:.1f}x smaller)".format(compact, normal / compact))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,92 @@
+"""
+How much does making species lazily save, as the number of species grows?
+
+For made-up data files with 10, 150 and 1000 species (and as many moves),
+we time and measure (with tracemalloc) loading a Registry two ways:
+
+* lazy: just reading the file, which is all the game does until a species
+  is used,
+* eager: reading it and then making every class and move, which is what
+  writing them all out in pyokemans.py would cost on every import.
+
+"first use" is how long it then takes to make one species and a pyokemon
+of it.
+
+    python -m benchmarks.registry [species ...]
+"""
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pyokemans as pk
+from registry import Registry
+
+TYPES = sorted(pk.pktypes.keys())
+
+
+def data(species):
+    """A data file's worth of made-up species, each knowing two of species made-up moves."""
+    moves = [["Move {}".format(i), TYPES[i % len(TYPES)], 5 + i % 11, 5 + i % 16] for i in range(species)]
+    return {
+        'moves': moves,
+        'species': [["Species{}".format(i), TYPES[i % len(TYPES)], [10 + i % 6, 1 + i % 3, 1 + i % 2, 1 + i % 4],
+                     [moves[i][0], moves[(7 * i + 1) % species][0]]] for i in range(species)],
+    }
+
+
+def load(path, eager):
+    registry = Registry(path)
+    if eager:
+        registry.all_species()
+        for name in registry.move_names():
+            registry.move(name)
+    return registry
+
+
+def measure(path, eager, repeat=5):
+    """Returns (best seconds to load, bytes the loaded registry takes up)."""
+    best = float('inf')
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        load(path, eager)
+        best = min(best, time.perf_counter() - started)
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    registry = load(path, eager)
+    gc.collect()
+    memory = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del registry
+    return best, memory
+
+
+def first_use(path):
+    registry = Registry(path)
+    started = time.perf_counter()
+    registry.species('Species0')(5)
+    return time.perf_counter() - started
+
+
+def main(*sizes):
+    print("{:>8} {:>12} {:>12} {:>12} {:>12} {:>14}".format(
+        "species", "lazy ms", "lazy KiB", "eager ms", "eager KiB", "first use ms"))
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes or (10, 150, 1000):
+            path = os.path.join(directory, "{}.json".format(size))
+            with open(path, 'w') as f:
+                json.dump(data(size), f, separators=(',', ':'))
+            lazy_time, lazy_memory = measure(path, False)
+            eager_time, eager_memory = measure(path, True)
+            print("{:>8} {:>12.2f} {:>12.1f} {:>12.2f} {:>12.1f} {:>14.3f}".format(
+                size, 1000 * lazy_time, lazy_memory / 1024, 1000 * eager_time, eager_memory / 1024,
+                1000 * first_use(path)))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
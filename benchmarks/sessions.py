@@ -0,0 +1,93 @@
+"""
+How long does a player wait for the server?
+
+Starts a BattleServer and connects lots of robot players to it at once.
+Each robot plays a few wild battles, visiting the pyokemon center after
+each one, and we time every turn: from the moment it sends an answer until
+the next question arrives. Then we report the percentiles of those times.
+
+    python -m benchmarks.sessions [--tcp] [sessions ...]
+
+By default the robots talk to the server over in-memory queues
+(BattleServer.local), which measures the server and nothing else. With
+--tcp they connect over real sockets on localhost instead; each session
+then needs two file descriptors, so large runs may need a higher ulimit -n.
+The robots and the server share one process and one event loop, so the
+numbers include the robots' own (small) share of the work.
+"""
+import asyncio
+import random
+import sys
+import time
+
+import server
+
+# What a robot says to each question, by how the question starts.
+ANSWERS = [
+    ("What is your name", lambda r: "robot"),
+    ("Type the number for your choice", lambda r: r.choice("123")),
+    ("What would you like to", lambda r: "pal"),
+    ("> ", lambda r: r.choice(["fight", "fight", "fight", "run", "capture", "status", "switch"])),
+    ("Enter number of move", lambda r: r.choice("12")),
+    ("Enter number for your choice", lambda r: "1"),
+]
+
+
+async def robot(connection, battles, latencies, seed):
+    r = random.Random(seed)
+    healed = True
+    _, prompt = await connection.next_prompt()
+    while prompt is not None:
+        if prompt.startswith("battle, center, or quit"):
+            if battles <= 0:
+                answer = "quit"
+            elif healed:
+                answer = "battle"
+                battles -= 1
+            else:
+                answer = "center"
+            healed = not healed
+        else:
+            answer = next(make(r) for start, make in ANSWERS if prompt.startswith(start))
+        started = time.perf_counter()
+        connection.answer(answer)
+        _, prompt = await connection.next_prompt()
+        latencies.append(time.perf_counter() - started)
+
+
+def percentile(ordered, p):
+    return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+
+async def load_test(sessions, battles=3, tcp=False, port=8765, center_delay=0):
+    battle_server = server.BattleServer(seed=sessions, center_delay=center_delay)
+    latencies = []
+    if tcp:
+        listener = await battle_server.serve(port=port)
+        connections = [await server.TCPConnection.open(port=port) for _ in range(sessions)]
+    else:
+        connections = [battle_server.local() for _ in range(sessions)]
+    started = time.perf_counter()
+    await asyncio.gather(*[robot(c, battles, latencies, seed) for seed, c in enumerate(connections)])
+    elapsed = time.perf_counter() - started
+    if tcp:
+        listener.close()
+        await listener.wait_closed()
+    return latencies, elapsed
+
+
+def main(args):
+    tcp = '--tcp' in args
+    sizes = [int(arg) for arg in args if arg != '--tcp'] or [1000, 10000]
+    print("{:>8} {:>9} {:>10} {:>9} {:>9} {:>9} {:>9}".format(
+        "sessions", "turns", "turns/s", "p50 ms", "p90 ms", "p99 ms", "max ms"))
+    for sessions in sizes:
+        latencies, elapsed = asyncio.run(load_test(sessions, tcp=tcp))
+        latencies.sort()
+        print("{:>8} {:>9} {:>10.0f} {:>9.2f} {:>9.2f} {:>9.2f} {:>9.2f}".format(
+            sessions, len(latencies), len(latencies) / elapsed,
+            *[1000 * percentile(latencies, p) for p in (50, 90, 99, 100)]))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
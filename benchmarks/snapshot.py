@@ -0,0 +1,63 @@
+"""
+How much quicker is engine.snapshot than copy.deepcopy for branching a battle?
+
+For a Pyokemon pair and a compact.CompactPyokemon pair, times:
+
+* taking a copy of both combatants: engine.snapshot vs copy.deepcopy,
+* going back to it: engine.restore (in place) vs deepcopy-ing the copy again
+  (you can't go back twice to the same deepcopy without copying it),
+* hashing a state: hash() of a snapshot, and engine.state_hash.
+
+It also reports how many bytes a saved state takes up.
+
+    python -m benchmarks.snapshot
+"""
+import copy
+import sys
+import timeit
+import tracemalloc
+
+import compact
+import engine
+import pyokemans as pk
+
+
+def nanoseconds(run, number):
+    return min(timeit.repeat(run, number=number, repeat=5)) / number * 1e9
+
+
+def size(make, count=20000):
+    # Plenty of them, so most can't come from the free lists Python keeps of
+    # recently freed tuples, which tracemalloc doesn't see being reused.
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = [make() for _ in range(count)]
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del kept
+    return used / count
+
+
+def main():
+    pairs = [("Pyokemon", pk.Charmander(5), pk.Pikachu(4)),
+             ("Compact", compact.CompactPyokemon(pk.Charmander, 5), compact.CompactPyokemon(pk.Pikachu, 4))]
+    print("{:<10} {:>12} {:>12} {:>12} {:>12} {:>10} {:>12} {:>10} {:>10}".format(
+        "", "snapshot ns", "deepcopy ns", "restore ns", "re-copy ns", "hash ns", "state_hash", "bytes", "deepcopy"))
+    for name, a, b in pairs:
+        state = engine.snapshot(a, b)
+        copied = copy.deepcopy((a, b))
+        print("{:<10} {:>12.0f} {:>12.0f} {:>12.0f} {:>12.0f} {:>10.0f} {:>12.0f} {:>10.0f} {:>10.0f}".format(
+            name,
+            nanoseconds(lambda: engine.snapshot(a, b), 100000),
+            nanoseconds(lambda: copy.deepcopy((a, b)), 2000),
+            nanoseconds(lambda: engine.restore(state, a, b), 100000),
+            nanoseconds(lambda: copy.deepcopy(copied), 2000),
+            # hash() of a tuple isn't remembered, so this is the real cost every time.
+            nanoseconds(lambda: hash(state), 100000),
+            nanoseconds(lambda: engine.state_hash(state), 100000),
+            size(lambda: engine.snapshot(a, b)),
+            size(lambda: copy.deepcopy((a, b)), 2000)))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
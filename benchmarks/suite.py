@@ -0,0 +1,252 @@
+"""
+Where does the time go? Times the game's busiest functions, one by one.
+
+Every benchmark uses fixed seeds, so two runs do exactly the same work, and
+anything the game prints is thrown away so the terminal doesn't slow it
+down. For each one we report operations per second (the best of a few
+repeats) and how many bytes each operation leaves allocated, measured with
+tracemalloc in a separate pass.
+
+Save a run as JSON, then compare two runs to spot regressions:
+
+    python -m benchmarks.suite run before.json
+    ... change something ...
+    python -m benchmarks.suite run after.json
+    python -m benchmarks.suite compare before.json after.json [threshold]
+
+compare flags every benchmark that got more than threshold (default 0.2,
+twenty percent -- timings on a busy machine wobble by ten) slower or hungrier, and exits with status 1 if there were any.
+Pass benchmark names after the file name to "run" to only run those.
+"""
+import contextlib
+import gc
+import io
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+import game
+import pyokemans as pk
+from presenters import TextPresenter
+
+SPECIES = [pk.Charmander, pk.Squirtle, pk.Bulbasaur, pk.Diglett, pk.Pidgey, pk.Pikachu]
+SEED = 2016
+
+
+class _Scripted(TextPresenter):
+    """Prints like the real game (into the void), but answers from a list, round and round."""
+    def __init__(self, answers):
+        self.answers = answers
+        self.asked = 0
+
+    def ask(self, prompt):
+        answer = self.answers[self.asked % len(self.answers)]
+        self.asked += 1
+        return answer
+
+
+# BENCHMARKS
+# Each one takes (n, rng), does any setting up that shouldn't be timed, and
+# returns a function that does the operation n times.
+
+def bench_strategy_attack(n, rng):
+    pairs = [(rng.choice(SPECIES)(rng.randint(2, 10)), rng.choice(SPECIES)(rng.randint(2, 10))) for _ in range(n)]
+    quiet = TextPresenter()
+
+    def run():
+        for attacker, defender in pairs:
+            game.strategy_attack(attacker, defender, presenter=quiet, rng=rng)
+    return run
+
+
+def bench_fight_round(n, rng):
+    pairs = [(rng.choice(SPECIES)(rng.randint(2, 10)), rng.choice(SPECIES)(rng.randint(2, 10))) for _ in range(n)]
+    quiet = TextPresenter()
+
+    def run():
+        for p1, p2 in pairs:
+            game.fight_round(p1, p2, presenter=quiet, rng=rng)
+    return run
+
+
+def bench_wild_battle(n, rng):
+    trainers = []
+    for _ in range(n):
+        trainer = pk.Trainer("bench")
+        trainer.add_pkmn(rng.choice(SPECIES[:3])(rng.randint(3, 8)))
+        trainers.append(trainer)
+    # Fight with the first move until somebody faints.
+    player = _Scripted(["fight", "1"])
+
+    def run():
+        for trainer in trainers:
+            game.wild_battle(trainer, presenter=player, rng=rng)
+    return run
+
+
+def _bench_construct(species):
+    def bench(n, rng):
+        levels = [rng.randint(1, 50) for _ in range(n)]
+        # Keep every pyokemon, so the memory figure is the size of one.
+        made = [None] * n
+
+        def run():
+            for i, level in enumerate(levels):
+                made[i] = species(level)
+        return run
+    return bench
+
+
+def bench_learn_forget(n, rng):
+    pkmn = pk.Pikachu(5)
+
+    def run():
+        for _ in range(n):
+            pkmn.learn(pk.Ember)
+            try:
+                pkmn.forget("Ember")
+            except KeyError:
+                # forget() raises even after it has forgotten the move.
+                pass
+    return run
+
+
+def bench_xp_setter(n, rng):
+    # Each new level 1 pyokemon gets enough XP for anywhere from 0 to 99 level ups.
+    pkmns = [rng.choice(SPECIES)(0) for _ in range(n)]
+    xps = [50 * rng.randint(0, 99) * rng.randint(1, 100) for _ in range(n)]
+
+    def run():
+        for pkmn, xp in zip(pkmns, xps):
+            pkmn.xp = xp
+    return run
+
+
+def bench_heal(n, rng):
+    pkmns = [rng.choice(SPECIES)(rng.randint(2, 30)) for _ in range(n)]
+    for pkmn in pkmns:
+        pkmn.hp = 1
+        for move in pkmn.moves:
+            move.pp = 0
+
+    def run():
+        for pkmn in pkmns:
+            pkmn.heal()
+    return run
+
+
+def bench_random_move(n, rng):
+    pkmn = pk.Charmander(5)
+
+    def run():
+        for _ in range(n):
+            pkmn.random_move(rng)
+    return run
+
+
+def bench_add_pkmn(n, rng):
+    # A trainer can only have six, so each operation fills up a fresh trainer.
+    teams = [[rng.choice(SPECIES)(2) for _ in range(6)] for _ in range(n // 6)]
+
+    def run():
+        for team in teams:
+            trainer = pk.Trainer("bench")
+            for pkmn in team:
+                trainer.add_pkmn(pkmn)
+    return run
+
+
+# name: (benchmark, how many operations to time at once)
+BENCHMARKS = {
+    'strategy_attack': (bench_strategy_attack, 20000),
+    'fight_round': (bench_fight_round, 10000),
+    'wild_battle': (bench_wild_battle, 1000),
+    'learn_forget': (bench_learn_forget, 50000),
+    'xp_setter': (bench_xp_setter, 50000),
+    'heal': (bench_heal, 50000),
+    'random_move': (bench_random_move, 100000),
+    'add_pkmn': (bench_add_pkmn, 60000),
+}
+for _species in SPECIES:
+    BENCHMARKS['construct_' + _species.__name__] = (_bench_construct(_species), 10000)
+
+
+def measure(bench, n, repeat=5):
+    """Returns (operations per second, bytes left allocated per operation)."""
+    best = float('inf')
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            run = bench(n, random.Random(SEED))
+            gc.collect()
+            started = time.perf_counter()
+            run()
+            best = min(best, time.perf_counter() - started)
+
+        run = bench(n, random.Random(SEED))
+        gc.collect()
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        run()
+        gc.collect()
+        after = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+    return n / best, (after - before) / n
+
+
+def run_all(names=None):
+    results = {}
+    for name in names or BENCHMARKS:
+        bench, n = BENCHMARKS[name]
+        ops, memory = measure(bench, n)
+        results[name] = {'ops_per_sec': ops, 'bytes_per_op': memory, 'n': n}
+        print("{:<24} {:>14,.0f} ops/s {:>10.1f} bytes/op".format(name, ops, memory))
+    return results
+
+
+def compare(before, after, threshold=0.2):
+    """
+    Prints how every benchmark in both runs changed. Returns the names of the
+    ones that got more than threshold slower, or allocated more than
+    threshold more memory (and at least 16 bytes more, to ignore noise).
+    """
+    regressions = []
+    print("{:<24} {:>14} {:>14} {:>8} {:>10} {:>10}".format(
+        "benchmark", "before ops/s", "after ops/s", "change", "bytes/op", "was"))
+    for name in sorted(set(before) & set(after)):
+        old, new = before[name], after[name]
+        change = new['ops_per_sec'] / old['ops_per_sec'] - 1
+        slower = change < -threshold
+        hungrier = (new['bytes_per_op'] - old['bytes_per_op'] > 16 and
+                    new['bytes_per_op'] > (1 + threshold) * old['bytes_per_op'])
+        flag = "  SLOWER" * slower + "  MEMORY" * hungrier
+        if flag:
+            regressions.append(name)
+        print("{:<24} {:>14,.0f} {:>14,.0f} {:>+7.1%} {:>10.1f} {:>10.1f}{}".format(
+            name, old['ops_per_sec'], new['ops_per_sec'], change, new['bytes_per_op'], old['bytes_per_op'], flag))
+    return regressions
+
+
+def main(args):
+    if args[:1] == ['run'] and len(args) >= 2:
+        results = run_all(args[2:])
+        with open(args[1], 'w') as f:
+            json.dump({'python': platform.python_version(), 'machine': platform.machine(),
+                       'seed': SEED, 'results': results}, f, indent=2, sort_keys=True)
+        return 0
+    if args[:1] == ['compare'] and len(args) in (3, 4):
+        runs = []
+        for path in args[1:3]:
+            with open(path) as f:
+                runs.append(json.load(f)['results'])
+        regressions = compare(*runs, threshold=float(args[3]) if len(args) == 4 else 0.2)
+        print("{} regression(s)".format(len(regressions)))
+        return 1 if regressions else 0
+    print(__doc__)
+    return 2
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,42 @@
+"""
+How much does sweep.py's cache save?
+
+Runs a 3 x 3 grid of rules over a few matchups into an empty cache, then a
+4 x 4 grid that shares four of its points with the first, and reports how
+long each took and how many tasks were fought rather than read back.
+
+    python -m benchmarks.sweep [workers]
+"""
+import shutil
+import sys
+import tempfile
+import time
+
+import sweep
+
+MATCHUPS = [sweep.Matchup("Charmander", 5, "Squirtle", 5), sweep.Matchup("Bulbasaur", 10, "Pikachu", 10),
+            sweep.Matchup("Pikachu", None, "Pidgey", None)]
+
+
+def timed(points, cache, workers):
+    started = time.perf_counter()
+    results = sweep.run(points, MATCHUPS, seeds=range(4), battles=100, cache=cache, workers=workers)
+    seconds = time.perf_counter() - started
+    fought = sum(not result.cached for result in results)
+    print("{:>4} tasks: {:>4} fought, {:>4} from the cache, {:.2f}s".format(
+        len(results), fought, len(results) - fought, seconds))
+
+
+def main(workers=None):
+    directory = tempfile.mkdtemp()
+    try:
+        cache = sweep.ResultCache(directory)
+        timed(sweep.grid(miss_threshold=[0.1, 0.25, 0.5], hp_cap=[100, 150, 200]), cache, workers)
+        timed(sweep.grid(miss_threshold=[0.25, 0.5, 0.75, 1.0], hp_cap=[150, 200, 250, 300]), cache, workers)
+        timed(sweep.grid(miss_threshold=[0.25, 0.5, 0.75, 1.0], hp_cap=[150, 200, 250, 300]), cache, workers)
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,57 @@
+"""
+How quickly can encounter zones pick a wild pyokemon, and change their minds?
+
+For zones of a few different sizes we time picking one entry at a time
+(Zone.sample), picking in batches (Zone.sample_many), and the obvious way
+of doing it, random.choices with cumulative weights, which has to search
+the weights on every pick. Then we time changing one weight, both the
+incremental way (Zone.set_weight) and by building the zone again.
+
+    python -m benchmarks.zones [picks]
+"""
+import random
+import sys
+import time
+from itertools import accumulate
+
+import pyokemans as pk
+from encounters import Zone, load_zones
+
+SPECIES = [pk.Charmander, pk.Squirtle, pk.Bulbasaur, pk.Diglett, pk.Pidgey, pk.Pikachu]
+
+
+def synthetic(size, seed=0):
+    """A zone with size entries and uneven weights."""
+    r = random.Random(seed)
+    entries = [(SPECIES[i % len(SPECIES)], i // len(SPECIES) + 1, r.expovariate(1)) for i in range(size)]
+    return Zone("{} entries".format(size), entries)
+
+
+def rate(run, n):
+    started = time.perf_counter()
+    run()
+    return n / (time.perf_counter() - started)
+
+
+def main(n=1000000):
+    zones = [load_zones()['victory road'], synthetic(100), synthetic(600)]
+    print("{:<16} {:>14} {:>14} {:>14} {:>14} {:>14}".format(
+        "zone", "sample/s", "sample_many/s", "choices/s", "update/s", "rebuild/s"))
+    for zone in zones:
+        rng = random.Random(1)
+        encounters = zone.encounters
+        cumulative = list(accumulate(zone.table.weights))
+        one = rate(lambda: [zone.sample(rng) for _ in range(n // 10)], n // 10)
+        many = rate(lambda: zone.sample_many(n, rng), n)
+        choices = rate(lambda: rng.choices(encounters, cum_weights=cumulative, k=n), n)
+
+        updates = [(encounters[rng.randrange(len(encounters))], rng.expovariate(1)) for _ in range(2000)]
+        update = rate(lambda: [zone.set_weight(species, level, w) for (species, level), w in updates], len(updates))
+        entries = [(species, level, zone.weight(species, level)) for species, level in encounters]
+        rebuild = rate(lambda: [Zone(zone.name, entries) for _ in range(20)], 20)
+        print("{:<16} {:>14,.0f} {:>14,.0f} {:>14,.0f} {:>14,.0f} {:>14,.0f}".format(
+            zone.name, one, many, choices, update, rebuild))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,374 @@
+"""
+Tournament battles spread over lots of machines.
+
+tournament.run keeps every core of one machine busy. For more than that,
+start a coordinator on one machine and workers on as many as you like:
+
+    python cluster.py coordinator 9000           # on one machine
+    python cluster.py worker coordinator-host 9000   # on each of the others
+
+The coordinator cuts the tournament's matches into batches. Workers connect
+to it, and every time one is ready it's sent a batch, fights it with
+tournament.fight, and sends back who won each match. Fast workers simply
+come back for more sooner, so nobody sits idle while there's work left.
+
+Things go wrong when there are lots of machines, so:
+
+* if a worker goes away -- its connection closes, or it goes quiet for
+  longer than the timeout while it has a batch -- its batches go back on
+  the queue for somebody else. Workers send a keep-alive every few seconds
+  while they fight, so a big batch on a slow machine isn't mistaken for a
+  dead worker,
+* once the queue is empty, idle workers steal batches that are still
+  being fought elsewhere and fight them too. Whoever finishes first wins,
+  so one slow machine can't hold up the end of the tournament. Every match
+  has its own seed, so both copies come out exactly the same.
+
+The results are the same as tournament.run's, however many workers there
+are and whatever happens to them.
+
+Everything can be tried out on one machine: run(matches, workers=4) starts
+a coordinator and four worker processes on localhost.
+
+THE PROTOCOL
+
+Every message is a FRAME header -- one byte saying what kind of message
+it is, and four saying how many bytes follow -- and then the bytes.
+
+* READY (worker to coordinator, nothing after it): send me a batch.
+* BATCH (coordinator to worker): the batch number, the species names the
+  batch uses, then one SPEC per match: which species and level each side
+  is, and the match's seed.
+* RESULTS (worker to coordinator): the batch number, then one OUTCOME per
+  match, in order: the winner (0 or 1) and how many turns it took. This
+  also means "send me another batch".
+* DONE (coordinator to worker, nothing after it): there's no more work.
+* ALIVE (worker to coordinator, nothing after it): still here, still
+  fighting. Sent every KEEPALIVE seconds while a batch is being fought.
+"""
+import asyncio
+import multiprocessing
+import socket
+import struct
+import sys
+import time
+from collections import deque
+
+import pyokemans as pk
+import tournament
+
+READY, BATCH, RESULTS, DONE, ALIVE = range(5)
+
+# How often (in seconds) a worker says it's still alive while it fights a
+# batch. A coordinator's timeout should be comfortably longer than this.
+KEEPALIVE = 5.0
+
+# The struct module packs numbers into bytes; see store.py. '<' is
+# little-endian with no padding, B is 1 byte, H is 2, I is 4 and Q is 8.
+FRAME = struct.Struct('<BI')
+BATCH_HEADER = struct.Struct('<IH')
+# Species a (by its place in the batch's list of names), level a, species b, level b, seed.
+SPEC = struct.Struct('<HBHBQ')
+RESULTS_HEADER = struct.Struct('<I')
+# Winner, turns.
+OUTCOME = struct.Struct('<BI')
+
+
+# ENCODING
+# Both ends use these, so they always agree on what the bytes mean.
+
+def encode_batch(number, matches):
+    """The bytes of a BATCH message (after the frame header) for a list of tournament.Matches."""
+    names = []
+    places = {}
+    specs = []
+    for match in matches:
+        for species in (match.species_a, match.species_b):
+            if species.__name__ not in places:
+                places[species.__name__] = len(names)
+                names.append(species.__name__)
+        specs.append(SPEC.pack(places[match.species_a.__name__], match.level_a,
+                               places[match.species_b.__name__], match.level_b, match.seed))
+    parts = [BATCH_HEADER.pack(number, len(names))]
+    for name in names:
+        encoded = name.encode()
+        parts.append(bytes([len(encoded)]) + encoded)
+    return b''.join(parts + specs)
+
+
+def decode_batch(data):
+    """Returns (batch number, [tournament.Match, ...]) from the bytes encode_batch made."""
+    number, count = BATCH_HEADER.unpack_from(data)
+    offset = BATCH_HEADER.size
+    species = []
+    for _ in range(count):
+        length = data[offset]
+        species.append(getattr(pk, data[offset + 1:offset + 1 + length].decode()))
+        offset += 1 + length
+    # The coordinator knows which repeat each match was; the worker only needs the seed.
+    return number, [tournament.Match(species[a], level_a, species[b], level_b, None, seed)
+                    for a, level_a, b, level_b, seed in SPEC.iter_unpack(data[offset:])]
+
+
+def encode_results(number, results):
+    """The bytes of a RESULTS message for a batch's tournament.Results."""
+    return RESULTS_HEADER.pack(number) + b''.join(OUTCOME.pack(result.winner, result.turns) for result in results)
+
+
+def decode_results(data):
+    """Returns (batch number, [(winner, turns), ...]) from the bytes encode_results made."""
+    number, = RESULTS_HEADER.unpack_from(data)
+    return number, list(OUTCOME.iter_unpack(data[RESULTS_HEADER.size:]))
+
+
+# WORKERS
+
+def _receive(sock, size):
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("The coordinator went away")
+        data += chunk
+    return bytes(data)
+
+
+def _send(sock, kind, data=b''):
+    sock.sendall(FRAME.pack(kind, len(data)) + data)
+
+
+def _fight(sock, matches, keepalive):
+    results = []
+    last = time.monotonic()
+    for match in matches:
+        results.append(tournament.fight(match))
+        if time.monotonic() - last >= keepalive:
+            _send(sock, ALIVE)
+            last = time.monotonic()
+    return results
+
+
+def work(host='127.0.0.1', port=9000, keepalive=KEEPALIVE):
+    """
+    Connects to a coordinator and fights batches for it until it says
+    there's nothing left, or goes away. Returns how many batches it fought.
+
+    :param keepalive: How often to tell the coordinator we're still alive
+        while fighting a batch, in seconds.
+    """
+    fought = 0
+    with socket.create_connection((host, port)) as sock:
+        try:
+            _send(sock, READY)
+            while True:
+                kind, size = FRAME.unpack(_receive(sock, FRAME.size))
+                data = _receive(sock, size)
+                if kind == DONE:
+                    break
+                number, matches = decode_batch(data)
+                _send(sock, RESULTS, encode_results(number, _fight(sock, matches, keepalive)))
+                fought += 1
+        except ConnectionError:
+            # Once everything's finished, the coordinator doesn't wait for
+            # copies of stolen batches that are still being fought.
+            pass
+    return fought
+
+
+# THE COORDINATOR
+
+class Coordinator(object):
+    """
+    Hands batches of matches out to workers and collects what they send back.
+
+    :param matches: The tournament.Matches to fight.
+    :param batch_size: How many matches go in a batch. Bigger batches mean
+        fewer messages, smaller ones less work lost when a worker dies.
+    :param timeout: How many seconds a worker with a batch can go without
+        sending anything -- results or a keep-alive -- before we give up on
+        it. Keep it well above KEEPALIVE.
+    """
+    def __init__(self, matches, batch_size=64, timeout=60.0):
+        self.matches = list(matches)
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.batches = [(start, min(start + batch_size, len(self.matches)))
+                        for start in range(0, len(self.matches), batch_size)]
+        self.results = [None] * len(self.matches)
+        # Batches nobody has been given yet, or that need giving out again.
+        self._queue = deque(range(len(self.batches)))
+        # Which workers are fighting each batch that isn't finished yet.
+        self._fighting = {}
+        self._finished = [False] * len(self.batches)
+        self.left = len(self.batches)
+        self._workers = 0
+        # Every worker connected right now, by number.
+        self._connections = {}
+        self._changed = None
+        # How things went: batches given out again after a worker went
+        # away, batches stolen, and results that turned up after somebody
+        # else's copy had already finished.
+        self.requeued = 0
+        self.stolen = 0
+        self.duplicates = 0
+
+    def _take(self, worker):
+        """The next batch for worker, or None if there's nothing for it right now."""
+        while self._queue:
+            batch = self._queue.popleft()
+            if not self._finished[batch]:
+                return batch
+        # Nothing queued: steal the batch that's been out longest and that
+        # only one worker (not this one) is fighting.
+        for batch, workers in self._fighting.items():
+            if len(workers) == 1 and worker not in workers:
+                self.stolen += 1
+                return batch
+        return None
+
+    def _finish(self, worker, data):
+        """Takes in a RESULTS message. Returns the batch it was for."""
+        batch, outcomes = decode_results(data)
+        if not 0 <= batch < len(self.batches):
+            raise ConnectionError("There's no batch {}".format(batch))
+        self._fighting.get(batch, set()).discard(worker)
+        if self._finished[batch]:
+            self.duplicates += 1
+            return batch
+        start, end = self.batches[batch]
+        if len(outcomes) != end - start:
+            raise ConnectionError("Batch {} came back with {} results, not {}".format(batch, len(outcomes), end - start))
+        for i, (winner, turns) in enumerate(outcomes, start):
+            self.results[i] = tournament.Result(self.matches[i], winner, turns)
+        self._finished[batch] = True
+        del self._fighting[batch]
+        self.left -= 1
+        return batch
+
+    def _lost(self, worker, held):
+        """A worker went away: put back anything only it was fighting."""
+        for batch in held:
+            workers = self._fighting.get(batch)
+            if workers is None:
+                continue
+            workers.discard(worker)
+            if not workers and not self._finished[batch]:
+                del self._fighting[batch]
+                self._queue.appendleft(batch)
+                self.requeued += 1
+
+    async def _read(self, reader, timeout):
+        kind, size = FRAME.unpack(await asyncio.wait_for(reader.readexactly(FRAME.size), timeout))
+        return kind, await asyncio.wait_for(reader.readexactly(size), timeout)
+
+    async def handle(self, reader, writer):
+        """Looks after one worker's connection."""
+        worker = self._workers
+        self._workers += 1
+        self._connections[worker] = writer
+        held = set()
+        try:
+            while True:
+                # A worker with nothing to do can be quiet for as long as it likes.
+                kind, data = await self._read(reader, self.timeout if held else None)
+                if kind == ALIVE:
+                    # Reading it was the point: the clock starts again.
+                    continue
+                async with self._changed:
+                    if kind == RESULTS:
+                        held.discard(self._finish(worker, data))
+                        self._changed.notify_all()
+                    elif kind != READY:
+                        raise ConnectionError("Unexpected message {}".format(kind))
+                    # Wait until there's a batch for this worker, or nothing left at all.
+                    batch = None
+                    while self.left and batch is None:
+                        batch = self._take(worker)
+                        if batch is None:
+                            await self._changed.wait()
+                    if batch is None:
+                        writer.write(FRAME.pack(DONE, 0))
+                        await writer.drain()
+                        return
+                    self._fighting.setdefault(batch, set()).add(worker)
+                    held.add(batch)
+                start, end = self.batches[batch]
+                data = encode_batch(batch, self.matches[start:end])
+                writer.write(FRAME.pack(BATCH, len(data)) + data)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.TimeoutError, struct.error):
+            pass
+        finally:
+            writer.close()
+            async with self._changed:
+                self._lost(worker, held)
+                del self._connections[worker]
+                self._changed.notify_all()
+
+    async def serve(self, host='127.0.0.1', port=9000):
+        """Starts listening for workers. Returns the asyncio Server; port 0 picks a free port."""
+        self._changed = asyncio.Condition()
+        return await asyncio.start_server(self.handle, host, port)
+
+    async def wait(self):
+        """Waits until every batch is finished, and returns the tournament.Results in match order."""
+        async with self._changed:
+            await self._changed.wait_for(lambda: not self.left)
+            # Hang up on anybody still fighting a copy of a stolen batch;
+            # nobody needs it now.
+            for writer in self._connections.values():
+                writer.close()
+            await self._changed.wait_for(lambda: not self._connections)
+        return self.results
+
+
+def run(matches, workers=4, batch_size=64, timeout=60.0, host='127.0.0.1', port=0):
+    """
+    Fights matches with a coordinator and workers local processes, all on
+    this machine. Returns the Coordinator, with its results filled in.
+    """
+    coordinator = Coordinator(matches, batch_size, timeout)
+
+    async def main():
+        server = await coordinator.serve(host, port)
+        address = server.sockets[0].getsockname()[:2]
+        processes = [multiprocessing.Process(target=work, args=address) for _ in range(workers)]
+        for process in processes:
+            process.start()
+        async with server:
+            await coordinator.wait()
+        return processes
+
+    for process in asyncio.run(main()):
+        process.join()
+    return coordinator
+
+
+def main(args):
+    if args[:1] == ['coordinator']:
+        port = int(args[1]) if len(args) > 1 else 9000
+        coordinator = Coordinator(tournament.schedule(levels=(2, 5, 10, 20), repeats=50))
+
+        async def serve():
+            server = await coordinator.serve('0.0.0.0', port)
+            print("Waiting for workers on port {}".format(port))
+            async with server:
+                return await coordinator.wait()
+        started = time.perf_counter()
+        table = tournament.Table()
+        for result in asyncio.run(serve()):
+            table.add(result)
+        print(table)
+        print("{:.1f}s, {} batches given out again, {} stolen".format(
+            time.perf_counter() - started, coordinator.requeued, coordinator.stolen))
+    elif args[:1] == ['worker']:
+        host = args[1] if len(args) > 1 else '127.0.0.1'
+        port = int(args[2]) if len(args) > 2 else 9000
+        print("Fought {} batches".format(work(host, port)))
+    else:
+        print("usage: python cluster.py coordinator [port]\n"
+              "       python cluster.py worker [host] [port]")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
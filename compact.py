@@ -0,0 +1,256 @@
+"""
+A smaller Pyokemon, for when you need millions of them.
+
+Every normal Python object carries a dictionary (__dict__) around with it to
+hold its attributes, and every Pyokemon also carries its own list of copied
+Move objects. That's flexible -- you can add any attribute you like to any
+pyokemon -- but it adds up when you have a lot of them.
+
+A class with __slots__ gives up that flexibility: it says up front exactly
+which attributes its objects have, and Python stores them in a fixed-size
+block instead of a dictionary. CompactPyokemon also stores the things every
+member of a species has in common (species name, type, which moves they
+know) once per species, and keeps just the PP of each move per creature.
+
+CompactPyokemon works like a Pyokemon everywhere that matters -- the engine
+and game functions can fight with it -- but it isn't one, so
+Trainer.add_pkmn won't take it. Use to_pyokemon() for that.
+"""
+import random
+
+import pyokemans as pk
+
+# Every move's MoveDef has a small integer ID (see pyokemans.py), so a
+# creature can remember which moves it knows as a few small numbers instead
+# of a list of Move objects.
+_moves = pk.move_definitions
+
+
+def move_id(move):
+    """Returns the integer ID of a move's definition."""
+    return move.definition.id
+
+
+# Lots of creatures share the exact same tuple of move IDs, or the exact
+# same tuple of PP values (for example, everybody who's fully healed). We
+# keep one copy of each tuple and hand out that one copy to everyone.
+_interned = {}
+
+
+def _intern(values):
+    values = tuple(values)
+    return _interned.setdefault(values, values)
+
+
+class Kind(object):
+    """
+    Everything that members of a species have in common. One of these is
+    shared by every CompactPyokemon of that species.
+    """
+    __slots__ = ('species', 'pktype', 'type_id', 'species_class', 'base_stats', 'learnset')
+
+    def __init__(self, species_class):
+        # A level 0 pyokemon hasn't had any level ups yet, so it has the
+        # species' starting stats.
+        proto = species_class(0)
+        self.species = proto.species
+        self.pktype = proto.pktype
+        self.type_id = proto.type_id
+        self.species_class = species_class
+        self.base_stats = (proto.max_hp, proto.attack, proto.defense, proto.speed)
+        self.learnset = _intern(move_id(move) for move in proto.moves)
+
+
+_kinds = {}
+
+
+def kind(species_class):
+    """Returns the shared Kind for a species class, like pk.Charmander."""
+    try:
+        return _kinds[species_class]
+    except KeyError:
+        _kinds[species_class] = Kind(species_class)
+        return _kinds[species_class]
+
+
+class CompactMove(object):
+    """
+    A view onto one of a CompactPyokemon's moves. It looks like a Move --
+    name, pktype, power, pp, restore_pp -- but the PP lives in the pyokemon.
+    """
+    __slots__ = ('_owner', '_slot')
+
+    def __init__(self, owner, slot):
+        self._owner = owner
+        self._slot = slot
+
+    @property
+    def _move(self): return _moves[self._owner._move_ids[self._slot]]
+
+    @property
+    def name(self): return self._move.name
+
+    @property
+    def pktype(self): return self._move.pktype
+
+    @property
+    def type_id(self): return self._move.type_id
+
+    @property
+    def power(self): return self._move.power
+
+    @property
+    def _max_pp(self): return self._move.max_pp
+
+    @property
+    def pp(self): return self._owner._pp[self._slot]
+
+    @pp.setter
+    def pp(self, newpp):
+        # Same as Move.pp: never goes below 0.
+        pp = list(self._owner._pp)
+        pp[self._slot] = max(newpp, 0)
+        self._owner._pp = _intern(pp)
+
+    def restore_pp(self):
+        self.pp = self._max_pp
+
+    def __eq__(self, other):
+        return (isinstance(other, CompactMove) and
+                self._owner is other._owner and self._slot == other._slot)
+
+    def __hash__(self):
+        return hash((id(self._owner), self._slot))
+
+
+class CompactPyokemon(object):
+    """
+    A Pyokemon that fits in a __slots__ object.
+
+    :param species_class: The species to make, like pk.Charmander.
+    :param level: Same as the level you'd pass to pk.Charmander.
+    """
+    __slots__ = ('_kind', '_nickname', '_xp', '_level', '_hp', '_max_hp',
+                 '_attack', '_defense', '_speed', '_move_ids', '_pp')
+
+    def __init__(self, species_class, level):
+        k = kind(species_class)
+        self._kind = k
+        self._nickname = None
+        self._xp = 0
+        self._max_hp, self._attack, self._defense, self._speed = k.base_stats
+        self._level = level
+        self._move_ids = k.learnset
+        self._pp = _intern(_moves[m].max_pp for m in k.learnset)
+        self._advance(level)
+        self._hp = self._max_hp
+
+    @classmethod
+    def from_pyokemon(cls, pkmn):
+        """Makes a CompactPyokemon with the same state as a normal Pyokemon."""
+        self = cls.__new__(cls)
+        self._kind = kind(type(pkmn))
+        self._nickname = pkmn.nickname
+        self._xp = pkmn.xp
+        self._level = pkmn.level
+        self._hp = pkmn.hp
+        self._max_hp = pkmn.max_hp
+        self._attack = pkmn.attack
+        self._defense = pkmn.defense
+        self._speed = pkmn.speed
+        self._move_ids = _intern(move_id(m) for m in pkmn.moves)
+        self._pp = _intern(m.pp for m in pkmn.moves)
+        return self
+
+    def to_pyokemon(self):
+        """Makes a normal Pyokemon with the same state as this one."""
+        pkmn = self._kind.species_class(0)
+        pkmn.nickname = self._nickname
+        pkmn._xp = self._xp
+        pkmn._level = self._level
+        pkmn._max_hp = self._max_hp
+        pkmn._attack = self._attack
+        pkmn._defense = self._defense
+        pkmn._speed = self._speed
+        pkmn._hp = self._hp
+        pkmn._moves = []
+        for m, pp in zip(self._move_ids, self._pp):
+            pkmn.learn(pk.Move.from_definition(_moves[m], pp))
+        return pkmn
+
+    # These come straight from Pyokemon. A property is just an object that
+    # knows how to get (and set) self._something, so it works just as well
+    # on a class that keeps _something in a slot instead of a __dict__.
+    species = pk.Pyokemon.species
+    pktype = pk.Pyokemon.pktype
+    type_id = pk.Pyokemon.type_id
+    attack = pk.Pyokemon.attack
+    defense = pk.Pyokemon.defense
+    speed = pk.Pyokemon.speed
+    level = pk.Pyokemon.level
+    max_hp = pk.Pyokemon.max_hp
+    xp = pk.Pyokemon.xp
+    hp = pk.Pyokemon.hp
+    nickname = pk.Pyokemon.nickname
+    name = pk.Pyokemon.name
+    levelup = pk.Pyokemon.levelup
+    _advance = pk.Pyokemon._advance
+    grant_xp = pk.Pyokemon.grant_xp
+    at_level = pk.Pyokemon.at_level
+
+    @property
+    def _species(self): return self._kind.species
+
+    @property
+    def _pktype(self): return self._kind.pktype
+
+    @property
+    def _type_id(self): return self._kind.type_id
+
+    @property
+    def moves(self):
+        return [CompactMove(self, slot) for slot in range(len(self._move_ids))]
+
+    @moves.setter
+    def moves(self, _): pass
+
+    def snapshot(self):
+        """The same as Pyokemon.snapshot: hp, xp, level, stats, then each move's PP."""
+        return (self._hp, self._xp, self._level, self._max_hp, self._attack, self._defense, self._speed) + self._pp
+
+    def restore(self, snapshot):
+        """Puts a pyokemon back the way it was when snapshot() was taken."""
+        (self._hp, self._xp, self._level, self._max_hp,
+         self._attack, self._defense, self._speed) = snapshot[:7]
+        self._pp = _intern(snapshot[7:])
+
+    def heal(self):
+        """Fully heals a pyokemon and restores the PP of all its moves."""
+        self._hp = self._max_hp
+        self._pp = _intern(_moves[m].max_pp for m in self._move_ids)
+
+    def learn(self, move):
+        """Teaches a pyokemon a move."""
+        if not isinstance(move, pk.Move):
+            raise TypeError("Can't teach something that isn't a move")
+        if len(self._move_ids) >= 5:
+            raise ValueError("I already know 4 moves. Delete one move first.")
+        else:
+            self._move_ids = _intern(self._move_ids + (move_id(move),))
+            self._pp = _intern(self._pp + (move.pp,))
+
+    def forget(self, move_name):
+        for slot, m in enumerate(self._move_ids):
+            if _moves[m].name == move_name:
+                self._move_ids = _intern(self._move_ids[:slot] + self._move_ids[slot + 1:])
+                self._pp = _intern(self._pp[:slot] + self._pp[slot + 1:])
+                return
+        raise KeyError("I don't know any move called {}!".format(move_name))
+
+    def random_move(self, rng=None):
+        # Returns a random move that this pokemon knows.
+        moves = [slot for slot, pp in enumerate(self._pp) if pp > 0]
+        if len(moves) == 0:
+            return pk.Struggle
+        else:
+            return CompactMove(self, (random if rng is None else rng).choice(moves))
@@ -0,0 +1,72 @@
+"""
+Every way an attack that hits can turn out, worked out ahead of time.
+
+engine.attack rolls a number between floor(attack/2) and the attacker's
+attack, adds the move's power, multiplies by the type multiplier, divides
+by the defender's defense and rounds up. For one attack score, power,
+multiplier and defense there are only a handful of rolls, so we do those
+sums once for each roll and keep the answers in a DamageTable. It says
+exactly how likely each amount of damage is, which is what solver.py and
+ai.py need, and it can pick an amount of damage for you: by rolling the
+same dice engine.attack does (roll), or with a single rng.random() and an
+alias table (sample; see encounters.py).
+
+engine.attack itself still does the sums. Looking up a table means hashing
+four numbers, and in Python that turns out to take as long as the sums do;
+benchmarks/damage.py compares them.
+
+Tables are kept for the most recently used 4096 combinations; older ones
+are dropped, and worked out again if they come back.
+"""
+import random
+from collections import namedtuple
+from functools import lru_cache
+from math import ceil, floor
+
+from encounters import alias_pick, alias_table
+
+
+class DamageTable(namedtuple("DamageTable", ["low", "by_roll", "outcomes", "alias"])):
+    """
+    Every way one attack that hits can turn out.
+
+    low: the lowest roll.
+    by_roll: by_roll[i] is the damage for a roll of low + i.
+    outcomes: ((damage, probability), ...), from least damage to most.
+    alias: an alias table for picking from outcomes.
+    """
+    __slots__ = ()
+
+    def roll(self, rng=None):
+        """The damage for one attack, rolling the dice just like engine.attack always has."""
+        # randrange(n) rolls exactly the same dice as randint(low, low + n - 1),
+        # with less work.
+        return self.by_roll[(random if rng is None else rng).randrange(len(self.by_roll))]
+
+    def sample(self, rng=None):
+        """The damage for one attack, picked with a single rng.random()."""
+        return self.outcomes[alias_pick(self.alias, (random if rng is None else rng).random())][0]
+
+
+@lru_cache(maxsize=4096)
+def damage_table(attack, power, multiplier, defense):
+    """
+    Returns the DamageTable for an attacker with that attack score using a
+    move with that power, on a defender with that defense. multiplier is the
+    whole damage multiplier: type effectiveness and same-type bonus together.
+    """
+    low = floor(attack/2)
+    by_roll = []
+    counts = {}
+    for roll in range(low, attack + 1):
+        damage = ceil((roll + power) * (multiplier / defense))
+        by_roll.append(damage)
+        counts[damage] = counts.get(damage, 0) + 1
+    rolls = attack - low + 1
+    outcomes = tuple((damage, count / rolls) for damage, count in sorted(counts.items()))
+    return DamageTable(low, tuple(by_roll), outcomes, alias_table([p for _, p in outcomes]))
+
+
+def cache_info():
+    """How well the cache of tables is doing: hits, misses, maxsize and currsize."""
+    return damage_table.cache_info()
@@ -0,0 +1,331 @@
+"""
+Where wild pyokemon come from.
+
+Every wild battle needs a wild pyokemon, and making one from scratch means
+running the whole constructor: Pyokemon.__init__, then learn() for each
+move, each of which makes a new Move. Almost all of them are thrown away a
+few turns later, when they faint or the trainer runs off.
+
+An EncounterPool keeps them instead. When a battle is over, the wild
+pyokemon goes back into the pool (release), and the next battle that needs
+one of that species gets it back with reset() -- same object, fresh stats,
+full HP and PP. When the pool runs out of a species it makes a whole batch
+at once.
+
+A wild pyokemon that gets caught now belongs to a trainer, so it must never
+be handed out again. Tell the pool with adopted() instead of release():
+
+    pool = EncounterPool()
+    wild = pool.draw(rng)
+    ...battle...
+    if wild in trainer.roster:
+        pool.adopted(wild)
+    else:
+        pool.release(wild)
+
+game.wild_battle does this for you.
+
+Which species and levels turn up where is decided by zones. A Zone is a list
+of (species, level, weight) entries -- an entry with twice the weight turns
+up twice as often -- usually loaded from a JSON file (see load_zones and
+zones.json). Picking from hundreds of entries millions of times has to be
+quick, so each zone keeps an AliasTable, which picks an entry in the same
+short time however many there are.
+"""
+import json
+import os
+import random
+
+import pyokemans as pk
+import rules
+
+# Which pyokemon live in the wild. The levels they come in are part of the
+# rules: rules.active.wild_levels.
+WILD_SPECIES = [pk.Diglett, pk.Pidgey, pk.Pikachu]
+
+
+class EncounterPool(object):
+    """
+    Hands out wild pyokemon, and takes them back when they're done with.
+
+    :param species: The species that draw() picks from.
+    :param levels: The lowest and highest level draw() picks, inclusive.
+        Leave it out to use rules.active.wild_levels at the time of each draw.
+    :param batch_size: How many of a species to make at once when there are none spare.
+    :param keep: The most spare pyokemon to keep of each species. Any more
+        released than that are left for the garbage collector.
+    """
+    def __init__(self, species=WILD_SPECIES, levels=None, batch_size=32, keep=256):
+        self.species = list(species)
+        self.levels = levels
+        self.batch_size = batch_size
+        self.keep = keep
+        # Spare pyokemon, by species.
+        self._free = {}
+        # The pyokemon handed out and not yet back, by id(). Only these can be released.
+        self._out = {}
+        # How many pyokemon were made, and how many draws were served by old ones.
+        self.made = 0
+        self.reused = 0
+
+    def draw(self, rng=None, zone=None):
+        """
+        Picks a random species and level and returns a wild pyokemon of them.
+
+        :param zone: The Zone to pick from. Without one, we pick from
+            species and levels, rolling the dice just like game.wild_battle
+            always has -- choice(), then randint() -- so the same seed meets
+            the same pyokemon.
+        """
+        if rng is None:
+            rng = random
+        if zone is not None:
+            return self.get(*zone.sample(rng))
+        species = rng.choice(self.species)
+        level = rng.randint(*(rules.active.wild_levels if self.levels is None else self.levels))
+        return self.get(species, level)
+
+    def get(self, species, level):
+        """Returns a pyokemon just like species(level)."""
+        free = self._free.get(species)
+        if free:
+            self.reused += 1
+        else:
+            free = self._free[species] = self._make(species)
+        pkmn = free.pop().reset(level)
+        self._out[id(pkmn)] = pkmn
+        return pkmn
+
+    def _make(self, species):
+        # Level 0 is the cheapest to make; get() resets them to the right level anyway.
+        self.made += self.batch_size
+        return [species(0) for _ in range(self.batch_size)]
+
+    def release(self, pkmn):
+        """
+        Gives a pyokemon from draw() or get() back, to be reset and handed out
+        again. Anything else, or something already released, is ignored, so a
+        pyokemon can't end up in two battles at once.
+        """
+        if self._out.pop(id(pkmn), None) is not pkmn:
+            return
+        free = self._free.setdefault(type(pkmn), [])
+        if len(free) < self.keep:
+            free.append(pkmn)
+
+    def adopted(self, pkmn):
+        """Forgets a pyokemon from draw() or get() for good, because someone caught it."""
+        self._out.pop(id(pkmn), None)
+
+    def spare(self):
+        """How many pyokemon are waiting to be handed out."""
+        return sum(len(free) for free in self._free.values())
+
+
+# ALIAS TABLES
+# Walker's alias method picks from n weighted things with a single roll.
+# Picture n buckets, each holding exactly 1/n of the total weight: bucket i
+# holds as much of thing i as it has room for, and tops itself up with one
+# other thing, alias[i]. To pick, we choose a bucket at random, and then
+# thing i with chance prob[i], or else alias[i].
+#
+# Building the buckets takes as long as there are things, so changing one
+# weight would mean starting again. Instead, an AliasTable splits the things
+# into blocks, with an alias table for each block and one more for picking
+# a block. Changing a weight only rebuilds its own block and the small table
+# of blocks.
+
+def alias_table(weights):
+    """Returns (prob, alias) lists for picking from weights, or None if they add up to nothing."""
+    n = len(weights)
+    total = sum(weights)
+    if total <= 0:
+        return None
+    scaled = [weight * n / total for weight in weights]
+    prob = [1.0] * n
+    alias = list(range(n))
+    large = [i for i, p in enumerate(scaled) if p >= 1]
+    # Zero weights go last, so they're paired up first: rounding errors can
+    # leave a few things unpaired at the end, and those are picked for sure.
+    small = [i for i, p in enumerate(scaled) if 0 < p < 1] + [i for i, p in enumerate(scaled) if p == 0]
+    while small and large:
+        less = small.pop()
+        more = large.pop()
+        prob[less] = scaled[less]
+        alias[less] = more
+        scaled[more] -= 1 - scaled[less]
+        (small if scaled[more] < 1 else large).append(more)
+    return prob, alias
+
+
+def alias_pick(table, roll):
+    """Picks from a (prob, alias) table, given a roll between 0 and 1."""
+    prob, alias = table
+    roll *= len(prob)
+    i = int(roll)
+    return i if roll - i < prob[i] else alias[i]
+
+
+class AliasTable(object):
+    """
+    Picks numbers 0, 1, ..., n-1 at random, each with chance proportional to
+    its weight. Weights can be changed, and added, between picks.
+
+    :param weights: Numbers, zero or more, at least one of them positive.
+    :param block: How many weights share an alias table. Changing a weight
+        costs about block + n/block.
+    """
+    def __init__(self, weights, block=64):
+        self.weights = [float(weight) for weight in weights]
+        if any(weight < 0 for weight in self.weights):
+            raise ValueError("Weights can't be negative")
+        self.block = block
+        self._blocks = []
+        self._totals = []
+        for start in range(0, len(self.weights), block):
+            self._blocks.append(alias_table(self.weights[start:start + block]))
+            self._totals.append(sum(self.weights[start:start + block]))
+        self._rebuild_top()
+
+    def _rebuild_top(self):
+        self._top = alias_table(self._totals)
+        # One table for all the weights; see sample_many.
+        self._flat = None
+        if self._top is None:
+            raise ValueError("At least one weight has to be more than 0")
+
+    def __len__(self):
+        return len(self.weights)
+
+    def update(self, changes):
+        """Changes weights, given {index: new weight}, rebuilding as little as possible."""
+        touched = set()
+        for i, weight in changes.items():
+            if weight < 0:
+                raise ValueError("Weights can't be negative")
+            self.weights[i] = float(weight)
+            touched.add(i // self.block)
+        for b in touched:
+            weights = self.weights[b * self.block:(b + 1) * self.block]
+            self._blocks[b] = alias_table(weights)
+            self._totals[b] = sum(weights)
+        self._rebuild_top()
+
+    def append(self, weight):
+        """Adds a weight on the end. Returns its index."""
+        if len(self.weights) % self.block == 0:
+            self._blocks.append(None)
+            self._totals.append(0.0)
+        self.weights.append(0.0)
+        self.update({len(self.weights) - 1: weight})
+        return len(self.weights) - 1
+
+    def sample(self, rng=None):
+        roll = (random if rng is None else rng).random
+        b = alias_pick(self._top, roll())
+        return b * self.block + alias_pick(self._blocks[b], roll())
+
+    def sample_many(self, n, rng=None):
+        """Picks n times. Quicker than calling sample() n times."""
+        roll = (random if rng is None else rng).random
+        if self._flat is None and n >= len(self.weights):
+            # A big batch pays for building one alias table for all the
+            # weights, which needs just one roll per pick. It's kept until a
+            # weight changes.
+            prob, alias = alias_table(self.weights)
+            self._flat = [i + p for i, p in enumerate(prob)], alias
+        if self._flat is None:
+            return [self.sample(rng) for _ in range(n)]
+        # As in alias_pick, but comparing the roll with i + prob[i] saves a subtraction.
+        cutoffs, alias = self._flat
+        size = len(cutoffs)
+        picks = []
+        append = picks.append
+        for _ in range(n):
+            r = roll() * size
+            i = int(r)
+            append(i if r < cutoffs[i] else alias[i])
+        return picks
+
+
+class Zone(object):
+    """
+    Somewhere wild pyokemon live: which species turn up, at which levels,
+    and how often.
+
+    :param entries: (species, level, weight) for everything that can turn up.
+        species is a class like pk.Pikachu.
+    """
+    def __init__(self, name, entries):
+        self.name = name
+        self.encounters = []
+        self._index = {}
+        weights = []
+        for species, level, weight in entries:
+            key = (species, level)
+            if key in self._index:
+                weights[self._index[key]] += weight
+            else:
+                self._index[key] = len(self.encounters)
+                self.encounters.append(key)
+                weights.append(weight)
+        self.table = AliasTable(weights)
+
+    def __repr__(self):
+        return "Zone({!r}, {} encounters)".format(self.name, len(self.encounters))
+
+    def sample(self, rng=None):
+        """Returns a random (species, level) from this zone."""
+        return self.encounters[self.table.sample(rng)]
+
+    def sample_many(self, n, rng=None):
+        """Returns n random (species, level)s from this zone."""
+        encounters = self.encounters
+        return [encounters[i] for i in self.table.sample_many(n, rng)]
+
+    def weight(self, species, level):
+        i = self._index.get((species, level))
+        return 0.0 if i is None else self.table.weights[i]
+
+    def set_weights(self, weights):
+        """
+        Changes how often things turn up, given {(species, level): weight}.
+        New species and levels are added; a weight of 0 stops one turning up.
+        """
+        changes = {}
+        for key, weight in weights.items():
+            if key not in self._index:
+                self._index[key] = self.table.append(0.0)
+                self.encounters.append(key)
+            changes[self._index[key]] = weight
+        self.table.update(changes)
+
+    def set_weight(self, species, level, weight):
+        self.set_weights({(species, level): weight})
+
+
+def zone(name, data):
+    """
+    Makes a Zone from plain data: a list of [species name, level, weight],
+    where level can also be [lowest, highest] to give every level in
+    between that weight.
+    """
+    entries = []
+    for species_name, levels, weight in data:
+        species = getattr(pk, species_name, None)
+        if not (isinstance(species, type) and issubclass(species, pk.Pyokemon)):
+            raise ValueError("Zone {}: there's no species called {}".format(name, species_name))
+        if isinstance(levels, int):
+            levels = [levels, levels]
+        for level in range(levels[0], levels[1] + 1):
+            entries.append((species, level, weight))
+    return Zone(name, entries)
+
+
+ZONES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'zones.json')
+
+
+def load_zones(path=ZONES_FILE):
+    """Reads {zone name: Zone} from a JSON file of {zone name: [[species, level, weight], ...]}."""
+    with open(path) as f:
+        return {name: zone(name, data) for name, data in json.load(f).items()}
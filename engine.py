@@ -0,0 +1,213 @@
+"""
+The rules of the game, with all of the talking taken out.
+
+game.py is written for a person sitting at a keyboard: every hit gets printed,
+every choice waits for input(). That is great for playing, but terrible if you
+want the computer to play thousands of battles on its own -- most of the time
+would go into formatting strings and writing them to the screen.
+
+This module contains the same rules as game.py, but instead of printing what
+happened, each function hands back a small record describing it. game.py uses
+these functions and passes the records to a presenter (see presenters.py),
+which decides how -- or whether -- to show them.
+"""
+import random
+import struct
+from collections import namedtuple
+from hashlib import blake2b
+from math import ceil
+
+import pyokemans as pk
+import rules
+
+# A namedtuple is a tuple whose slots also have names, so we can write
+# result.damage instead of result[5]. They are cheap to create and can't be
+# changed after the fact, which is what we want for a record of something
+# that already happened.
+
+# Everything that happened when one pyokemon attacked another.
+# status is one of 'supereffective', 'ineffective', 'a hit', or None for a miss.
+Attack = namedtuple("Attack", ["attacker", "defender", "move", "hit", "status", "damage", "fainted"])
+
+# One turn of a fight: the attacks in the order they happened, and whoever
+# fainted (or None).
+Round = namedtuple("Round", ["attacks", "fainter"])
+
+# The result of trying to capture a wild pyokemon.
+Capture = namedtuple("Capture", ["chance", "roll", "caught"])
+
+# The experience handed out after a wild pyokemon faints.
+Reward = namedtuple("Reward", ["pkmn", "xp", "old_level", "new_level"])
+
+
+def attack(attacker, defender, move=None, rng=None):
+    """
+    Handles an attack. Returns an Attack record.
+
+    Every function here takes an rng: something that rolls dice like the
+    random module does (see rng.py). Leave it out to use the random module.
+    """
+    if rng is None:
+        rng = random
+    if not move:
+        # Choose a random move
+        move = attacker.random_move(rng)
+    # Reduce move's PP by one
+    move.pp -= 1
+
+    # Calculate whether it hit or not. This just seemed like it worked OK.
+    hit_chance = rng.expovariate(defender.speed / attacker.speed)
+    if hit_chance < rules.active.miss_threshold:
+        return Attack(attacker, defender, move, False, None, 0, False)
+
+    # Get the effectiveness, if any. The type table (see typechart.py) is
+    # pk.pktypes[move.pktype].get(defender.pktype, 1), laid out by type ID.
+    table = pk.type_table()
+    effectiveness = table.effectiveness[move.type_id * table.size + defender.type_id]
+    if effectiveness == 2:
+        status = 'supereffective'
+    elif effectiveness == 0.5:
+        status = 'ineffective'
+    else:
+        status = 'a hit'
+
+    # The multiplier also includes the same-type attack bonus: an extra third
+    # if the attacker is using a move of their own type.
+    damage_multiplier = table.multipliers[
+        (move.type_id * table.size + attacker.type_id) * table.size + defender.type_id]
+
+    # Calculate the damage:
+    # We take the ceiling (smallest integer greater than the value)
+    # of a random integer between 0 and the attacker's attack score
+    # plus the power of the move itself
+    # times the damage multiplier
+    # divided by the defender's defense score.
+    # randrange(n) rolls exactly the same dice as randint(low, low + n - 1),
+    # with less work. (damage.py has these sums done ahead of time for every
+    # roll, for solver.py and ai.py, but looking a table up is no quicker
+    # than just doing them.)
+    low = attacker.attack // 2
+    damage = ceil((low + rng.randrange(attacker.attack - low + 1) + move.power) *
+                  (damage_multiplier / defender.defense))
+
+    # Take that amount off the defender's hit points.
+    defender.hp -= damage
+    return Attack(attacker, defender, move, True, status, damage, defender.hp == 0)
+
+
+def fight_round(p1, p2, p1move=None, p2move=None, rng=None):
+    """
+    Handles one fight turn. Returns a Round record.
+    """
+    if rng is None:
+        rng = random
+    # Pick a random move if either one was not specified.
+    if not p1move:
+        p1move = p1.random_move(rng)
+    if not p2move:
+        p2move = p2.random_move(rng)
+
+    # Given p1 and p2, pick one who attacks first.
+    # Random integer between 0 and 10 plus their speed.
+    p1sp = rng.randint(0, 10) + p1.speed
+    p2sp = rng.randint(0, 10) + p2.speed
+
+    if p1sp > p2sp:
+        order = ((p1, p2, p1move), (p2, p1, p2move))
+    else:
+        order = ((p2, p1, p2move), (p1, p2, p1move))
+
+    attacks = []
+    for attacker, defender, move in order:
+        result = attack(attacker, defender, move=move, rng=rng)
+        attacks.append(result)
+        if result.fainted:
+            return Round(attacks, defender)
+    # If no one faints, the fainter is None.
+    return Round(attacks, None)
+
+
+def run_away(rng=None):
+    """
+    Running away has a flat chance of success: rules.active.run_odds, which
+    is 2 in 5 unless you change it. Returns True if we got away.
+    """
+    if rng is None:
+        rng = random
+    chances, out_of = rules.active.run_odds
+    return rng.randint(0, out_of - 1) >= out_of - chances
+
+
+def capture(wild_pkmn, rng=None):
+    """
+    Rolls for a capture. Returns a Capture record.
+
+    Chance is directly tied to the wild pokemon's current HP.
+    If they are at full strength, catching them is impossible.
+    If they are at 75%, the chance is 25%.
+    """
+    if rng is None:
+        rng = random
+    chance = (1 - (wild_pkmn.hp / wild_pkmn.max_hp))
+    roll = rng.random()
+    return Capture(chance, roll, roll <= chance)
+
+
+def reward(winner, loser):
+    """Gives the winner an XP bonus equal to ten times the loser's level. Returns a Reward record."""
+    old_level = winner.level
+    xpgain = loser.level * 10
+    winner.xp += xpgain
+    return Reward(winner, xpgain, old_level, winner.level)
+
+
+def battle(p1, p2, max_rounds=None, rng=None):
+    """
+    Fights p1 and p2 with random moves until one of them faints.
+    Returns the list of Rounds that were fought.
+
+    If max_rounds is given, stops after that many rounds even if nobody fainted.
+    """
+    rounds = []
+    while max_rounds is None or len(rounds) < max_rounds:
+        result = fight_round(p1, p2, rng=rng)
+        rounds.append(result)
+        if result.fainter:
+            break
+    return rounds
+
+
+# SNAPSHOTS
+# Trying something out in a battle and then going back -- in a search like
+# ai.py, or to ask "what if I'd used Ember?" -- used to mean copy.deepcopy,
+# which copies every object inside both pyokemon. A snapshot is only the
+# numbers that a battle can change, in a tuple, so it's quick to take, quick
+# to put back, and can't be changed by accident.
+
+def snapshot(*pkmns):
+    """
+    Returns the state of a battle between pkmns: a tuple of each one's
+    Pyokemon.snapshot(). Snapshots are made of ints, so they can be compared,
+    put in sets and used as dictionary keys, and hash() of one is the same
+    every time Python runs.
+    """
+    return tuple([pkmn.snapshot() for pkmn in pkmns])
+
+
+def restore(state, *pkmns):
+    """Puts pkmns back the way they were when snapshot(*pkmns) returned state."""
+    for pkmn, pkmn_state in zip(pkmns, state):
+        pkmn.restore(pkmn_state)
+
+
+def state_hash(state):
+    """
+    A 64-bit hash of a snapshot that comes out the same on every machine and
+    every version of Python, for saving to disk or sending to another program.
+    """
+    numbers = []
+    for pkmn_state in state:
+        numbers.append(len(pkmn_state))
+        numbers.extend(pkmn_state)
+    packed = struct.pack('<{}q'.format(len(numbers)), *numbers)
+    return int.from_bytes(blake2b(packed, digest_size=8).digest(), 'little')
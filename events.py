@@ -0,0 +1,259 @@
+"""
+A log of what happened in a game, instead of a screen full of text.
+
+TextPresenter formats and prints a line for every hit, miss and level up.
+That's what you want when somebody is watching, but printing is slow, and
+once it's text it's hard to ask questions like "how often did Pikachu
+miss?". EventPresenter writes down small typed records -- events --
+instead, and only turns them into text if you ask for it later:
+
+    import events, game
+    from presenters import TextPresenter
+    with events.EventWriter('game.jsonl') as log:
+        game.wild_battle(me, presenter=events.EventPresenter(log.write, answers=TextPresenter()))
+    events.render(events.read('game.jsonl'))     # prints exactly what TextPresenter would have
+
+Every event names the pyokemon involved by name, since the pyokemon
+themselves don't fit in a file.
+
+EventWriter saves events in batches. A batch is written once it has enough
+events in it, or once enough time has passed since the last one -- even if
+the game has gone quiet, so somebody watching the file never waits longer
+than that. Writing an event is usually just adding it to a list. Logs are
+JSON lines (one event per line, easy to read with anything) or, with
+binary=True, marshal (smaller and quicker to read back, but only by Python).
+"""
+import json
+import marshal
+import struct
+import sys
+import threading
+from collections import namedtuple
+from time import monotonic
+
+import engine
+from presenters import Presenter, TextPresenter
+
+# An attack: who used which move on whom. It's followed by a Miss or a Damage.
+Attack = namedtuple("Attack", ["attacker", "defender", "move"])
+Miss = namedtuple("Miss", ["attacker", "move"])
+# status is 'supereffective', 'ineffective' or 'a hit'; hp is what the defender has left.
+Damage = namedtuple("Damage", ["defender", "status", "damage", "hp"])
+Faint = namedtuple("Faint", ["pkmn"])
+XPGain = namedtuple("XPGain", ["pkmn", "xp"])
+LevelUp = namedtuple("LevelUp", ["pkmn", "level"])
+Capture = namedtuple("Capture", ["pkmn", "chance", "roll", "caught"])
+# A pyokemon was sent out to fight.
+Switch = namedtuple("Switch", ["pkmn"])
+Heal = namedtuple("Heal", ["pkmn", "hp"])
+# Everything else the game says (menus, greetings, ...), with print()'s end.
+Say = namedtuple("Say", ["text", "end"])
+# A question, and the answer it got.
+Ask = namedtuple("Ask", ["prompt", "answer"])
+
+EVENTS = [Attack, Miss, Damage, Faint, XPGain, LevelUp, Capture, Switch, Heal, Say, Ask]
+_BY_NAME = {event.__name__: event for event in EVENTS}
+_CODES = {event: code for code, event in enumerate(EVENTS)}
+
+# The start of every binary log, so read() can tell them from JSON lines.
+MAGIC = b'PYEV1\n'
+
+# json.dumps makes a new encoder every time it's given options; this one is made once.
+_encode = json.JSONEncoder(separators=(',', ':')).encode
+
+
+class EventPresenter(Presenter):
+    """
+    A presenter that turns everything the game tells it into events, and
+    hands each one to write (EventWriter.write, or list.append).
+
+    :param answers: A presenter to ask for answers. Nothing else is sent to it.
+        Every question and answer is written down too, as an Ask event.
+    """
+    def __init__(self, write, answers=None):
+        self.write = write
+        self.answers = answers
+
+    def say(self, *args, sep=' ', end='\n', flush=False):
+        self.write(Say(sep.join(str(arg) for arg in args), end))
+
+    def ask(self, prompt):
+        if self.answers is None:
+            raise NotImplementedError("This EventPresenter has nobody to ask. Pass it answers=.")
+        answer = self.answers.ask(prompt)
+        self.write(Ask(prompt, answer))
+        return answer
+
+    def attacked(self, result):
+        self.write(Attack(result.attacker.name, result.defender.name, result.move.name))
+        if result.hit:
+            self.write(Damage(result.defender.name, result.status, result.damage, result.defender.hp))
+        else:
+            self.write(Miss(result.attacker.name, result.move.name))
+
+    def fainted(self, pkmn):
+        self.write(Faint(pkmn.name))
+
+    def gained_xp(self, pkmn, xp):
+        self.write(XPGain(pkmn.name, xp))
+
+    def leveled_up(self, pkmn):
+        self.write(LevelUp(pkmn.name, pkmn.level))
+
+    def sent_out(self, pkmn):
+        self.write(Switch(pkmn.name))
+
+    def rolled_capture(self, pkmn, result):
+        self.write(Capture(pkmn.name, result.chance, result.roll, result.caught))
+
+    def healed(self, pkmn):
+        self.write(Heal(pkmn.name, pkmn.hp))
+
+
+class EventWriter(object):
+    """
+    Saves events to a file in batches.
+
+    :param path: The file to write. It's started afresh.
+    :param batch_size: Write a batch once it has this many events...
+    :param interval: ...or once this many seconds have passed since the last
+        one. A background thread keeps an eye on the time, so this holds even
+        when no more events come along. None means only batch_size counts.
+    :param binary: Write marshal instead of JSON lines.
+    """
+    def __init__(self, path, batch_size=1000, interval=1.0, binary=False):
+        self.batch_size = batch_size
+        self.interval = interval
+        self.binary = binary
+        self.file = open(path, 'wb')
+        if binary:
+            self.file.write(MAGIC)
+        self.batch = []
+        self.last_flush = monotonic()
+        # The game and the timer thread both write batches, so they take
+        # turns using this lock.
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._timer = None
+        if interval is not None:
+            self._timer = threading.Thread(target=self._flush_on_time, daemon=True)
+            self._timer.start()
+
+    def write(self, event):
+        with self._lock:
+            self.batch.append(event)
+            if len(self.batch) >= self.batch_size or (
+                    self.interval is not None and monotonic() - self.last_flush >= self.interval):
+                self._flush()
+
+    def _flush_on_time(self):
+        # Sleep until the batch is due, write it if there's anything in it,
+        # and go back to sleep. wait() returns True as soon as we're closed.
+        timeout = self.interval
+        while not self._closed.wait(timeout):
+            with self._lock:
+                due = self.last_flush + self.interval - monotonic()
+                if due <= 0:
+                    if self.batch:
+                        self._flush()
+                    due = self.interval
+            timeout = due
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        if self.batch:
+            if self.binary:
+                # Each batch is its length, then a marshalled list of
+                # (event type number, field, field, ...) tuples.
+                data = marshal.dumps([(_CODES[type(event)],) + tuple(event) for event in self.batch])
+                self.file.write(struct.pack('<I', len(data)) + data)
+            else:
+                lines = [_encode([type(event).__name__] + list(event)) for event in self.batch]
+                self.file.write(("\n".join(lines) + "\n").encode())
+            del self.batch[:]
+        self.file.flush()
+        self.last_flush = monotonic()
+
+    def close(self):
+        self._closed.set()
+        if self._timer is not None:
+            self._timer.join()
+        self.flush()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+
+def read(path):
+    """Reads the events back out of a file from EventWriter, one at a time."""
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) == MAGIC:
+            while True:
+                header = f.read(4)
+                if not header:
+                    return
+                for fields in marshal.loads(f.read(struct.unpack('<I', header)[0])):
+                    yield EVENTS[fields[0]](*fields[1:])
+        else:
+            f.seek(0)
+            for line in f:
+                fields = json.loads(line)
+                yield _BY_NAME[fields[0]](*fields[1:])
+
+
+# Stand-ins for the pyokemon and moves in an event, with just enough of
+# them for TextPresenter to print.
+_Named = namedtuple("_Named", ["name", "level"])
+
+
+def render(events, presenter=None):
+    """
+    Turns events back into text, by telling presenter (by default a
+    TextPresenter, which prints to the screen) about each one. You get
+    exactly the text TextPresenter would have printed during the game.
+    """
+    if presenter is None:
+        presenter = TextPresenter()
+    attack = None
+    for event in events:
+        kind = type(event)
+        if kind is Say:
+            presenter.say(event.text, end=event.end)
+        elif kind is Attack:
+            # Printed once we know whether it hit.
+            attack = event
+        elif kind is Miss or kind is Damage:
+            hit = kind is Damage
+            presenter.attacked(engine.Attack(
+                _Named(attack.attacker, None), _Named(attack.defender, None), _Named(attack.move, None),
+                hit, event.status if hit else None, event.damage if hit else 0, hit and event.hp == 0))
+        elif kind is Faint:
+            presenter.fainted(_Named(event.pkmn, None))
+        elif kind is XPGain:
+            presenter.gained_xp(_Named(event.pkmn, None), event.xp)
+        elif kind is LevelUp:
+            presenter.leveled_up(_Named(event.pkmn, event.level))
+        elif kind is Switch:
+            presenter.sent_out(_Named(event.pkmn, None))
+        elif kind is Capture:
+            presenter.rolled_capture(_Named(event.pkmn, None), engine.Capture(event.chance, event.roll, event.caught))
+        elif kind is Heal:
+            presenter.healed(_Named(event.pkmn, None))
+        elif kind is Ask:
+            # input() prints the question, but the answer is typed, not printed.
+            presenter.say(event.prompt, end='')
+
+
+def main(path):
+    render(read(path))
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
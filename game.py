@@ -1,194 +1,213 @@
+import asyncio
 import random
-from math import ceil, floor
 from time import sleep
 
+import engine
+import metrics
 import pyokemans as pk
-
-
-def strategy_run(attacker, defender):
-    """Running away has a flat 75% chance of success,
-    although obviously we could change that here.
+from encounters import EncounterPool
+from presenters import TextPresenter
+
+# Everything the game shows or asks goes through a presenter (see presenters.py).
+# By default that's the screen and the keyboard. Every function below also
+# takes a presenter argument, so you can play one battle silently without
+# changing this module-wide default:
+#
+#     from presenters import Presenter
+#     fight_round(a, b, presenter=Presenter())
+#
+# In the same way, every function that rolls dice takes an rng argument
+# (see rng.py). Leave it out and the random module rolls them.
+presenter = TextPresenter()
+
+
+def _presenter(p):
+    """Returns p, or the module-wide presenter if p is None."""
+    return presenter if p is None else p
+
+
+# DIALOGUES
+# Some parts of the game need to stop and wait for the player to answer a
+# question. If they just called input(), the whole program would stop with
+# them -- fine for one player, hopeless for a server with thousands.
+#
+# So those parts are written as *generators* instead. Where they need an
+# answer, they write
+#
+#     answer = yield "Which move?> "
+#
+# which hands the question to whoever is running the generator, and pauses
+# until that someone sends back an answer. run_dialogue below answers by
+# calling presenter.ask, which is what you get when you call wild_battle();
+# server.py answers with whatever arrives over the network instead.
+# A dialogue can run another dialogue with "yield from".
+
+def run_dialogue(steps, presenter=None):
     """
-    if random.randint(0, 4) >= 3:
-        # 75% chance
-        print("Got away safely!")
+    Plays out a dialogue, asking presenter for every answer.
+    Returns whatever the dialogue returns.
+    """
+    presenter = _presenter(presenter)
+    answer = None
+    while True:
+        try:
+            # The first time round, send(None) starts the dialogue going.
+            prompt = steps.send(answer)
+        except StopIteration as finished:
+            return finished.value
+        answer = presenter.ask(prompt)
+
+
+def strategy_run(attacker, defender, presenter=None, rng=None, move=None):
+    """Running away has a flat chance of success, set by the rules
+    (rules.active.run_odds -- 2 in 5 unless you change it).
+    If we don't get away, the attacker attacks with move (or a random one).
+    """
+    presenter = _presenter(presenter)
+    escaped = engine.run_away(rng)
+    metrics.count('pyokemon_runs_total', outcome='escaped' if escaped else 'failed')
+    if escaped:
+        presenter.say("Got away safely!")
         return True
     else:
-        print("Can't escape!")
+        presenter.say("Can't escape!")
         # The attacker attacks!
-        strategy_attack(attacker, defender)
+        strategy_attack(attacker, defender, move=move, presenter=presenter, rng=rng)
         return False
 
 
-def strategy_attack(attacker, defender, move=None):
-    """Handles an attack.
+def strategy_attack(attacker, defender, move=None, presenter=None, rng=None):
+    """Handles an attack. Returns True if the defender fainted.
+    The rules themselves live in engine.attack.
     """
-    if not move:
-        # Choose a random move
-        move = attacker.random_move()
-    # Reduce move's PP by one
-    move.pp -= 1
-
-    print("\n{} used {}!".format(attacker.name, move.name))
-    
-    # Calculate whether it hit or not. This just seemed like it worked OK.
-    hit_chance = random.expovariate(defender.speed / attacker.speed)
-    if hit_chance < 0.25:
-        print("{}'s {} missed!".format(attacker.name, move.name))
-        return False
-
-    # Get the effectiveness, if any
-    damage_multiplier = pk.pktypes[move.pktype].get(defender.pktype, 1)
-    if damage_multiplier == 2:
-        status = 'supereffective'
-    elif damage_multiplier == 0.5:
-        status = 'ineffective'
-    else:
-        status = 'a hit'
-
-    # Same-type attack bonus: Add an extra third to the multiplier if the attacker is
-    # using a move of their own type.
-    if move.pktype == attacker.pktype:
-        damage_multiplier += 0.33
-        
-    # Calculate the damage:
-    # We take the ceiling (smallest integer greater than the value)
-    # of a random integer between 0 and the attacker's attack score
-    # plus the power of the move itself
-    # times the damage multiplier
-    # divided by the defender's defense score.
-    damage = ceil(
-            (random.randint(floor(attacker.attack/2), attacker.attack) + move.power) *
-            (damage_multiplier / defender.defense)
-            )
-    
-    # Take that amount off the defender's hit points.
-    defender.hp -= damage
-
-    print("It's {}! Does {} damage!".format(status, damage))
-    if defender.hp == 0:
-        # If they faint, return True
-        # TODO this is probably a bad idea and we should return something
-        # more useful or meaningful
-        return True
-    else:
-        return False
+    result = engine.attack(attacker, defender, move=move, rng=rng)
+    if metrics.enabled:
+        _count_attack(result)
+    _presenter(presenter).attacked(result)
+    # TODO this is probably a bad idea and we should return something
+    # more useful or meaningful (engine.attack does!)
+    return result.fainted
 
 
-def fight_round(p1, p2, p1move=None, p2move=None):
+def fight_round(p1, p2, p1move=None, p2move=None, presenter=None, rng=None):
     """
     Handles one fight turn.
     Returns whoever faints first, or None.
     """
-    # Pick a random move if either one was not specified.
-    if not p1move:
-        p1move = p1.random_move()
-    if not p2move:
-        p2move = p2.random_move()
-
-    # Given p1 and p2, pick one who attacks first.
-    # Random integer between 0 and 10 plus their speed.
-    p1sp = random.randint(0, 10) + p1.speed
-    p2sp = random.randint(0, 10) + p2.speed
-    
-    if p1sp > p2sp:
-        # Recall that strategy_attack returns True if the defender faints.
-        # We return the object of the defender if they do faint.
-        if strategy_attack(p1, p2, move=p1move):
-            return p2
-        if strategy_attack(p2, p1, move=p2move):
-            return p1
+    presenter = _presenter(presenter)
+    result = engine.fight_round(p1, p2, p1move=p1move, p2move=p2move, rng=rng)
+    for attack in result.attacks:
+        if metrics.enabled:
+            _count_attack(attack)
+        presenter.attacked(attack)
+    return result.fainter
+
+
+def _count_attack(result):
+    """Counts an engine.Attack in the metrics (see metrics.py)."""
+    if result.hit:
+        metrics.count('pyokemon_attacks_total', status=result.status)
+        metrics.observe('pyokemon_damage', result.damage)
     else:
-        if strategy_attack(p2, p1, move=p2move):
-            return p1
-        if strategy_attack(p1, p2, move=p1move):
-            return p2
-    # If no one faints, we return None.
-    return None
+        metrics.count('pyokemon_attacks_total', status='miss')
 
 
-def strategy_switch(trainer):
+def strategy_switch(trainer, presenter=None):
     """Handles switching out the active pyokemon, whether as a move or due to a fainting"""
+    return run_dialogue(strategy_switch_dialogue(trainer, presenter), presenter)
+
+
+def strategy_switch_dialogue(trainer, presenter=None):
+    """The dialogue behind strategy_switch."""
+    presenter = _presenter(presenter)
     # Get all pokemon with hitpoints
     valid_pkmn = [pk for pk in trainer.roster if pk.hp > 0]
     # If there are none, return None
     if valid_pkmn == []:
         return None
-    
-    print("Choose a pyokemon to send out!")
+
+    presenter.say("Choose a pyokemon to send out!")
     choices = enumerate(valid_pkmn)
 
     def list_pkmn():
         for idx, pkmn in choices:
-            print("\t{}) {}: species {}, type {}, {} HP remaining"
-                  .format(idx+1, pkmn.name, pkmn.species, pkmn.pktype, pkmn.hp))
+            presenter.say("\t{}) {}: species {}, type {}, {} HP remaining"
+                          .format(idx+1, pkmn.name, pkmn.species, pkmn.pktype, pkmn.hp))
 
     list_pkmn()
-    pkmn_choice = input("Enter number for your choice, or 'list' to see your choices> ")
+    pkmn_choice = yield "Enter number for your choice, or 'list' to see your choices> "
     new_pkmn = None
     while not new_pkmn:
         if not (pkmn_choice.isdigit() and len(pkmn_choice) == 1):
             if pkmn_choice == 'list':
                 list_pkmn()
             else:
-                print("Sorry, that's not a valid choice.")
+                presenter.say("Sorry, that's not a valid choice.")
         else:
             try:
                 new_pkmn = valid_pkmn[int(pkmn_choice) - 1]
                 break
             except IndexError:
-                print("Sorry, that's not a valid choice")
-        pkmn_choice = input("Enter number for your choice, or 'list' to see your choices> ")
+                presenter.say("Sorry, that's not a valid choice")
+        pkmn_choice = yield "Enter number for your choice, or 'list' to see your choices> "
     return new_pkmn
 
 
-def choose_move(valid_moves):
+def choose_move(valid_moves, presenter=None):
+    return run_dialogue(choose_move_dialogue(valid_moves, presenter), presenter)
+
+
+def choose_move_dialogue(valid_moves, presenter=None):
+    """The dialogue behind choose_move."""
+    presenter = _presenter(presenter)
     if valid_moves == []:
-        print("No moves left!")
+        presenter.say("No moves left!")
         return pk.Struggle
 
-    print("Choose a move!")
+    presenter.say("Choose a move!")
     choices_moves = enumerate(valid_moves)
 
     def list_moves():
         for idx, mv in choices_moves:
-            print("\t{}) {}: type {}, power {}, remaining move points: {}"
-                  .format(idx + 1, mv.name, mv.pktype, mv.power, mv.pp))
+            presenter.say("\t{}) {}: type {}, power {}, remaining move points: {}"
+                          .format(idx + 1, mv.name, mv.pktype, mv.power, mv.pp))
 
     list_moves()
-    move_choice = input("Enter number of move, or 'list' to see your choices> ")
+    move_choice = yield "Enter number of move, or 'list' to see your choices> "
     move = None
     while not move:
         if not (move_choice.isdigit() and len(move_choice) == 1):
             if move_choice == 'list':
                 list_moves()
             else:
-                print("Sorry, that's not a move.")
+                presenter.say("Sorry, that's not a move.")
         else:
             try:
                 move = valid_moves[int(move_choice) - 1]
                 break
             except IndexError:
-                print("Sorry, that's not a move.")
+                presenter.say("Sorry, that's not a move.")
 
-        move_choice = input("Enter number of move, or 'list' to see your choices> ")
+        move_choice = yield "Enter number of move, or 'list' to see your choices> "
 
     return move
 
 
-def strategy_capture(wild_pkmn, trainer):
-    # Chance is directly tied to the wild pokemon's current HP.
-    # If they are at full strength, catching them is impossible.
-    # If they are at 75%, the chance is 25%.
-    chance = (1 - (wild_pkmn.hp / wild_pkmn.max_hp))
-    print("Chance: {}".format(chance))
-    roll = random.random()
-    print("Rolled: {}".format(roll))
-    if roll <= chance:
-        print("Wild {} was caught!".format(wild_pkmn.name))
+def strategy_capture(wild_pkmn, trainer, presenter=None, rng=None):
+    return run_dialogue(strategy_capture_dialogue(wild_pkmn, trainer, presenter, rng), presenter)
+
+
+def strategy_capture_dialogue(wild_pkmn, trainer, presenter=None, rng=None):
+    """The dialogue behind strategy_capture."""
+    presenter = _presenter(presenter)
+    # The odds are worked out in engine.capture.
+    result = engine.capture(wild_pkmn, rng)
+    metrics.count('pyokemon_captures_total', outcome='caught' if result.caught else 'failed')
+    presenter.rolled_capture(wild_pkmn, result)
+    if result.caught:
         if len(trainer.roster) < 6:
             wild_pkmn.heal()
-            nickname = input("What would you like to call your new {}?> ".format(wild_pkmn.name))
+            nickname = yield "What would you like to call your new {}?> ".format(wild_pkmn.name)
             wild_pkmn.nickname = nickname
             trainer.add_pkmn(wild_pkmn)
             return True
@@ -199,123 +218,212 @@ def strategy_capture(wild_pkmn, trainer):
         return False
 
 
-def wild_battle(trainer):
+# Wild pyokemon are recycled from one battle to the next. See encounters.py.
+wild_pool = EncounterPool()
+
+
+def wild_battle(trainer, presenter=None, rng=None, ai=None, pool=None, zone=None):
     """
     Plays out a battle with a random wild pyokemon.
+
+    The wild pyokemon picks its moves at random, unless you pass an ai:
+    something with a choose(me, opponent) method that returns a move, like
+    ai.ExpectimaxAI.
+
+    :param pool: The encounters.EncounterPool the wild pyokemon comes from.
+        By default, wild_pool.
+    :param zone: The encounters.Zone the battle is in, which decides what
+        turns up. By default it's a Diglett, Pidgey or Pikachu of level 2 to 10.
     """
-    # Choose a wild pokemon from our extras.
-    wild_pyokemon_species = random.choice([pk.Diglett, pk.Pidgey, pk.Pikachu])
-    # Level between 2 and 10
-    wild_level = random.randint(2, 10)
-    # Actually create the wild pyokemon object at the level chosen.
-    wild_pkmn = wild_pyokemon_species(wild_level)
-
-    print("A wild {} appeared!".format(wild_pkmn.name))
+    return run_dialogue(wild_battle_dialogue(trainer, presenter, rng, ai, pool, zone), presenter)
+
+
+def wild_battle_dialogue(trainer, presenter=None, rng=None, ai=None, pool=None, zone=None):
+    """The dialogue behind wild_battle."""
+    presenter = _presenter(presenter)
+    if rng is None:
+        rng = random
+    if pool is None:
+        pool = wild_pool
+    # A random wild pyokemon from the zone (or one of our extras, between levels 2 and 10).
+    wild_pkmn = pool.draw(rng, zone)
+    try:
+        return (yield from _wild_battle_dialogue(trainer, wild_pkmn, presenter, rng, ai))
+    finally:
+        # However the battle ended, the wild pyokemon is done with. If it was
+        # caught it's the trainer's now; otherwise it can go back in the pool.
+        # getattr, because if trainer isn't a Trainer at all, the battle has
+        # already raised the error that says so, and we shouldn't add another.
+        if any(pkmn is wild_pkmn for pkmn in getattr(trainer, 'roster', ())):
+            pool.adopted(wild_pkmn)
+        else:
+            pool.release(wild_pkmn)
+
+
+def _wild_battle_dialogue(trainer, wild_pkmn, presenter, rng, ai):
+    def wild_move():
+        # None tells the engine to pick a random move.
+        return ai.choose(wild_pkmn, trainer_pkmn) if ai else None
+
+    presenter.say("A wild {} appeared!".format(wild_pkmn.name))
     roster = [pkmn for pkmn in trainer.roster if pkmn.hp > 0]
 
     try:
         trainer_pkmn = roster[0]
     except IndexError:
-        print("You have no healthy pyokemon! Go to a pyokemon center and heal your team.")
+        presenter.say("You have no healthy pyokemon! Go to a pyokemon center and heal your team.")
         return
 
-    print("Go, {}!".format(trainer_pkmn.name))
+    presenter.sent_out(trainer_pkmn)
+    turns = 0
     # Should go on forever, until we return.
     while True:
 
-        print("\nRun, fight, capture, switch, or status?")
-        strategy = input("> ").lower()
+        presenter.say("\nRun, fight, capture, switch, or status?")
+        strategy = (yield "> ").lower()
         while strategy not in ['run', 'fight', 'capture', 'status', 'switch']:
-            print("Sorry, invalid move.",
-                  "Please type either 'run', 'fight', 'capture', 'switch', or 'status'.")
-            strategy = input("> ").lower()
-
-        if strategy == 'run':
-            if strategy_run(wild_pkmn, trainer_pkmn):
-                # We succeeded! We break out of the while loop and exit the function.
-                break
-
-        elif strategy == 'capture':
-            if strategy_capture(wild_pkmn, trainer):
-                break
-            else:
-                print("Capture failed!")
-                strategy_attack(wild_pkmn, trainer_pkmn)
-
-        elif strategy == 'switch':
-            new_pkmn = strategy_switch(trainer)
-            if new_pkmn == trainer_pkmn:
-                print("{} is already out!".format(new_pkmn.name))
-                # Continue restarts the loop from the top
+            presenter.say("Sorry, invalid move.",
+                          "Please type either 'run', 'fight', 'capture', 'switch', or 'status'.")
+            strategy = (yield "> ").lower()
+
+        turns += 1
+        # Time each strategy, but not the time spent waiting for answers.
+        watch = metrics.stopwatch()
+        try:
+            if strategy == 'run':
+                if strategy_run(wild_pkmn, trainer_pkmn, presenter=presenter, rng=rng, move=wild_move()):
+                    # We succeeded! We break out of the while loop and exit the function.
+                    break
+
+            elif strategy == 'capture':
+                if (yield from watch.during(strategy_capture_dialogue(wild_pkmn, trainer, presenter, rng))):
+                    break
+                else:
+                    presenter.say("Capture failed!")
+                    strategy_attack(wild_pkmn, trainer_pkmn, move=wild_move(), presenter=presenter, rng=rng)
+
+            elif strategy == 'switch':
+                new_pkmn = yield from watch.during(strategy_switch_dialogue(trainer, presenter))
+                if new_pkmn == trainer_pkmn:
+                    presenter.say("{} is already out!".format(new_pkmn.name))
+                    # Continue restarts the loop from the top
+                    continue
+                else:
+                    # Replace trainer
+                    trainer_pkmn = new_pkmn
+                    presenter.sent_out(trainer_pkmn)
+                    strategy_attack(wild_pkmn, trainer_pkmn, move=wild_move(), presenter=presenter, rng=rng)
+
+            elif strategy == 'status':
+                presenter.say("Your level {} {} has {} HP remaining.".format(trainer_pkmn.level, trainer_pkmn.name, trainer_pkmn.hp))
+                presenter.say("The wild level {} {} has {} HP remaining.".format(wild_pkmn.level, wild_pkmn.name, wild_pkmn.hp))
                 continue
-            else:
-                # Replace trainer
-                trainer_pkmn = new_pkmn
-                print("Go, {}!".format(trainer_pkmn.name))
-                strategy_attack(wild_pkmn, trainer_pkmn)
 
-        elif strategy == 'status':
-            print("Your level {} {} has {} HP remaining.".format(trainer_pkmn.level, trainer_pkmn.name, trainer_pkmn.hp))
-            print("The wild level {} {} has {} HP remaining.".format(wild_pkmn.level, wild_pkmn.name, wild_pkmn.hp))
-            continue
+            elif strategy == 'fight':
+                valid_moves = [move for move in trainer_pkmn.moves if move.pp > 0]
+                move = yield from watch.during(choose_move_dialogue(valid_moves, presenter))
 
-        elif strategy == 'fight':
-            valid_moves = [move for move in trainer_pkmn.moves if move.pp > 0]
-            move = choose_move(valid_moves)
-
-            fainter = fight_round(trainer_pkmn, wild_pkmn, p1move=move)
-            if fainter:
-                print("{} fainted!".format(fainter.name))
+                fainter = fight_round(trainer_pkmn, wild_pkmn, p1move=move, p2move=wild_move(),
+                                      presenter=presenter, rng=rng)
+                if fainter:
+                    presenter.fainted(fainter)
+        finally:
+            watch.record('pyokemon_strategy_seconds', strategy=strategy)
 
         # Strategy ends here. If a branch doesn't contain a "break" or "continue", they end up here.
         if trainer_pkmn.hp == 0:
-            new_pkmn = strategy_switch(trainer)
+            new_pkmn = yield from strategy_switch_dialogue(trainer, presenter)
             if new_pkmn:
                 trainer_pkmn = new_pkmn
-                print("Go, {}!".format(trainer_pkmn.name))
+                presenter.sent_out(trainer_pkmn)
             else:
-                print("You have no healthy pyokemon!",
-                      "Go to a pyokemon center and heal your team.")
+                presenter.say("You have no healthy pyokemon!",
+                              "Go to a pyokemon center and heal your team.")
                 break
 
         if wild_pkmn.hp == 0:
             # Give an XP bonus equal to ten times the level.
-            oldl = trainer_pkmn.level
-            xpgain = wild_pkmn.level * 10
-            print("{} gained {} XP!".format(trainer_pkmn.name, xpgain))
-            trainer_pkmn.xp += xpgain
-            if trainer_pkmn.level > oldl:
-                print("{} is now level {}!".format(trainer_pkmn.name, trainer_pkmn.level))
+            result = engine.reward(trainer_pkmn, wild_pkmn)
+            presenter.gained_xp(trainer_pkmn, result.xp)
+            if result.new_level > result.old_level:
+                presenter.leveled_up(trainer_pkmn)
             break
 
-def pyokemon_center(trainer):
+    metrics.count('pyokemon_battles_total')
+    metrics.observe('pyokemon_battle_turns', turns)
+
+
+def heal_rosters(trainers, presenter=None):
     """
-    Pyokemon center. Heals your entire roster and restores the PP of all their moves.
-    Also, contains a suprise egg.
+    Heals every pyokemon of every trainer given, all at once and without any
+    of the pyokemon center's ceremony. Returns how many pyokemon were healed.
     """
-    def _pyokemon_center(trainer):
-        print("Hello! Welcome to the Pyokemon Center! We'll heal your pyokemons up good.")
-        for pkmn in trainer.roster:
-            for _ in range(0, 5):
-                print('.', end="", flush=True)
-                sleep(0.2)
-            pkmn.heal()
-            print("\nYour {} is feeling much better now!\n".format(pkmn.name))
-        print("You're good to go! Have fun!")
-    
-    def _deutschen_pyokemon_center(trainer):
-        print("You walk into the Pyokemon Center. For some reason, everyone here is german.")
-        print("-"*80)
-        print("GUTEN TAG! WILKOMMEN TO DAS PYOKEMONZENTRUM")
+    healed = 0
+    for trainer in trainers:
         for pkmn in trainer.roster:
-            for _ in range(0, 5):
-                print('.', end="", flush=True)
-                sleep(0.2)
             pkmn.heal()
-            print("\nYOUR {} IS FEELING ITSELF MUCH BESSER NOW\n".format(pkmn.name))
-        print("ALLE DEINE POKEMON SIND SEHR GUT. TSCHAÜ!")
+            if presenter is not None:
+                presenter.healed(pkmn)
+            healed += 1
+    return healed
+
 
-    if random.random() <= 0.1:
-        _deutschen_pyokemon_center(trainer)
+def center_script(trainer, german=False):
+    """
+    The flavour text for one trainer's visit to the pyokemon center.
+    Generates (text, print keyword arguments, pause) for each thing that gets
+    said; pause is how many beats to wait afterwards.
+    """
+    dot = ('.', {'end': "", 'flush': True}, 1)
+    if german:
+        yield ("You walk into the Pyokemon Center. For some reason, everyone here is german.", {}, 0)
+        yield ("-"*80, {}, 0)
+        yield ("GUTEN TAG! WILKOMMEN TO DAS PYOKEMONZENTRUM", {}, 0)
+        healed = "\nYOUR {} IS FEELING ITSELF MUCH BESSER NOW\n"
+        goodbye = "ALLE DEINE POKEMON SIND SEHR GUT. TSCHAÜ!"
     else:
-        _pyokemon_center(trainer)
+        yield ("Hello! Welcome to the Pyokemon Center! We'll heal your pyokemons up good.", {}, 0)
+        healed = "\nYour {} is feeling much better now!\n"
+        goodbye = "You're good to go! Have fun!"
+    for pkmn in trainer.roster:
+        for _ in range(0, 5):
+            yield dot
+        yield (healed.format(pkmn.name), {}, 0)
+    yield (goodbye, {}, 0)
+
+
+def _visit(trainer, presenter, rng):
+    """Heals a trainer's roster, and returns the flavour text to go with it."""
+    # Is it the surprise egg? Decided first, like it always was.
+    german = (random if rng is None else rng).random() <= 0.1
+    with metrics.timer('pyokemon_heal_seconds'):
+        heal_rosters([trainer], presenter)
+    return center_script(trainer, german)
+
+
+def pyokemon_center(trainer, presenter=None, rng=None, delay=0.2):
+    """
+    Pyokemon center. Heals your entire roster and restores the PP of all their moves.
+    Also, contains a suprise egg.
+
+    The healing happens straight away; the little animation afterwards is
+    just for show, and waits delay seconds per beat. Pass delay=0 to skip the
+    waiting, or use heal_rosters to skip the show altogether.
+    """
+    presenter = _presenter(presenter)
+    for text, kwargs, pause in _visit(trainer, presenter, rng):
+        presenter.say(text, **kwargs)
+        if pause and delay:
+            sleep(pause * delay)
+
+
+async def pyokemon_center_async(trainer, presenter=None, rng=None, delay=0.2):
+    """
+    The same as pyokemon_center, but it waits with asyncio, so that other
+    things (like other players on a server) carry on while the animation plays.
+    """
+    presenter = _presenter(presenter)
+    for text, kwargs, pause in _visit(trainer, presenter, rng):
+        presenter.say(text, **kwargs)
+        if pause and delay:
+            await asyncio.sleep(pause * delay)
@@ -0,0 +1,175 @@
+"""
+Long simulation jobs that can be stopped and picked up again.
+
+A job that fights a million battles can take hours, and if the machine
+goes down halfway through, everything it worked out goes with it. A Job
+saves where it's got to every so often -- a checkpoint -- and when it's
+started again, it carries on from the last one instead of from the start.
+
+A Job works through a list of tasks in order. For each one it calls
+
+    total = step(total, task, rng)
+
+where total is whatever you're adding up (a tournament.Table, a dict of
+counts, ...) and rng is the job's random number generator. A checkpoint is
+three things: how many tasks are done, the total so far, and the state of
+rng. That's everything the rest of the job depends on, so a job that's
+stopped and started again any number of times ends up with exactly the
+same total as one that ran straight through.
+
+    job = jobs.Job("wild campaign", tasks, jobs.battle_step, tournament.Table(),
+                   rng=random.Random(0), path="campaign.ckpt")
+    table = job.run()       # Kill it, run it again, and it carries on.
+
+Checkpoints are written with pickle, so the total and rng have to be
+things pickle can handle; the step function and the tasks don't go in the
+checkpoint, so they can be anything. A step must only change total and
+rng, and has to do the same thing every time it's given the same total,
+task and rng state.
+"""
+import os
+import pickle
+import random
+import sys
+import time
+from collections import namedtuple
+
+import engine
+import pyokemans as pk
+import tournament
+
+# What's saved in a checkpoint file. name and tasks are there to check the
+# checkpoint belongs to the job being run; tasks is how many there are.
+Checkpoint = namedtuple("Checkpoint", ["name", "tasks", "done", "total", "rng"])
+
+
+def _save(path, checkpoint):
+    # Write to a temporary file and then swap it in, so a crash in the middle
+    # leaves the last checkpoint as it was. fsync makes sure the new one is
+    # really on the disk before it takes the old one's place.
+    temporary = "{}.{}.tmp".format(path, os.getpid())
+    with open(temporary, 'wb') as f:
+        pickle.dump(checkpoint, f, pickle.HIGHEST_PROTOCOL)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, path)
+
+
+def load(path):
+    """Returns the Checkpoint saved at path, or None if there isn't one."""
+    try:
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    except FileNotFoundError:
+        return None
+
+
+class Job(object):
+    """
+    A list of tasks to work through, saving a checkpoint every so often.
+
+    :param name: What the job is called. A checkpoint saved by a job with a
+        different name, or a different number of tasks, is refused rather
+        than carried on from by mistake.
+    :param tasks: The tasks, in order. Anything with len() and [] works.
+    :param step: step(total, task, rng) does one task and returns the new total.
+    :param total: The total before any tasks are done.
+    :param rng: The random number generator step is given. Defaults to random.Random(0).
+    :param path: Where to keep the checkpoint. None means don't keep one.
+    :param interval: The most seconds of work to lose if the job is
+        stopped: a checkpoint is saved when at least this long has passed
+        since the last one. Saving one takes about as long as pickling the
+        total, so keep it well above that.
+    """
+    def __init__(self, name, tasks, step, total, rng=None, path=None, interval=10.0):
+        self.name = name
+        self.tasks = tasks
+        self.step = step
+        self.total = total
+        self.rng = random.Random(0) if rng is None else rng
+        self.path = path
+        self.interval = interval
+        self.done = 0
+        self.checkpoints = 0
+        if path is not None:
+            self._resume(load(path))
+
+    def _resume(self, checkpoint):
+        if checkpoint is None:
+            return
+        if checkpoint.name != self.name or checkpoint.tasks != len(self.tasks):
+            raise ValueError("The checkpoint in {} is for job {!r} with {} tasks, not {!r} with {}".format(
+                self.path, checkpoint.name, checkpoint.tasks, self.name, len(self.tasks)))
+        self.done = checkpoint.done
+        self.total = checkpoint.total
+        self.rng = checkpoint.rng
+
+    @property
+    def finished(self):
+        return self.done == len(self.tasks)
+
+    def checkpoint(self):
+        """Saves a checkpoint now."""
+        if self.path is not None:
+            _save(self.path, Checkpoint(self.name, len(self.tasks), self.done, self.total, self.rng))
+            self.checkpoints += 1
+
+    def run(self, limit=None):
+        """
+        Works through the tasks that are left and returns the total. The last
+        checkpoint is saved once they're all done, so running a finished job
+        again just hands back its total.
+
+        :param limit: Stop after this many tasks, with a checkpoint, even if
+            there are more left -- handy for splitting a job over several runs.
+        """
+        end = len(self.tasks) if limit is None else min(len(self.tasks), self.done + limit)
+        tasks, step, rng = self.tasks, self.step, self.rng
+        total = self.total
+        last = time.monotonic()
+        for i in range(self.done, end):
+            total = step(total, tasks[i], rng)
+            # Only now is task i completely done, so only now can a
+            # checkpoint count it.
+            self.total, self.done = total, i + 1
+            if time.monotonic() - last >= self.interval:
+                self.checkpoint()
+                last = time.monotonic()
+        self.checkpoint()
+        return self.total
+
+
+# BATTLE CAMPAIGNS
+# A ready-made step for the most common job: lots of one-on-one battles,
+# added up in a tournament.Table.
+
+def battle_tasks(species, levels, repeats):
+    """
+    Every (species name, level, species name, level) pairing of species
+    (classes) at levels, repeats times over, for battle_step.
+    """
+    names = [cls.__name__ for cls in species]
+    return [(a, level_a, b, level_b)
+            for _ in range(repeats)
+            for i, a in enumerate(names) for b in names[i + 1:]
+            for level_a in levels for level_b in levels]
+
+
+def battle_step(table, task, rng):
+    """Fights one (species name, level, species name, level) battle and adds it to table."""
+    species_a, level_a, species_b, level_b = task
+    a = getattr(pk, species_a)(level_a)
+    b = getattr(pk, species_b)(level_b)
+    rounds = engine.battle(a, b, rng=rng)
+    match = tournament.Match(type(a), level_a, type(b), level_b, 0, None)
+    table.add(tournament.Result(match, 0 if rounds[-1].fainter is b else 1, len(rounds)))
+    return table
+
+
+if __name__ == '__main__':
+    # Press Ctrl-C part way through, then run it again.
+    path = sys.argv[1] if len(sys.argv) > 1 else 'campaign.ckpt'
+    tasks = battle_tasks(tournament.species_classes(), (2, 5, 10, 20), 200)
+    job = Job("campaign", tasks, battle_step, tournament.Table(), random.Random(0), path, interval=1.0)
+    print("Starting at task {} of {}".format(job.done, len(tasks)))
+    print(job.run())
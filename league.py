@@ -0,0 +1,343 @@
+"""
+A league: whole trainers, with their whole rosters, fighting each other,
+and a table of who's best.
+
+A league match is like a wild battle with nobody at the keyboard. Both
+trainers send out a pyokemon, they fight with random moves, and whenever
+one faints its trainer sends out another -- chosen by a switch policy
+instead of strategy_switch's question -- until somebody runs out.
+
+Every trainer has an Elo rating. Beating someone rated above you gains you
+more than beating someone rated below you, and whatever one side gains the
+other loses. Each result changes two ratings with a couple of sums, no
+matter how many matches have come before.
+
+The Leaderboard answers "who's on top?" and "what's my rank?" without
+sorting everybody each time. See Leaderboard for how.
+
+    trainers = [...]
+    lg = League(trainers)
+    lg.play(lg.pairings())      # everybody plays one match
+    for rank, i, rating in lg.leaderboard(10):
+        print(rank, lg.trainers[i].name, round(rating))
+
+Matches are fought in batches across several processes, like tournament.py.
+Each has its own seed, and ratings are updated in the order the matches
+were scheduled, so the results are the same however many workers you use.
+"""
+import multiprocessing
+import random
+from bisect import bisect_left, insort
+from collections import namedtuple
+
+import engine
+import pyokemans as pk
+from rng import derive
+
+# How a match turned out. a and b are the trainers' numbers in the league;
+# winner is 0 if a won, 1 if b won, and None if nobody had won after
+# max_rounds rounds.
+MatchResult = namedtuple("MatchResult", ["a", "b", "winner", "rounds"])
+
+
+# SWITCH POLICIES
+# A switch policy picks which pyokemon a trainer sends out next: it's given
+# the trainer and the pyokemon they're up against (None at the start of a
+# match), and returns one of the trainer's pyokemon that can still fight,
+# or None if there aren't any.
+
+def first_healthy(trainer, opponent):
+    """Sends out the first pyokemon in the roster that can fight: choice 1 in strategy_switch."""
+    for pkmn in trainer.roster:
+        if pkmn.hp > 0:
+            return pkmn
+    return None
+
+
+def best_matchup(trainer, opponent):
+    """
+    Sends out the pyokemon whose best move is most effective against the
+    opponent, and out of those, the one with the most HP left.
+    """
+    healthy = [pkmn for pkmn in trainer.roster if pkmn.hp > 0]
+    if not healthy or opponent is None:
+        return healthy[0] if healthy else None
+    table = pk.type_table()
+
+    def score(pkmn):
+        best = max((table.multipliers[(move.type_id * table.size + pkmn.type_id) * table.size + opponent.type_id]
+                    for move in pkmn.moves), default=0)
+        return best, pkmn.hp
+    return max(healthy, key=score)
+
+
+def roster_battle(a, b, rng=None, switch=first_healthy, max_rounds=1000):
+    """
+    Fights trainer a against trainer b, after healing both rosters.
+    Returns (winner, rounds) as in MatchResult.
+    """
+    for trainer in (a, b):
+        for pkmn in trainer.roster:
+            pkmn.heal()
+    pa = switch(a, None)
+    pb = switch(b, pa)
+    rounds = 0
+    while pa is not None and pb is not None:
+        if rounds == max_rounds:
+            return None, rounds
+        fainter = engine.fight_round(pa, pb, rng=rng).fainter
+        rounds += 1
+        if fainter is pa:
+            pa = switch(a, pb)
+        elif fainter is pb:
+            pb = switch(b, pa)
+    return (0 if pb is None else 1), rounds
+
+
+class Elo(object):
+    """
+    Elo ratings.
+
+    :param k: The most a rating can change in one match.
+    :param initial: Everybody's rating before their first match.
+    """
+    def __init__(self, k=32, initial=1500):
+        self.k = k
+        self.initial = initial
+
+    @staticmethod
+    def expected(rating, other):
+        """The chance (as Elo sees it) that a player rated rating beats one rated other."""
+        return 1 / (1 + 10 ** ((other - rating) / 400))
+
+    def update(self, rating_a, rating_b, score):
+        """
+        Returns the new (rating_a, rating_b) after a match. score is what a
+        got out of it: 1 for a win, 0 for a loss, 0.5 for a draw.
+        """
+        change = self.k * (score - self.expected(rating_a, rating_b))
+        return rating_a + change, rating_b - change
+
+
+class Leaderboard(object):
+    """
+    Everybody's rating, in order.
+
+    Ratings are sorted into buckets, resolution points wide, and we keep a
+    Fenwick tree (also called a binary indexed tree) of how many players are
+    in each bucket. A Fenwick tree can add one to a bucket, count everybody
+    in the buckets below one, or find the bucket holding the n-th player,
+    each in about log2(buckets) steps -- 14 or so -- however many players
+    there are. Each bucket keeps its own players in a sorted list, best
+    first, so we can find a player in it with a binary search.
+
+    Players are numbered 0, 1, 2, ...; higher ratings rank first, and equal
+    ratings go by number.
+
+    :param low, high: Ratings outside these share the bottom or top bucket.
+    :param resolution: How many rating points each bucket covers.
+    """
+    def __init__(self, low=0, high=4000, resolution=0.25):
+        self.low = low
+        self.resolution = resolution
+        self.size = int((high - low) / resolution) + 1
+        self._tree = [0] * (self.size + 1)
+        self._members = {}
+        self.ratings = []
+        self._bucket_of = []
+
+    def __len__(self):
+        return len(self.ratings)
+
+    def _bucket(self, rating):
+        return min(self.size - 1, max(0, int((rating - self.low) / self.resolution)))
+
+    def _add(self, bucket, change):
+        i = bucket + 1
+        tree = self._tree
+        while i <= self.size:
+            tree[i] += change
+            i += i & -i
+
+    def _below(self, bucket):
+        """How many players are in buckets before this one."""
+        total = 0
+        i = bucket
+        tree = self._tree
+        while i > 0:
+            total += tree[i]
+            i -= i & -i
+        return total
+
+    def _find(self, position):
+        """The bucket holding the position-th player from the bottom (1 is the lowest)."""
+        i = 0
+        step = 1 << self.size.bit_length()
+        tree = self._tree
+        while step:
+            if i + step <= self.size and tree[i + step] < position:
+                i += step
+                position -= tree[i]
+            step >>= 1
+        return i
+
+    def set(self, player, rating):
+        """Sets a player's rating. New players get the next number; set(len(board), r) adds one."""
+        bucket = self._bucket(rating)
+        if player == len(self.ratings):
+            self.ratings.append(rating)
+            self._bucket_of.append(bucket)
+        else:
+            old = self._bucket_of[player]
+            members = self._members[old]
+            del members[bisect_left(members, (-self.ratings[player], player))]
+            self.ratings[player] = rating
+            if old != bucket:
+                self._add(old, -1)
+                self._bucket_of[player] = bucket
+            else:
+                insort(members, (-rating, player))
+                return
+        insort(self._members.setdefault(bucket, []), (-rating, player))
+        self._add(bucket, 1)
+
+    def rank(self, player):
+        """A player's place in the table: 1 for the best."""
+        bucket = self._bucket_of[player]
+        above = len(self.ratings) - self._below(bucket + 1)
+        return above + bisect_left(self._members[bucket], (-self.ratings[player], player)) + 1
+
+    def at(self, rank):
+        """The player in place rank (1 for the best)."""
+        if not 1 <= rank <= len(self.ratings):
+            raise IndexError("There's nobody in place {}".format(rank))
+        position = len(self.ratings) - rank + 1
+        bucket = self._find(position)
+        # Members are best first, and position - 1 - _below(bucket) of them are below ours.
+        members = self._members[bucket]
+        return members[len(members) - 1 - (position - 1 - self._below(bucket))][1]
+
+    def top(self, n=10):
+        """The best n players, as a list of (player, rating)."""
+        found = []
+        position = len(self.ratings)
+        while position > 0 and len(found) < n:
+            bucket = self._find(position)
+            found.extend((player, -negative) for negative, player in self._members[bucket][:n - len(found)])
+            position = self._below(bucket)
+        return found
+
+    def count_above(self, rating):
+        """How many players are rated above rating (to within one bucket)."""
+        return len(self.ratings) - self._below(self._bucket(rating) + 1)
+
+
+# WORKERS
+# Every worker process is handed the league's trainers once, when it starts,
+# and after that only (a, b, seed) for each match.
+
+_worker = {}
+
+
+def _start_worker(trainers, switch, max_rounds):
+    _worker['trainers'] = trainers
+    _worker['switch'] = switch
+    _worker['max_rounds'] = max_rounds
+
+
+def _play_batch(batch):
+    trainers = _worker['trainers']
+    results = []
+    for a, b, seed in batch:
+        winner, rounds = roster_battle(trainers[a], trainers[b], random.Random(seed),
+                                       _worker['switch'], _worker['max_rounds'])
+        results.append(MatchResult(a, b, winner, rounds))
+    return results
+
+
+class League(object):
+    """
+    Trainers, their ratings, and the matches between them.
+
+    :param trainers: The pk.Trainers taking part. They're known by their
+        place in this list.
+    :param elo: The Elo to rate them with.
+    :param switch: The switch policy every trainer uses.
+    :param seed: Decides every roll of the dice, along with the order matches are played in.
+    """
+    def __init__(self, trainers, elo=None, switch=first_healthy, seed=0, max_rounds=1000):
+        self.trainers = list(trainers)
+        self.elo = Elo() if elo is None else elo
+        self.switch = switch
+        self.seed = seed
+        self.max_rounds = max_rounds
+        self.board = Leaderboard()
+        for i in range(len(self.trainers)):
+            self.board.set(i, self.elo.initial)
+        self.played = [0] * len(self.trainers)
+        # How many matches have been scheduled, so each one gets a different seed.
+        self.matches = 0
+
+    def rating(self, i):
+        return self.board.ratings[i]
+
+    def record(self, result):
+        """Updates the ratings for one match's result."""
+        a, b = result.a, result.b
+        score = 0.5 if result.winner is None else 1 - result.winner
+        rating_a, rating_b = self.elo.update(self.board.ratings[a], self.board.ratings[b], score)
+        self.board.set(a, rating_a)
+        self.board.set(b, rating_b)
+        self.played[a] += 1
+        self.played[b] += 1
+
+    def pairings(self, rng=None, swiss=False):
+        """
+        Pairs everybody off for one match each (somebody sits out if there's an
+        odd number). Pairs are random, or with swiss=True, neighbours in the
+        table, so players meet others about as good as they are.
+        """
+        if swiss:
+            order = [player for player, _ in self.board.top(len(self.trainers))]
+        else:
+            order = list(range(len(self.trainers)))
+            (random.Random(derive(self.seed, 'pairings', self.matches)) if rng is None else rng).shuffle(order)
+        return list(zip(order[0::2], order[1::2]))
+
+    def play(self, pairs, workers=None, batch_size=256):
+        """
+        Fights a match for each (a, b) in pairs, and updates the ratings as
+        the results come in. Returns the MatchResults.
+
+        :param workers: How many processes to use. Defaults to one per CPU; 1 means no pool at all.
+        :param batch_size: How many matches to send to a worker at a time.
+        """
+        jobs = []
+        for a, b in pairs:
+            jobs.append((a, b, derive(self.seed, self.matches, a, b)))
+            self.matches += 1
+        batches = [jobs[i:i + batch_size] for i in range(0, len(jobs), batch_size)]
+
+        results = []
+        if workers == 1:
+            _start_worker(self.trainers, self.switch, self.max_rounds)
+            for batch in batches:
+                for result in _play_batch(batch):
+                    self.record(result)
+                    results.append(result)
+            return results
+        with multiprocessing.Pool(workers, _start_worker, (self.trainers, self.switch, self.max_rounds)) as pool:
+            # imap (not imap_unordered) hands batches back in the order they
+            # were sent, so the ratings come out the same every time.
+            for batch in pool.imap(_play_batch, batches):
+                for result in batch:
+                    self.record(result)
+                    results.append(result)
+        return results
+
+    def leaderboard(self, n=10):
+        """The top n, as a list of (rank, trainer number, rating)."""
+        return [(rank, player, rating) for rank, (player, rating) in enumerate(self.board.top(n), 1)]
+
+    def rank(self, i):
+        return self.board.rank(i)
@@ -0,0 +1,289 @@
+"""
+Count what happens in the game while it runs: how many attacks missed, how
+much damage they did, how long battles last, and so on.
+
+Metrics are off by default, and then every hook in the game costs about as
+much as an if statement. Turn them on, play, and write them out:
+
+    import metrics
+    metrics.enable()
+    ...play some battles...
+    metrics.write_prometheus('metrics.prom')    # or metrics.write_json('metrics.json')
+
+There are two kinds of metric:
+
+* counters just count things: count('pyokemon_attacks_total', status='miss'),
+* histograms sort numbers into buckets, so you can see how they're spread
+  out: observe('pyokemon_damage', 7). timer() and stopwatch() observe how
+  many seconds something took.
+
+The words after the name (status='miss') are labels: the same metric is
+counted separately for every different set of labels.
+
+Each process keeps its own numbers. snapshot() and merge() let you add up
+the numbers from several processes, for example a tournament's workers.
+
+For a closer look at where the time goes in one battle, use profile():
+
+    with metrics.profile('battle.prof'):
+        game.wild_battle(me)
+"""
+import cProfile
+import json
+import os
+from bisect import bisect_left
+from contextlib import contextmanager
+from time import perf_counter
+
+# Hooks in the game check this before doing any work, so when it's False
+# they cost next to nothing.
+enabled = False
+
+# Upper bounds of the histogram buckets. Anything bigger than the last one
+# still gets counted, in the "+Inf" bucket.
+SECONDS = (1e-5, 3e-5, 1e-4, 3e-4, 1e-3, 3e-3, 1e-2, 3e-2, 0.1, 0.3, 1, 3, 10)
+BUCKETS = {
+    'pyokemon_damage': (1, 2, 3, 5, 8, 13, 21, 34, 55, 89),
+    'pyokemon_battle_turns': (1, 2, 3, 5, 8, 13, 21, 34, 55),
+}
+
+# What each metric means, for the HELP lines of the Prometheus file.
+HELP = {
+    'pyokemon_attacks_total': "Attacks, by outcome: miss, a hit, supereffective or ineffective.",
+    'pyokemon_damage': "Damage done by attacks that hit.",
+    'pyokemon_battles_total': "Wild battles fought.",
+    'pyokemon_battle_turns': "Turns (strategies chosen) per wild battle.",
+    'pyokemon_strategy_seconds': "Time spent on each strategy in wild_battle, not counting time waiting for answers.",
+    'pyokemon_runs_total': "Attempts to run away, by outcome.",
+    'pyokemon_captures_total': "Capture attempts, by outcome.",
+    'pyokemon_heal_seconds': "Time taken to heal a trainer's roster at the pyokemon center.",
+    'pyokemon_heals_total': "Pyokemon healed.",
+    'pyokemon_level_ups_total': "Levels gained from XP.",
+}
+
+
+def enable():
+    global enabled
+    enabled = True
+
+
+def disable():
+    global enabled
+    enabled = False
+
+
+class Histogram(object):
+    """Counts how many observations fell in each bucket, plus their total."""
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+
+class Registry(object):
+    """All the counters and histograms of one process."""
+    def __init__(self):
+        # Both are keyed by (name, ((label, value), ...)).
+        self.counters = {}
+        self.histograms = {}
+
+    def count(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram(BUCKETS.get(name, SECONDS))
+        histogram.observe(value)
+
+    def clear(self):
+        self.counters.clear()
+        self.histograms.clear()
+
+    def snapshot(self):
+        """Everything counted so far, as plain lists and dicts that json and pickle can handle."""
+        return {
+            'counters': [[name, dict(labels), value] for (name, labels), value in sorted(self.counters.items())],
+            'histograms': [[name, dict(labels), list(h.buckets), list(h.counts), h.sum]
+                           for (name, labels), h in sorted(self.histograms.items())],
+        }
+
+    def merge(self, snapshot):
+        """Adds a snapshot (from this or another process) to the numbers here."""
+        for name, labels, value in snapshot['counters']:
+            self.count(name, value, **labels)
+        for name, labels, buckets, counts, total in snapshot['histograms']:
+            key = (name, tuple(sorted(labels.items())))
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(buckets)
+            if list(histogram.buckets) != list(buckets):
+                raise ValueError("Can't merge {}: the buckets are different".format(name))
+            histogram.counts = [a + b for a, b in zip(histogram.counts, counts)]
+            histogram.sum += total
+
+    def prometheus(self):
+        """Everything counted so far, in Prometheus' text format."""
+        lines = []
+        described = set()
+
+        def describe(name, kind):
+            if name not in described:
+                described.add(name)
+                if name in HELP:
+                    lines.append("# HELP {} {}".format(name, HELP[name]))
+                lines.append("# TYPE {} {}".format(name, kind))
+
+        def labelled(name, labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return name
+            return "{}{{{}}}".format(name, ",".join('{}="{}"'.format(k, v) for k, v in pairs))
+
+        for (name, labels), value in sorted(self.counters.items()):
+            describe(name, 'counter')
+            lines.append("{} {}".format(labelled(name, labels), value))
+        for (name, labels), h in sorted(self.histograms.items()):
+            describe(name, 'histogram')
+            running = 0
+            for bound, count in zip(list(h.buckets) + ['+Inf'], h.counts):
+                running += count
+                lines.append("{} {}".format(labelled(name + '_bucket', labels, [('le', bound)]), running))
+            lines.append("{} {}".format(labelled(name + '_sum', labels), h.sum))
+            lines.append("{} {}".format(labelled(name + '_count', labels), running))
+        return "\n".join(lines) + "\n"
+
+
+# The registry that count(), observe() and friends use.
+registry = Registry()
+
+
+def count(name, value=1, **labels):
+    """Adds value to a counter."""
+    if enabled:
+        registry.count(name, value, **labels)
+
+
+def observe(name, value, **labels):
+    """Puts value in a histogram."""
+    if enabled:
+        registry.observe(name, value, **labels)
+
+
+@contextmanager
+def timer(name, **labels):
+    """Observes how many seconds the with block took."""
+    if not enabled:
+        yield
+        return
+    started = perf_counter()
+    try:
+        yield
+    finally:
+        registry.observe(name, perf_counter() - started, **labels)
+
+
+class Stopwatch(object):
+    """
+    Times something that has dialogues (see game.py) in the middle of it,
+    without counting the time spent waiting for the player to answer:
+
+        watch = metrics.stopwatch()
+        answer = yield from watch.during(some_dialogue())
+        ...
+        watch.record('pyokemon_strategy_seconds', strategy='fight')
+    """
+    def __init__(self):
+        self.elapsed = 0.0
+        self.started = perf_counter()
+
+    def during(self, steps):
+        """Runs a dialogue, stopping the clock whenever it's waiting for an answer."""
+        answer = None
+        while True:
+            try:
+                prompt = steps.send(answer)
+            except StopIteration as finished:
+                return finished.value
+            self.elapsed += perf_counter() - self.started
+            answer = yield prompt
+            self.started = perf_counter()
+
+    def record(self, name, **labels):
+        registry.observe(name, self.elapsed + perf_counter() - self.started, **labels)
+
+
+class _NoStopwatch(object):
+    """What stopwatch() hands out when metrics are off: does nothing."""
+    def during(self, steps):
+        return steps
+
+    def record(self, name, **labels):
+        pass
+
+
+_no_stopwatch = _NoStopwatch()
+
+
+def stopwatch():
+    """Starts a Stopwatch (or a stand-in that does nothing, when metrics are off)."""
+    return Stopwatch() if enabled else _no_stopwatch
+
+
+def snapshot():
+    return registry.snapshot()
+
+
+def merge(other):
+    registry.merge(other)
+
+
+def clear():
+    registry.clear()
+
+
+def _write(path, text):
+    # Write to a temporary file and then swap it in, so anything reading
+    # the file never sees half of it.
+    temporary = "{}.{}.tmp".format(path, os.getpid())
+    with open(temporary, 'w') as f:
+        f.write(text)
+    os.replace(temporary, path)
+
+
+def write_prometheus(path):
+    """Writes everything counted so far to path, in Prometheus' text format."""
+    _write(path, registry.prometheus())
+
+
+def write_json(path):
+    """Writes everything counted so far to path as JSON (see Registry.snapshot)."""
+    data = registry.snapshot()
+    data['pid'] = os.getpid()
+    _write(path, json.dumps(data, indent=1))
+
+
+@contextmanager
+def profile(path=None):
+    """
+    Runs cProfile over the with block. Gives you the cProfile.Profile, and
+    saves the results to path (if given) for pstats or snakeviz to read.
+    """
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        if path is not None:
+            profiler.dump_stats(path)
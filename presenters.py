@@ -0,0 +1,111 @@
+"""
+Presenters decide how the game talks to the outside world.
+
+The functions in game.py never call print() or input() directly. Instead,
+they tell a presenter what happened ("this attack missed", "that pyokemon
+fainted") and ask it for answers ("which move?"). Swapping the presenter
+changes how the game looks without changing how it plays:
+
+* TextPresenter prints everything to the screen and reads from the keyboard,
+  which is what you get by default.
+* Presenter says nothing at all. Use it when the computer is playing on its own.
+* ScriptedPresenter says nothing and answers questions from a list you give it,
+  which is handy for replaying a game or for automated runs.
+* events.EventPresenter writes down what happened as a log of events, which
+  can be turned back into the text later (see events.py).
+"""
+
+
+class Presenter(object):
+    """
+    The base presenter. It shows nothing, and every method here is a
+    no-op, so subclasses only need to override what they care about.
+    """
+    def say(self, *args, **kwargs):
+        """General chatter: menus, greetings, error messages. Takes the same arguments as print()."""
+        pass
+
+    def ask(self, prompt):
+        """Asks the player a question and returns their answer as a string."""
+        raise NotImplementedError("This presenter can't answer questions. Try a ScriptedPresenter.")
+
+    def attacked(self, result):
+        """Called with an engine.Attack record after every attack."""
+        pass
+
+    def fainted(self, pkmn):
+        pass
+
+    def gained_xp(self, pkmn, xp):
+        pass
+
+    def leveled_up(self, pkmn):
+        pass
+
+    def sent_out(self, pkmn):
+        pass
+
+    def rolled_capture(self, pkmn, result):
+        """Called with an engine.Capture record when the player tries to catch pkmn."""
+        pass
+
+    def healed(self, pkmn):
+        """Called after a pyokemon center heals a pyokemon. The flavour text is said separately."""
+        pass
+
+
+class ScriptedPresenter(Presenter):
+    """
+    A silent presenter that answers questions from a list of prepared answers.
+
+    :param answers: The answers to give, in order.
+    """
+    def __init__(self, answers=()):
+        self.answers = list(answers)
+        self.asked = 0
+
+    def ask(self, prompt):
+        try:
+            answer = self.answers[self.asked]
+        except IndexError:
+            raise EOFError("Ran out of scripted answers at question: {}".format(prompt))
+        self.asked += 1
+        return answer
+
+
+class TextPresenter(Presenter):
+    """
+    Prints everything to the screen and reads answers from the keyboard.
+    All the printing goes through say(), so a subclass can send the same
+    text somewhere else by overriding just say().
+    """
+    def say(self, *args, **kwargs):
+        print(*args, **kwargs)
+
+    def ask(self, prompt):
+        return input(prompt)
+
+    def attacked(self, result):
+        self.say("\n{} used {}!".format(result.attacker.name, result.move.name))
+        if not result.hit:
+            self.say("{}'s {} missed!".format(result.attacker.name, result.move.name))
+        else:
+            self.say("It's {}! Does {} damage!".format(result.status, result.damage))
+
+    def fainted(self, pkmn):
+        self.say("{} fainted!".format(pkmn.name))
+
+    def gained_xp(self, pkmn, xp):
+        self.say("{} gained {} XP!".format(pkmn.name, xp))
+
+    def leveled_up(self, pkmn):
+        self.say("{} is now level {}!".format(pkmn.name, pkmn.level))
+
+    def sent_out(self, pkmn):
+        self.say("Go, {}!".format(pkmn.name))
+
+    def rolled_capture(self, pkmn, result):
+        self.say("Chance: {}".format(result.chance))
+        self.say("Rolled: {}".format(result.roll))
+        if result.caught:
+            self.say("Wild {} was caught!".format(pkmn.name))
@@ -1,20 +1,27 @@
 """
 Library for the Pyokemon example. This file contains the classes for Move, Pyokemon, and Trainers, 
 """
-import copy
 import random
 
-from math import ceil, floor
+from collections import namedtuple
+from functools import lru_cache
+from math import ceil, floor, isqrt
 # Python 3.5 has an 'inf' in the math module, which has the property
 # inf > n == True for all n. Basically infinity.
 # Unfortunatly, most people are still on 2.7 or 3.4, so we use maxsize as
 # a standin. Think "practically infinite".
 from sys import maxsize
 
+import metrics
+import rules
+from typechart import TypeChart, type_id
+
 # The keys are the type of attack. The values are dictionaries,
 # where the keys are the defending type
 # and the values are the effectiveness coefficient.
-pktypes = {
+# A TypeChart works just like a dictionary, but keeps a compiled copy of itself
+# around for fast lookups during battles. See typechart.py.
+pktypes = TypeChart({
            "Fire": {"Water": 0.5, "Ground": 0.5, "Grass": 2},
            "Water": {"Grass": 0.5, "Electric": 0.5, "Fire": 2},
            "Grass": {"Fire": 0.5, "Flying": 0.5, "Water": 2},
@@ -22,24 +29,98 @@ pktypes = {
            "Flying": {"Electric": 0.5, "Ground": 2, "Grass": 2},
            "Electric": {"Ground": 0.5, "Flying": 2, "Water": 2},
            "Normal": {}  # Multiplier of 1 for everybody
-          }
+          })
+
+
+def type_table():
+    """
+    Returns the compiled type table (a typechart.TypeTable) for pktypes,
+    with the same-type bonus from rules.active. It gets rebuilt
+    automatically whenever pktypes or the bonus changes.
+    """
+    global pktypes
+    # If someone replaced pktypes with a plain dictionary, wrap it up
+    # so we can keep track of it from now on.
+    if not isinstance(pktypes, TypeChart):
+        pktypes = TypeChart(pktypes)
+    return pktypes.table(rules.active.same_type_bonus)
+
+
+class MoveDef(namedtuple("MoveDef", ["name", "pktype", "power", "max_pp", "type_id", "id"])):
+    """
+    The parts of a move that never change: its name, type, power and
+    maximum PP. Since they never change, every pyokemon that knows Tackle
+    can share the very same MoveDef instead of carrying its own copy.
+
+    A namedtuple can't be changed after it's made, which is exactly what we
+    want here. Don't make these yourself; Move does it for you.
+    """
+    __slots__ = ()
+
+
+# Every MoveDef ever made, in order. A MoveDef's id is its index in this list.
+move_definitions = []
+_move_definitions = {}
+
+
+def _define_move(name, pktype, power, pp):
+    """Returns the shared MoveDef for these values, making it the first time."""
+    key = (name, pktype, power, pp)
+    try:
+        return _move_definitions[key]
+    except KeyError:
+        definition = MoveDef(name, pktype, power, pp, type_id(pktype), len(move_definitions))
+        move_definitions.append(definition)
+        _move_definitions[key] = definition
+        return definition
 
 
 class Move(object):
     """
     Represents and validates a move.
+
+    A Move is really two things: a shared MoveDef that says what the move is,
+    and the PP that this particular copy of the move has left. Teaching a
+    pyokemon a move makes a new Move that shares the old one's MoveDef.
     
     :param name: The name of the move
  
     """
+    # Only these two attributes, stored without a __dict__. See compact.py
+    # for more about __slots__.
+    __slots__ = ('_definition', '_pp')
+
     def __init__(self, name, pktype, power, pp):
-        self.name = name
-        self.power = power
-        self._max_pp = self._pp = pp
         if pktype not in pktypes.keys():
             raise TypeError("Invalid move type")
-        else:
-            self.pktype = pktype
+        self._definition = _define_move(name, pktype, power, pp)
+        self._pp = pp
+
+    @classmethod
+    def from_definition(cls, definition, pp=None):
+        """Makes a new Move for a MoveDef, with pp PP left (full PP if pp is None)."""
+        move = cls.__new__(cls)
+        move._definition = definition
+        move._pp = definition.max_pp if pp is None else pp
+        return move
+
+    @property
+    def definition(self): return self._definition
+
+    @property
+    def name(self): return self._definition.name
+
+    @property
+    def pktype(self): return self._definition.pktype
+
+    @property
+    def type_id(self): return self._definition.type_id
+
+    @property
+    def power(self): return self._definition.power
+
+    @property
+    def _max_pp(self): return self._definition.max_pp
 
     @property
     def pp(self): return self._pp
@@ -51,16 +132,58 @@ class Move(object):
             self._pp = 0
 
     def restore_pp(self):
-        self._pp = self._max_pp
+        self._pp = self._definition.max_pp
 
-Tackle = Move("Tackle", "Normal", 10, 20)
+# What a pyokemon uses when it's out of PP for everything else. The other
+# moves (Tackle, Ember, ...) come from the registry; see the end of this file.
 Struggle = Move("Struggle", "Normal", 1, maxsize)
-Splash = Move("Splash", "Water", 10, 10)
-Ember = Move("Ember", "Fire", 10, 10)
-VineWhip = Move("Vine Whip", "Grass", 10, 10)
-Earthquake = Move("Earthquake", "Ground", 15, 5)
-Gust = Move("Gust", "Flying", 15, 5)
-Shock = Move("Shock", "Electric", 15, 5)
+
+
+# LEVEL TABLES
+# Every level up changes a pyokemon's stats in exactly the same way, and each
+# stat only depends on its own old value. So instead of working out level ups
+# one at a time, we can work out once where a stat line ends up after 1, 2,
+# ... 100 level ups, and then jump straight to the answer. How much a level
+# up adds comes from the rules (see rules.py), so the rules are part of every
+# cache key here.
+
+@lru_cache(maxsize=None)
+def _stat_path(value, growth):
+    """Attack, defense or speed after 0, 1, ..., 100 level ups, starting from value."""
+    path = [value]
+    for _ in range(100):
+        path.append(ceil((path[-1] + 2)*growth))
+    return path
+
+
+@lru_cache(maxsize=None)
+def _hp_path(max_hp, growth, cap):
+    """Max HP after 0, 1, ..., 100 level ups, starting from max_hp."""
+    path = [max_hp]
+    for _ in range(100):
+        path.append(min(cap, path[-1] + floor(path[-1] * growth)))
+    return path
+
+
+@lru_cache(maxsize=4096)
+def _level_table(max_hp, attack, defense, speed, stat_growth, hp_growth, hp_cap):
+    return list(zip(_hp_path(max_hp, hp_growth, hp_cap), _stat_path(attack, stat_growth),
+                    _stat_path(defense, stat_growth), _stat_path(speed, stat_growth)))
+
+
+def level_table(max_hp, attack, defense, speed):
+    """
+    Returns a list where entry n is the (max_hp, attack, defense, speed) a
+    pyokemon with this stat line would have after n calls to levelup(),
+    under rules.active.
+    """
+    r = rules.active
+    return _level_table(max_hp, attack, defense, speed, r.stat_growth, r.hp_growth, r.hp_cap)
+
+
+def xp_to_climb(level, n):
+    """The total XP it takes to go up n levels, starting at level."""
+    return 100 * (n * level + n * (n - 1) // 2)
 
 
 class Pyokemon(object):
@@ -78,8 +201,8 @@ class Pyokemon(object):
         self._defense = defense
         self._speed = speed
         self._moves = []
-        for _ in range(level):
-            self.levelup()
+        # Same as calling self.levelup() level times.
+        self._advance(level)
         self._hp = self._max_hp
 
     # (SEMI-)PRIVATE PROPERTIES
@@ -104,6 +227,23 @@ class Pyokemon(object):
     @pktype.setter
     def pktype(self, _): pass
 
+    # The species classes below set self._pktype in their constructors.
+    # By making _pktype a property too, we can work out the integer type ID
+    # (see typechart.py) once, right then, instead of on every attack.
+    @property
+    def _pktype(self): return self._pktype_name
+
+    @_pktype.setter
+    def _pktype(self, name):
+        self._pktype_name = name
+        self._type_id = None if name is None else type_id(name)
+
+    @property
+    def type_id(self): return self._type_id
+
+    @type_id.setter
+    def type_id(self, _): pass
+
     @property
     def attack(self): return self._attack
 
@@ -151,9 +291,30 @@ class Pyokemon(object):
     @xp.setter
     def xp(self, xp):
         self._xp = xp
-        while self._xp >= self._level * 100:
-            self._xp -= (self._level * 100)
-            self.levelup()
+        if type(self).levelup is not Pyokemon.levelup:
+            # Somebody taught this species to level up differently, so we
+            # can't use the shortcut below. Do it one level at a time.
+            while self._xp >= self._level * 100:
+                self._xp -= (self._level * 100)
+                self.levelup()
+                metrics.count('pyokemon_level_ups_total')
+            return
+        # Going up n levels from level L costs 100*L + 100*(L+1) + ... XP,
+        # which adds up to xp_to_climb(L, n). Solving
+        # xp_to_climb(L, n) <= xp for the biggest n is a quadratic equation,
+        # so we can find how many levels to go up without looping. XP
+        # doesn't have to be a whole number, but xp_to_climb always is, so
+        # rounding xp down first gives the same n (and isqrt needs an int).
+        b = 2 * self._level - 1
+        n = max(0, (isqrt(b * b + 4 * (int(self._xp) // 50)) - b) // 2) if self._xp >= 0 else 0
+        # levelup() stops at level 100, but still eats the XP.
+        n = min(n, max(0, 100 - self._level))
+        self._xp -= xp_to_climb(self._level, n)
+        self._advance(n)
+        if n and metrics.enabled:
+            metrics.count('pyokemon_level_ups_total', n)
+        if self._level >= 100 and self._xp >= self._level * 100:
+            self._xp %= self._level * 100
 
     @property
     def hp(self): return self._hp
@@ -188,16 +349,79 @@ class Pyokemon(object):
         """Increments a pokemon's level by one."""
         if self._level < 100:
             self._level += 1
-            self._attack = ceil((self._attack + 2)*0.99)
-            self._speed = ceil((self._speed + 2)*0.99)
-            self._defense = ceil((self._defense + 2) * 0.99)
-            self._max_hp = min(200, self._max_hp + floor(self._max_hp * 0.1))
+            r = rules.active
+            self._attack = ceil((self._attack + 2)*r.stat_growth)
+            self._speed = ceil((self._speed + 2)*r.stat_growth)
+            self._defense = ceil((self._defense + 2) * r.stat_growth)
+            self._max_hp = min(r.hp_cap, self._max_hp + floor(self._max_hp * r.hp_growth))
+
+    def _advance(self, n):
+        """Levels up n times at once. Same as calling levelup() n times, only faster."""
+        if type(self).levelup is not Pyokemon.levelup:
+            for _ in range(n):
+                self.levelup()
+            return
+        n = min(n, 100 - self._level)
+        if n > 0:
+            stats = level_table(self._max_hp, self._attack, self._defense, self._speed)[n]
+            self._max_hp, self._attack, self._defense, self._speed = stats
+            self._level += n
+
+    def grant_xp(self, xp):
+        """Gives a pyokemon some XP, all in one go. Returns how many levels it went up."""
+        old_level = self._level
+        self.xp += xp
+        return self._level - old_level
+
+    def at_level(self, level):
+        """
+        Levels a pyokemon up until it reaches level, without needing any XP.
+        Returns the pyokemon, so you can write pk.Charmander(5).at_level(50).
+        """
+        self._advance(level - self._level)
+        return self
+
+    def reset(self, level):
+        """
+        Puts a pyokemon back the way type(self)(level) would have made it: no
+        nickname, no XP, its species' stats at that level, and full HP and PP.
+        It's much cheaper than making a new one, which is how encounters.py
+        recycles wild pyokemon. Moves it has learned or forgotten since stay
+        learned or forgotten.
+        """
+        self._nickname = None
+        self._xp = 0
+        self._max_hp, self._attack, self._defense, self._speed = base_stats(type(self))
+        self._level = level
+        self._advance(level)
+        self._hp = self._max_hp
+        for move in self._moves:
+            move._pp = move._definition.max_pp
+        return self
+
+    def snapshot(self):
+        """
+        Everything about a pyokemon that can change in a battle, as a tuple
+        of ints: hp, xp, level, max_hp, attack, defense, speed, then the PP of
+        each move. Hand it to restore() to put the pyokemon back the way it was.
+        """
+        return (self._hp, self._xp, self._level, self._max_hp, self._attack, self._defense, self._speed,
+                *[move._pp for move in self._moves])
+
+    def restore(self, snapshot):
+        """Puts a pyokemon back the way it was when snapshot() was taken."""
+        (self._hp, self._xp, self._level, self._max_hp,
+         self._attack, self._defense, self._speed) = snapshot[:7]
+        for move, pp in zip(self._moves, snapshot[7:]):
+            move._pp = pp
 
     def heal(self):
         """Fully heals a pyokemon and restores the PP of all its moves."""
         self._hp = self._max_hp
         for move in self._moves:
-            move.restore_pp()
+            move._pp = move._definition.max_pp
+        if metrics.enabled:
+            metrics.count('pyokemon_heals_total')
 
     def learn(self, move):
         """Teaches a pyokemon a move."""
@@ -206,7 +430,8 @@ class Pyokemon(object):
         if len(self._moves) >= 5:
             raise ValueError("I already know 4 moves. Delete one move first.")
         else:
-            self._moves.append(copy.copy(move))
+            # A new Move with its own PP, sharing the same MoveDef.
+            self._moves.append(Move.from_definition(move._definition, move._pp))
 
     def forget(self, move_name):
         for move in self._moves:
@@ -215,67 +440,24 @@ class Pyokemon(object):
         else:
             raise KeyError("I don't know any move called {}!".format(move_name))
 
-    def random_move(self):
+    def random_move(self, rng=None):
         # Returns a random move that this pokemon knows.
+        # rng rolls the dice; leave it out to use the random module.
         moves = [m for m in self._moves if m.pp > 0]
         if len(moves) == 0:
             return Struggle
         else:
-            return random.choice(moves)
+            return (random if rng is None else rng).choice(moves)
 
 
-class Charmander(Pyokemon):
-    def __init__(self, level):
-        super().__init__(max_hp=10, attack=1, defense=1, speed=2, level=level)
-        self._species = "Charmander"
-        self._pktype = "Fire"
-        self.learn(Tackle)
-        self.learn(Ember)
-
-
-class Squirtle(Pyokemon):
-    def __init__(self, level):
-        super().__init__(max_hp=10, attack=1, defense=2, speed=1, level=level)
-        self._species = "Squirtle"
-        self._pktype = "Water"
-        self.learn(Tackle)
-        self.learn(Splash)
-
-
-class Bulbasaur(Pyokemon):
-    def __init__(self, level):
-        super().__init__(max_hp=10, attack=2, defense=1, speed=1, level=level)
-        self._species = "Bulbasaur"
-        self._pktype = "Grass"
-        self.learn(Tackle)
-        self.learn(VineWhip)
-
-
-class Diglett(Pyokemon):
-    def __init__(self, level):
-        super().__init__(max_hp=15, attack=2, defense=2, speed=1, level=level)
-        self._species = "Diglett"
-        self._pktype = "Ground"
-        self.learn(Tackle)
-        self.learn(Earthquake)
-
-
-class Pidgey(Pyokemon):
-    def __init__(self, level):
-        super().__init__(max_hp=15, attack=1, defense=2, speed=2, level=level)
-        self._species = "Pidgey"
-        self._pktype = "Flying"
-        self.learn(Tackle)
-        self.learn(Gust)
-
-
-class Pikachu(Pyokemon):
-    def __init__(self, level):
-        super().__init__(max_hp=15, attack=2, defense=1, speed=2, level=level)
-        self._species = "Pikachu"
-        self._pktype = "Electric"
-        self.learn(Tackle)
-        self.learn(Shock)
+@lru_cache(maxsize=None)
+def base_stats(species):
+    """
+    The (max_hp, attack, defense, speed) a species starts with, before any
+    level ups. species is a class like Pikachu.
+    """
+    pkmn = species(0)
+    return pkmn._max_hp, pkmn._attack, pkmn._defense, pkmn._speed
 
 
 class TooManyPyokemans(Exception):
@@ -302,36 +484,53 @@ class Trainer(object):
 
     @classmethod
     def interview(cls):
-        name = input("What is your name?> ")
+        dialogue = cls.interview_dialogue()
+        # See game.run_dialogue for how this works.
+        answer = None
+        while True:
+            try:
+                prompt = dialogue.send(answer)
+            except StopIteration as finished:
+                return finished.value
+            answer = input(prompt)
+
+    @classmethod
+    def interview_dialogue(cls, say=print):
+        """
+        The interview as a dialogue (see game.py): it yields each question
+        and expects the answer to be sent back. Everything else it has to
+        say goes to say(), which is print() unless you pass something else.
+        """
+        name = yield "What is your name?> "
         t = cls(name)
-        print("-" * 80)
-        print("\nHello there {}! Welcome to Pyokemon: The Text Adventure!".format(t.name))
+        say("-" * 80)
+        say("\nHello there {}! Welcome to Pyokemon: The Text Adventure!".format(t.name))
         # Get the user's choice for their starter pyokemon.
-        print("It's dangerous to go alone! Choose a starter pyokemon.\n" +
-              "Your choices are:\n",
-              "\t1) Charmander, a Fire-type pyokemon\n",
-              "\t2) Squirtle, a Water-type pyokemon\n",
-              "\t3) Bulbasaur, a Grass-type pyokemon\n")
-        starter = input("Type the number for your choice> ")
+        say("It's dangerous to go alone! Choose a starter pyokemon.\n" +
+            "Your choices are:\n",
+            "\t1) Charmander, a Fire-type pyokemon\n",
+            "\t2) Squirtle, a Water-type pyokemon\n",
+            "\t3) Bulbasaur, a Grass-type pyokemon\n")
+        starter = yield "Type the number for your choice> "
         # If it was an invalid choice -- if it wasn't a digit or was too long -- correct
         while not (starter.isdigit() and len(starter) == 1):
-            print("Sorry, \"{}\" is not a valid choice. Try again.".format(starter))
-            starter = input("Type the number for your choice> ")
+            say("Sorry, \"{}\" is not a valid choice. Try again.".format(starter))
+            starter = yield "Type the number for your choice> "
 
         # Process their choice
-        pkmn_choice = {
-                1: Charmander,
-                2: Squirtle,
-                3: Bulbasaur}[int(starter)]
+        pkmn_choice = _registered({
+                1: "Charmander",
+                2: "Squirtle",
+                3: "Bulbasaur"}[int(starter)])
         pkmn = pkmn_choice(5)
         # Ask for the nickname
-        nickname = input("What would you like to name your {}?> ".format(pkmn.name))
+        nickname = yield "What would you like to name your {}?> ".format(pkmn.name)
         pkmn.nickname = nickname
 
         # Add it to the user's roster.
         t.add_pkmn(pkmn)
         # Return the user
-        print("You're all set. Now go on out there and catch some pyokemon.")
+        say("You're all set. Now go on out there and catch some pyokemon.")
         return t
 
     @property
@@ -352,3 +551,26 @@ class Trainer(object):
             raise TooManyPyokemans("That there {} is already in your roster!".format(pkmn.name))
 
         self._roster.append(pkmn)
+
+
+# SPECIES AND MOVES
+# Charmander, Squirtle and the rest, and their moves, are listed in
+# pyokemon.json rather than written out here. Python calls this function
+# for any name this module doesn't have, so pk.Charmander is looked up in
+# the registry (see registry.py), made, and kept here for next time.
+
+def _registered(name):
+    """Returns the species or move called name from the registry, and keeps it here."""
+    import registry
+    found = registry.default.lookup(name)
+    globals()[name] = found
+    return found
+
+
+def __getattr__(name):
+    if name.startswith('__'):
+        raise AttributeError(name)
+    try:
+        return _registered(name)
+    except KeyError:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name)) from None
@@ -0,0 +1,161 @@
+"""
+Every species and move in the game, read from a data file.
+
+Writing a class for each species is fine for six of them, but not for
+hundreds: pyokemans.py would be enormous, and importing it would mean
+making every class and every move, even the ones a game never meets. So
+species and moves are rows in pyokemon.json instead:
+
+    "moves": [["Vine Whip", "Grass", 10, 10], ...]            name, type, power, PP
+    "species": [["Bulbasaur", "Grass", [10, 2, 1, 1],         name, type, max_hp, attack, defense, speed
+                 ["Tackle", "Vine Whip"]], ...]               the moves it knows
+
+A Registry reads the rows, and makes a species' class (or a move) the first
+time somebody asks for it. pyokemans hands anything it doesn't have itself
+over to the default registry, so pk.Bulbasaur and pk.VineWhip work just as
+if they were written out in pyokemans.py:
+
+    import pyokemans as pk
+    pk.Bulbasaur(5)                          # the class is made right here
+    registry.default.species('Bulbasaur')    # the very same class
+
+Moves are looked up without the spaces in their names, so "Vine Whip" is
+pk.VineWhip.
+"""
+import hashlib
+import json
+import os
+
+import pyokemans as pk
+
+DATA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pyokemon.json')
+
+
+def _key(name):
+    # What a name looks like as a Python name: "Vine Whip" -> "VineWhip".
+    return name.replace(' ', '')
+
+
+class Registry(object):
+    """
+    The species and moves from one data file.
+
+    :param path: A JSON file like pyokemon.json.
+    :param data: The contents of one, already read, instead of path.
+    """
+    def __init__(self, path=DATA_FILE, data=None):
+        if data is None:
+            with open(path) as f:
+                data = json.load(f)
+        # The rows as they came, by name. Classes and Moves are made from
+        # them on demand and kept in _made.
+        self._moves = {}
+        self._species = {}
+        self._made = {}
+        self._digest = None
+        for row in data.get('moves', []):
+            self.add_move(*row)
+        for row in data.get('species', []):
+            self.add_species(*row)
+
+    def add_move(self, name, pktype, power, pp):
+        """Adds a move. It isn't made until it's used."""
+        if pktype not in pk.pktypes:
+            raise ValueError("Move {} has an unknown type, {}".format(name, pktype))
+        self._moves[_key(name)] = (name, pktype, power, pp)
+        self._digest = None
+
+    def add_species(self, name, pktype, stats, learnset):
+        """
+        Adds a species. It isn't made until it's used.
+
+        :param stats: Its max_hp, attack, defense and speed at level 0.
+        :param learnset: The names of the moves it knows.
+        """
+        if pktype not in pk.pktypes:
+            raise ValueError("Species {} has an unknown type, {}".format(name, pktype))
+        for move in learnset:
+            if _key(move) not in self._moves:
+                raise ValueError("Species {} knows a move we don't have, {}".format(name, move))
+        self._species[name] = (name, pktype, tuple(stats), tuple(learnset))
+        self._digest = None
+
+    def digest(self):
+        """
+        A SHA-256 hash of every species and move, as a hex string. It changes
+        whenever the data does, so it can go in the key of anything worked
+        out from the data (see sweep.task_key).
+        """
+        if self._digest is None:
+            text = json.dumps({'moves': sorted(self._moves.values()), 'species': sorted(self._species.values())},
+                              separators=(',', ':'))
+            self._digest = hashlib.sha256(text.encode()).hexdigest()
+        return self._digest
+
+    def species_names(self):
+        return list(self._species)
+
+    def move_names(self):
+        return [row[0] for row in self._moves.values()]
+
+    def move(self, name):
+        """Returns the Move called name, making it the first time."""
+        key = _key(name)
+        try:
+            return self._made[key]
+        except KeyError:
+            pass
+        try:
+            row = self._moves[key]
+        except KeyError:
+            raise KeyError("There's no move called {}".format(name)) from None
+        self._made[key] = pk.Move(*row)
+        return self._made[key]
+
+    def species(self, name):
+        """Returns the class for the species called name, making it the first time."""
+        try:
+            return self._made[name]
+        except KeyError:
+            pass
+        try:
+            row = self._species[name]
+        except KeyError:
+            raise KeyError("There's no species called {}".format(name)) from None
+        self._made[name] = _species_class(*row[:3], [self.move(move) for move in row[3]])
+        return self._made[name]
+
+    def lookup(self, name):
+        """Returns the species or move called name (no spaces, as in pyokemans)."""
+        if name in self._species:
+            return self.species(name)
+        if name in self._moves:
+            return self.move(name)
+        raise KeyError(name)
+
+    def all_species(self):
+        """Every species' class, in the order they're listed. Makes them all."""
+        return [self.species(name) for name in self._species]
+
+
+def _species_class(name, pktype, stats, learnset):
+    """Makes a class like the ones we used to write out by hand in pyokemans.py."""
+    def __init__(self, level):
+        pk.Pyokemon.__init__(self, *stats, level=level)
+        self._species = name
+        self._pktype = pktype
+        for move in learnset:
+            self.learn(move)
+
+    # Pretending to come from pyokemans means pickle and store.py can find
+    # the class again by its name.
+    return type(name, (pk.Pyokemon,), {
+        '__init__': __init__,
+        '__module__': pk.__name__,
+        '__qualname__': name,
+        '__doc__': "A {} type pyokemon, from the registry.".format(pktype),
+    })
+
+
+# The registry pyokemans uses, loaded from pyokemon.json.
+default = Registry()
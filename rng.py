@@ -0,0 +1,99 @@
+"""
+Random number generators you can hand to the game.
+
+Every function in engine.py and game.py that rolls dice takes an rng
+argument. Leave it out and the game uses Python's random module, like it
+always has. Pass in your own generator and that battle uses it instead, so:
+
+* two battles running side by side don't share (and fight over) one generator,
+* seeding the generator you passed in lets you replay a battle exactly.
+
+Anything with the same methods as the random module works -- this is duck
+typing again. random.Random(seed) is the easiest choice. This module adds
+CounterRNG, which can also be split into independent child generators.
+"""
+import hashlib
+import os
+import random
+
+_MASK = (1 << 64) - 1
+_GOLDEN = 0x9E3779B97F4A7C15
+
+
+def _mix(z):
+    """Scrambles a 64-bit number. This is the finishing step of SplitMix64."""
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _MASK
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _MASK
+    return z ^ (z >> 31)
+
+
+def derive(seed, *keys):
+    """
+    Works out a new 64-bit seed from a seed and any number of keys (numbers
+    or strings). The same inputs always give the same seed, on any machine.
+    """
+    text = "|".join(str(part) for part in (seed,) + keys)
+    return int.from_bytes(hashlib.sha256(text.encode()).digest()[:8], 'big')
+
+
+class CounterRNG(random.Random):
+    """
+    A counter-based generator: the n-th number it produces is just a
+    scrambled version of (key, n). That makes it cheap to skip ahead, and
+    cheap to split into children that won't overlap with each other.
+
+    It's a subclass of random.Random, so randint, choice, expovariate and
+    friends all work. Only random() and getrandbits() are new.
+
+    :param seed: An int or string. None picks one at random.
+    """
+    def seed(self, a=None, version=2):
+        if a is None:
+            a = int.from_bytes(os.urandom(8), 'big')
+        self._key = a & _MASK if isinstance(a, int) else derive(a)
+        self._counter = 0
+        self.gauss_next = None
+
+    def _next(self):
+        self._counter += 1
+        return _mix((self._key + self._counter * _GOLDEN) & _MASK)
+
+    def random(self):
+        """A float in [0, 1), from the top 53 bits of the next number."""
+        return (self._next() >> 11) * (1.0 / (1 << 53))
+
+    def getrandbits(self, k):
+        bits = 0
+        for shift in range(0, k, 64):
+            bits |= self._next() << shift
+        return bits & ((1 << k) - 1)
+
+    def getstate(self):
+        return (self._key, self._counter, self.gauss_next)
+
+    def setstate(self, state):
+        self._key, self._counter, self.gauss_next = state
+
+    def advance(self, n):
+        """Skips ahead n numbers without working them out."""
+        self._counter += n
+
+    def split(self, index):
+        """Returns the index-th child generator. Children never share numbers with each other."""
+        return CounterRNG(_mix((self._key ^ _mix((index + 1) * _GOLDEN & _MASK)) & _MASK))
+
+    def spawn(self, n):
+        """Returns n independent child generators."""
+        return [self.split(index) for index in range(n)]
+
+
+# The kinds of generator a BattleLog knows how to rebuild, by name.
+KINDS = {
+    'mt': random.Random,
+    'counter': CounterRNG,
+}
+
+
+def make(kind='mt', seed=None):
+    """Makes a generator of the given kind ('mt' for Mersenne Twister, or 'counter')."""
+    return KINDS[kind](seed)
@@ -0,0 +1,100 @@
+"""
+The numbers the game is balanced on, all in one place.
+
+How often attacks miss, how much a same-type move adds, how likely running
+away is, how fast pyokemon grow when they level up, and how strong wild ones
+are: all of these used to be plain numbers sprinkled through the code. Now
+they're the fields of a Rules, and the game reads them from rules.active
+whenever it needs one. Out of the box that's DEFAULT, so the game plays
+exactly like it always has.
+
+To try out different numbers, make a Rules and switch to it for a while:
+
+    import rules
+    harder = rules.DEFAULT._replace(miss_threshold=0.5)
+    with rules.use(harder):
+        ...   # every battle in here misses more often
+
+sweep.py uses this to fight thousands of battles under lots of different
+rules and see how they change who wins.
+"""
+from collections import namedtuple
+from contextlib import contextmanager
+
+
+class Rules(namedtuple("Rules", ["miss_threshold", "same_type_bonus", "run_odds", "stat_growth",
+                                 "hp_growth", "hp_cap", "wild_levels"])):
+    """
+    One set of game rules. Make new ones with Rules(...), or change a few
+    fields of an existing one with DEFAULT._replace(...). Either way the
+    values are checked, and lists are turned into tuples.
+
+    miss_threshold: an attack misses when expovariate(defender speed /
+        attacker speed) comes out under this. See solver.miss_chance.
+    same_type_bonus: added to a move's multiplier when the move is the same
+        type as the pyokemon using it.
+    run_odds: (chances, out_of). Running away rolls randint(0, out_of - 1)
+        and gets away if the roll is one of the top chances numbers.
+    stat_growth: each level up, attack, defense and speed go to
+        ceil((stat + 2) * stat_growth).
+    hp_growth: each level up, max HP goes up by floor(max_hp * hp_growth)...
+    hp_cap: ...but never past this.
+    wild_levels: (lowest, highest) level of a wild pyokemon.
+    """
+    __slots__ = ()
+
+    def __new__(cls, miss_threshold=0.25, same_type_bonus=0.33, run_odds=(2, 5), stat_growth=0.99,
+                hp_growth=0.1, hp_cap=200, wild_levels=(2, 10)):
+        # Tuples, not lists, so a Rules can be hashed and used as a cache key.
+        run_odds = tuple(run_odds)
+        wild_levels = tuple(wild_levels)
+        if miss_threshold < 0:
+            raise ValueError("miss_threshold can't be negative")
+        if len(run_odds) != 2 or not 0 <= run_odds[0] <= run_odds[1] or run_odds[1] < 1:
+            raise ValueError("run_odds should be (chances, out_of) with 0 <= chances <= out_of")
+        if stat_growth < 0 or hp_growth < 0:
+            raise ValueError("Growth can't be negative")
+        if hp_cap < 1:
+            raise ValueError("hp_cap has to be at least 1")
+        if len(wild_levels) != 2 or not 0 <= wild_levels[0] <= wild_levels[1] <= 100:
+            raise ValueError("wild_levels should be (lowest, highest), between 0 and 100")
+        return super().__new__(cls, miss_threshold, same_type_bonus, run_odds, stat_growth,
+                               hp_growth, hp_cap, wild_levels)
+
+    @classmethod
+    def _make(cls, iterable):
+        # namedtuple's _replace (and _make) normally build the tuple directly,
+        # which would skip the checks in __new__.
+        return cls(*iterable)
+
+    @property
+    def run_chance(self):
+        """The chance that running away works."""
+        return self.run_odds[0] / self.run_odds[1]
+
+
+# The rules the game has always been played by. Running away has always been
+# randint(0, 4) >= 3, which is 2 chances out of 5.
+DEFAULT = Rules()
+
+# The rules the game is being played by right now.
+active = DEFAULT
+
+
+def activate(new):
+    """Switches the game to new rules (a Rules) until somebody switches again."""
+    global active
+    if not isinstance(new, Rules):
+        raise TypeError("Expected a Rules, got {!r}".format(new))
+    active = new
+
+
+@contextmanager
+def use(new):
+    """Plays by new rules inside a with block, then goes back to the old ones."""
+    old = active
+    activate(new)
+    try:
+        yield new
+    finally:
+        activate(old)
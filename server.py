@@ -0,0 +1,237 @@
+"""
+Play Pyokemon over the network, lots of people at once.
+
+game.wild_battle waits for input(), so one program can only look after one
+player. This module runs the very same game -- the dialogues from game.py and
+Trainer.interview_dialogue -- with asyncio, which lets one program juggle
+thousands of players. While one player is thinking about their next move,
+the program gets on with everybody else's.
+
+The protocol is plain lines of text, so you can play with netcat or telnet:
+
+    python server.py 8000        # in one terminal
+    nc localhost 8000            # in another
+
+Lines from the server are the game's normal output, except that a question
+is sent on its own line starting with "? ". Answer with one line of text.
+"""
+import asyncio
+import sys
+
+import game
+import pyokemans as pk
+from presenters import TextPresenter
+from rng import CounterRNG
+
+# Every question the server asks starts with this, so a program talking to
+# the server can tell questions apart from everything else.
+PROMPT = "? "
+
+
+class SessionPresenter(TextPresenter):
+    """A TextPresenter that sends its text to one player instead of printing it."""
+    def __init__(self, write):
+        self.write = write
+
+    def say(self, *args, sep=' ', end='\n', flush=False):
+        self.write(sep.join(str(arg) for arg in args) + end)
+
+    def ask(self, prompt):
+        raise RuntimeError("Sessions get their answers through Session.ask")
+
+
+async def drive(steps, ask):
+    """
+    Like game.run_dialogue, but for an ask() that has to be awaited: plays out
+    a dialogue, awaiting ask(prompt) for every answer.
+    """
+    answer = None
+    while True:
+        try:
+            prompt = steps.send(answer)
+        except StopIteration as finished:
+            return finished.value
+        answer = await ask(prompt)
+
+
+class Session(object):
+    """
+    One player, from the interview until they quit.
+
+    :param read_line: A coroutine function returning the player's next line, or None if they left.
+    :param write: A function that sends text to the player.
+    :param flush: A coroutine function that waits until the text has been sent.
+    :param rng: This player's own random number generator.
+    :param center_delay: Seconds per beat of the pyokemon center animation.
+    """
+    def __init__(self, read_line, write, flush, rng, center_delay=0.2):
+        self.read_line = read_line
+        self.write = write
+        self.flush = flush
+        self.rng = rng
+        self.center_delay = center_delay
+        self.presenter = SessionPresenter(write)
+        self.trainer = None
+
+    async def ask(self, prompt):
+        self.write(PROMPT + prompt + "\n")
+        await self.flush()
+        line = await self.read_line()
+        if line is None:
+            raise ConnectionResetError("The player left.")
+        return line
+
+    async def run(self):
+        """Plays the game with this player. Returns their Trainer once they quit."""
+        say = self.presenter.say
+        while self.trainer is None:
+            try:
+                self.trainer = await drive(pk.Trainer.interview_dialogue(say=say), self.ask)
+            except KeyError:
+                say("Sorry, that's not one of the choices. Let's start over.")
+        while True:
+            choice = (await self.ask("battle, center, or quit?> ")).strip().lower()
+            if choice == 'center':
+                await game.pyokemon_center_async(self.trainer, self.presenter, self.rng, self.center_delay)
+            elif choice == 'battle':
+                try:
+                    await drive(game.wild_battle_dialogue(self.trainer, self.presenter, self.rng), self.ask)
+                except pk.TooManyPyokemans as err:
+                    say(err)
+            elif choice == 'quit':
+                say("Thanks for playing, {}!".format(self.trainer.name))
+                await self.flush()
+                return self.trainer
+            else:
+                say("Sorry, please type 'battle', 'center', or 'quit'.")
+
+
+class BattleServer(object):
+    """
+    Hands out sessions. Each session gets its own child of the server's
+    random number generator, so one server seed decides every game.
+
+    :param seed: The server's seed. None picks one at random.
+    :param center_delay: Seconds per beat of the pyokemon center animation.
+    """
+    def __init__(self, seed=None, center_delay=0.2):
+        self.rng = CounterRNG(seed)
+        self.center_delay = center_delay
+        self.started = 0
+        self.active = 0
+
+    def session(self, read_line, write, flush):
+        rng = self.rng.split(self.started)
+        self.started += 1
+        return Session(read_line, write, flush, rng, self.center_delay)
+
+    async def _run(self, session):
+        self.active += 1
+        try:
+            return await session.run()
+        except ConnectionError:
+            return None
+        finally:
+            self.active -= 1
+
+    async def handle(self, reader, writer):
+        """Runs one session over a TCP connection."""
+        async def read_line():
+            line = await reader.readline()
+            return line.decode().rstrip("\r\n") if line else None
+
+        def write(text):
+            writer.write(text.encode())
+
+        try:
+            await self._run(self.session(read_line, write, writer.drain))
+        finally:
+            writer.close()
+
+    async def serve(self, host='127.0.0.1', port=8000):
+        """Starts listening for players. Returns the asyncio Server."""
+        return await asyncio.start_server(self.handle, host, port)
+
+    def local(self):
+        """
+        Starts a session that talks over in-memory queues instead of a socket,
+        and returns a LocalConnection for playing it. Handy for tests and load tests.
+        """
+        connection = LocalConnection()
+        session = self.session(connection._inbox.get, connection._buffer.append, connection._flush)
+        connection.task = asyncio.ensure_future(self._run(session))
+        connection.task.add_done_callback(lambda _: connection._outbox.put_nowait(None))
+        return connection
+
+
+class LocalConnection(object):
+    """The player's end of a session started with BattleServer.local()."""
+    def __init__(self):
+        self._inbox = asyncio.Queue()
+        self._outbox = asyncio.Queue()
+        self._buffer = []
+        self.task = None
+
+    async def _flush(self):
+        if self._buffer:
+            self._outbox.put_nowait("".join(self._buffer))
+            del self._buffer[:]
+
+    async def next_prompt(self):
+        """
+        Waits for the next question. Returns (text before it, question), or
+        (text, None) once the session is over.
+        """
+        text = []
+        while True:
+            chunk = await self._outbox.get()
+            if chunk is None:
+                return "".join(text), None
+            # Session.ask sends the question as the last line of a chunk.
+            before, _, last = chunk[:-1].rpartition("\n")
+            if last.startswith(PROMPT):
+                text.append(before + "\n" if before else "")
+                return "".join(text), last[len(PROMPT):]
+            text.append(chunk)
+
+    def answer(self, line):
+        self._inbox.put_nowait(line)
+
+
+class TCPConnection(object):
+    """The player's end of a session over TCP. Works just like LocalConnection."""
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def open(cls, host='127.0.0.1', port=8000):
+        reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    async def next_prompt(self):
+        text = []
+        while True:
+            line = (await self.reader.readline()).decode()
+            if not line:
+                self.writer.close()
+                return "".join(text), None
+            if line.startswith(PROMPT):
+                return "".join(text), line[len(PROMPT):].rstrip("\n")
+            text.append(line)
+
+    def answer(self, line):
+        self.writer.write((line + "\n").encode())
+
+
+def main(port=8000):
+    async def serve():
+        server = await BattleServer().serve(port=port)
+        print("Serving Pyokemon on port {}".format(port))
+        async with server:
+            await server.serve_forever()
+    asyncio.run(serve())
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,374 @@
+"""
+Work out exactly how likely a battle is to go each way, instead of fighting
+it thousands of times.
+
+Fighting lots of battles (engine.battle, batch.py) gives an estimate that
+only gets better slowly: to halve the error you have to fight four times as
+many battles. But the rules of a battle are all dice rolls with known odds,
+so we can add up the odds directly.
+
+The trick that makes this quick: when both sides pick random moves, what
+one side does never depends on what the other side does. A's attacks all
+have the same odds whether B is hurt or not, and neither side ever runs out
+of moves (there is always Struggle). So we can work out, for each side on
+its own,
+
+    "how likely is it to knock the other side out with exactly its t-th attack?"
+
+and then stitch the two answers together. Each side attacks once a round
+until someone faints, so whoever needs fewer attacks wins; if both need the
+same number, whoever goes first in that round wins. The odds of going first
+are the same every round.
+
+Working out "its t-th attack" splits in two again. Which move gets picked
+only depends on PP, and the order moves were used in doesn't change how much
+damage they did. So we walk over the PP states (many paths lead to the same
+state, so we keep one probability per state rather than one per path), and
+separately add up the damage of n uses of each move. Everything is
+remembered (memoized), so each piece of work is only done once.
+
+It's quick at low levels and slow at high ones. Past level 20 or so HP is
+big and most attacks are Struggle, which only does a point or two, so a
+battle takes hundreds of attacks and each one is another pass over the
+damage done so far. One pair of pyokemon takes about 4ms at level 10, 13ms
+at level 30 and 25ms at level 50 (it's quick again by level 100, where
+real moves knock anybody out in a hit or two). A table of every pair of 6
+species over levels 1-10 takes about 4s, 1-20 about 30s, and 1-30 about 3
+minutes; levels 41-50 alone take about 40s. Worst of all is a pyokemon
+that hardly ever hits, like a level 1 one against a level 50 one: it needs
+so many attacks that that one pair can take minutes, so a table of every
+level from 1 to 100 isn't practical.
+
+    python solver.py [max level]   # fills a table of levels 1 to max level
+                                   # (20 by default), then checks it
+                                   # against engine.battle
+"""
+import random
+import sys
+import time
+from collections import namedtuple
+from functools import lru_cache
+from math import exp, inf, sqrt
+
+import engine
+import rules
+import pyokemans as pk
+from damage import damage_table
+
+# Probability mass smaller than this is dropped. Misses can in principle go
+# on forever, so without a cut-off some walks would never end.
+TOLERANCE = 1e-13
+
+# A chance of having done exactly x damage that's smaller than this is
+# dropped too. It matters at high levels, where the defender has lots of HP
+# and each attack only does a point or two: the chances pile up in a narrow
+# band, and there's no point adding up all the zeros on either side of it.
+# It's tiny so that what gets dropped can never add up to TOLERANCE, even
+# over the hundreds of thousands of attacks a battle can (rarely) take;
+# otherwise the walk in knockout_times might never finish.
+NEGLIGIBLE = 1e-30
+
+# How a battle between p1 and p2 is likely to go. p1_wins and p2_wins are
+# probabilities; whatever is left over is the chance that nobody ever faints.
+# turns is the expected number of rounds.
+Odds = namedtuple("Odds", ["p1_wins", "p2_wins", "turns"])
+
+
+def hit_damage(attack, power, multiplier, defense):
+    """
+    Returns ((damage, probability), ...) for one attack that hits, using
+    the same sums as engine.attack: the roll is uniform between
+    floor(attack/2) and attack. It comes from damage.py's cache, which only
+    the solver and ai.py read; engine.attack rolls its damage directly.
+    """
+    return damage_table(attack, power, multiplier, defense).outcomes
+
+
+def miss_chance(attacker_speed, defender_speed):
+    """
+    engine.attack misses when expovariate(defender_speed / attacker_speed)
+    comes out under the miss threshold m (0.25 in rules.DEFAULT). For an
+    exponential variable with rate l, that happens with probability
+    1 - e^(-m * l).
+    """
+    return 1 - exp(-rules.active.miss_threshold * defender_speed / attacker_speed)
+
+
+@lru_cache(maxsize=None)
+def first_chance(p1_speed, p2_speed):
+    """
+    The chance that p1 attacks first in a round: randint(0, 10) + speed has
+    to be strictly bigger for p1, because ties go to p2.
+    """
+    wins = sum(1 for a in range(11) for b in range(11) if a + p1_speed > b + p2_speed)
+    return wins / 121
+
+
+def _attacker(pkmn):
+    moves = tuple((move.power, move.type_id, move.pp) for move in pkmn.moves)
+    return (pkmn.attack, pkmn.speed, pkmn.type_id, moves)
+
+
+def _defender(pkmn):
+    return (pkmn.hp, pkmn.defense, pkmn.speed, pkmn.type_id)
+
+
+@lru_cache(maxsize=None)
+def _next_pps(pps):
+    """
+    Where the PP on each move could be after one more random_move, and the
+    chance of each. Struggle doesn't use up any PP.
+    """
+    available = [slot for slot, pp in enumerate(pps) if pp > 0]
+    if not available:
+        return ((pps, 1.0),)
+    return tuple((pps[:slot] + (pps[slot] - 1,) + pps[slot + 1:], 1 / len(available)) for slot in available)
+
+
+def _convolve(dist, outcomes, hp):
+    """
+    Adds one more attack to dist, where dist[x] is the chance of having done
+    x damage so far. Everything from hp up is lumped together in dist[hp],
+    because the defender faints either way.
+    """
+    # Only look at the band of chances that aren't negligible (see
+    # NEGLIGIBLE), from low up to (but not including) high.
+    low = 0
+    while low < hp and dist[low] < NEGLIGIBLE:
+        low += 1
+    high = hp
+    while high > low and dist[high - 1] < NEGLIGIBLE:
+        high -= 1
+    total = [0.0] * (hp + 1)
+    for damage, q in outcomes:
+        # Everything from cut up reaches hp with this much damage.
+        cut = min(high, max(low, hp - damage))
+        if cut > low:
+            start, end = low + damage, cut + damage
+            total[start:end] = [t + q * x for t, x in zip(total[start:end], dist[low:cut])]
+        total[hp] += q * (sum(dist[cut:high]) + dist[hp])
+    return total
+
+
+# How many knockout_times answers to remember. table() asks for every
+# (attacker, defender) pair, and each one comes up twice (once from each
+# side), so a table of n (species, level) entries wants n * n of them: this
+# is enough for main()'s table and then some. Past that the least recently
+# used are forgotten and worked out again if they come back.
+CACHE_SIZE = 2 ** 15
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def knockout_times(attacker, defender, game_rules, table):
+    """
+    Returns (p, rest): p[t] is the chance that the attacker knocks the
+    defender out with exactly its (t+1)-th attack, and rest is the chance it
+    never does (or does so too rarely to matter -- see TOLERANCE).
+
+    attacker is (attack, speed, type ID, ((power, type ID, pp), ...)) and
+    defender is (hp, defense, speed, type ID); see _attacker and _defender.
+    game_rules should be rules.active, and table pk.type_table(). The
+    answer depends on both, so they have to be part of the cache key. A
+    TypeTable is made afresh whenever the chart (or the same-type bonus)
+    changes, so an edited chart means a new key. The cache holds on to
+    old tables until their answers are pushed out (see CACHE_SIZE), so a
+    new table can never be mistaken for an old one.
+    """
+    attack, speed, pktype, moves = attacker
+    hp, defense, defender_speed, defender_type = defender
+    if hp <= 0:
+        return (1.0,), 0.0
+    miss = miss_chance(speed, defender_speed)
+
+    def outcomes(power, move_type):
+        # (damage, probability) for one use of a move, misses included.
+        multiplier = table.multipliers[(move_type * table.size + pktype) * table.size + defender_type]
+        hits = hit_damage(attack, power, multiplier, defense)
+        return ((0, miss),) + tuple((damage, (1 - miss) * p) for damage, p in hits)
+
+    # Which move gets picked never depends on how much damage was done, and
+    # the order moves were used in doesn't change the total damage. So "has
+    # the defender fainted after k attacks?" only depends on how many times
+    # each move was used, and we can work the two parts out separately:
+    #
+    # * the chance of each (uses of move 1, uses of move 2, ...) after k
+    #   attacks, which only depends on PP, and
+    # * the chance that that many uses of each move add up to hp or more.
+    per_move = [outcomes(power, move_type) for power, move_type, _ in moves]
+    struggle = outcomes(pk.Struggle.power, pk.Struggle.type_id)
+    struggle_hurts = any(damage > 0 and p > 0 for damage, p in struggle)
+    start = [1.0] + [0.0] * hp
+
+    # powers[j][n] is the damage done by n uses of move j.
+    powers = [[start] for _ in moves]
+
+    def power(j, n):
+        while len(powers[j]) <= n:
+            powers[j].append(_convolve(powers[j][-1], per_move[j], hp))
+        return powers[j][n]
+
+    # The last move is handled with a running total instead: at_least[n][x]
+    # is the chance that n uses of it do at least hp - x damage.
+    at_least = {}
+
+    def tail(n):
+        if n not in at_least:
+            dist = power(len(moves) - 1, n)
+            running = [0.0] * (hp + 1)
+            total = 0.0
+            for x in range(hp + 1):
+                total += dist[hp - x]
+                running[x] = total
+            at_least[n] = running
+        return at_least[n]
+
+    # before[used] is the damage done by all but the last move, where used
+    # says how many times each of those moves was used.
+    before = {(): start}
+
+    def damage_before(used):
+        if used not in before:
+            j = len(used) - 1
+            if used[j]:
+                shorter = used[:j] + (used[j] - 1,)
+                before[used] = _convolve(damage_before(shorter), per_move[j], hp)
+            else:
+                before[used] = damage_before(used[:j])
+        return before[used]
+
+    def fainted(used):
+        # The chance the defender has fainted after these uses of each move.
+        return sum(map(float.__mul__, damage_before(used[:-1]), tail(used[-1])))
+
+    full = tuple(pp for _, _, pp in moves)
+    out = tuple(0 for _ in moves)
+    # Every attack uses up one PP or one Struggle, so once all of the PP is
+    # gone, the k-th attack is always Struggle number k - total_pp.
+    total_pp = sum(full)
+    struggling = damage_before(full) if total_pp == 0 else None
+    # chances maps the PP left on each move to the chance of being there.
+    chances = {full: 1.0}
+    p = []
+    done = 0.0
+    k = 0
+    while True:
+        k += 1
+        following = {}
+        for pps, chance in chances.items():
+            for after, share in _next_pps(pps):
+                following[after] = following.get(after, 0.0) + chance * share
+        chances = following
+
+        now = 0.0
+        for pps, chance in chances.items():
+            if pps != out:
+                now += chance * fainted(tuple(f - pp for f, pp in zip(full, pps)))
+        if k == total_pp:
+            struggling = damage_before(full)
+        elif k > total_pp:
+            struggling = _convolve(struggling, struggle, hp)
+        if out in chances:
+            now += chances[out] * struggling[hp]
+        p.append(max(0.0, now - done))
+        done = max(done, now)
+        if 1 - done < TOLERANCE:
+            break
+        if not struggle_hurts and list(chances) == [out]:
+            # Only Struggle is left, and it can't do any damage.
+            break
+    return tuple(p), max(0.0, 1 - done)
+
+
+def odds(p1, p2):
+    """
+    Works out how a battle between p1 and p2 would go if both picked random
+    moves, from their current HP and PP. Returns an Odds record.
+
+    Neither pyokemon is changed.
+    """
+    table = pk.type_table()
+    a, rest_a = knockout_times(_attacker(p1), _defender(p2), rules.active, table)
+    b, rest_b = knockout_times(_attacker(p2), _defender(p1), rules.active, table)
+    first = first_chance(p1.speed, p2.speed)
+
+    p1_wins = p2_wins = 0.0
+    # left_a is the chance that p1 hasn't knocked p2 out before round t.
+    left_a = left_b = 1.0
+    turns = 0.0
+    for t in range(max(len(a), len(b))):
+        pa = a[t] if t < len(a) else 0.0
+        pb = b[t] if t < len(b) else 0.0
+        # Nobody has fainted before this round, so it gets fought.
+        turns += left_a * left_b
+        # p1 wins this round if its attack knocks p2 out and either p2's
+        # wouldn't have, or p1 goes first.
+        p1_wins += pa * (left_b - pb + pb * first)
+        p2_wins += pb * (left_a - pa + pa * (1 - first))
+        left_a -= pa
+        left_b -= pb
+    if rest_a > TOLERANCE and rest_b > TOLERANCE:
+        # Neither side can finish the job, so some battles never end.
+        turns = inf
+    return Odds(p1_wins, p2_wins, turns)
+
+
+def table(species, levels):
+    """
+    Works out the odds for every (species, level) against every other
+    (species, level), at full health.
+
+    Returns a dict mapping ((species_a, level_a), (species_b, level_b)) to an
+    Odds record, keyed like batch.win_rates.
+    """
+    entries = [(s, level) for s in species for level in levels]
+    protos = {entry: entry[0](entry[1]) for entry in entries}
+    return {((x[0].__name__, x[1]), (y[0].__name__, y[1])): odds(protos[x], protos[y])
+            for x in entries for y in entries}
+
+
+def simulated(species_a, level_a, species_b, level_b, n=10000, seed=None):
+    """
+    The slow way: fights n battles with engine.battle. Returns (fraction
+    species_a won, average number of rounds).
+    """
+    rng = random.Random(seed)
+    wins = rounds = 0
+    for _ in range(n):
+        a, b = species_a(level_a), species_b(level_b)
+        result = engine.battle(a, b, rng=rng)
+        wins += result[-1].fainter is b
+        rounds += len(result)
+    return wins / n, rounds / n
+
+
+def check(pairs, n=20000, seed=0):
+    """
+    Compares odds() against simulated() for each (species_a, level_a,
+    species_b, level_b) in pairs, printing how many standard errors apart
+    they are. Anything within about 3 is as close as the simulation can tell.
+    """
+    print("{:>22} {:>22} {:>8} {:>8} {:>6} {:>8} {:>8}".format(
+        "p1", "p2", "exact", "sim", "SE", "turns", "sim"))
+    for species_a, level_a, species_b, level_b in pairs:
+        exact = odds(species_a(level_a), species_b(level_b))
+        rate, rounds = simulated(species_a, level_a, species_b, level_b, n, seed)
+        error = sqrt(max(exact.p1_wins * (1 - exact.p1_wins), 1e-12) / n)
+        print("{:>22} {:>22} {:>8.4f} {:>8.4f} {:>+6.1f} {:>8.3f} {:>8.3f}".format(
+            "{} {}".format(species_a.__name__, level_a), "{} {}".format(species_b.__name__, level_b),
+            exact.p1_wins, rate, (rate - exact.p1_wins) / error, exact.turns, rounds))
+
+
+def main(max_level=20):
+    species = [pk.Charmander, pk.Squirtle, pk.Bulbasaur, pk.Diglett, pk.Pidgey, pk.Pikachu]
+    levels = range(1, max_level + 1)
+    started = time.perf_counter()
+    odds_table = table(species, levels)
+    print("{} species x {} levels: {} pairs in {:.2f}s".format(
+        len(species), len(levels), len(odds_table), time.perf_counter() - started))
+    print()
+    r = random.Random(0)
+    check([(r.choice(species), r.choice(levels), r.choice(species), r.choice(levels)) for _ in range(10)])
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,272 @@
+"""
+Save trainers (and their pyokemon) to disk, and load them back.
+
+A TrainerStore is two files:
+
+* path.dat holds one fixed-size record per trainer: their roster of up to six
+  pyokemon, with each one's level, XP, HP, stats and move PP. Because every
+  record is the same size, trainer number i always starts at the same place
+  in the file, so we can jump straight to it. The file is memory-mapped,
+  which lets us treat it like one big bytes object and lets the operating
+  system worry about which parts are actually in memory.
+* path.str holds the text: trainer names, nicknames, which class each
+  pyokemon is, and which moves it knows. Text comes in all lengths, so it
+  lives in its own file and the records just say where to find it.
+
+Nothing is turned back into Pyokemon objects until you load() a trainer,
+and changing one pyokemon's HP, XP or PP only rewrites those few bytes.
+"""
+import importlib
+import mmap
+import os
+import struct
+
+import pyokemans as pk
+
+MAGIC = b'PYOK'
+VERSION = 1
+MAX_ROSTER = 6
+MAX_MOVES = 5
+
+# The struct module packs numbers into bytes and back. Each letter is one
+# field: Q is an 8-byte unsigned number, q a signed one, I is 4 bytes, H is 2,
+# B is 1 and 4s is four raw bytes. '<' means little-endian with no padding between fields.
+HEADER = struct.Struct('<4sHIQ')
+# A piece of text: where it starts in the .str file, and how long it is.
+TEXT = 'QI'
+# One pyokemon: class, nickname, level, xp, hp, max_hp, attack, defense,
+# speed, how many moves, then (move, pp) for each of the five move slots.
+CREATURE = struct.Struct('<' + TEXT + TEXT + 'IqIIIIIB' + (TEXT + 'q') * MAX_MOVES)
+# One trainer: name, roster size, then six pyokemon.
+TRAINER = struct.Struct('<' + TEXT + 'B' + CREATURE.format[1:] * MAX_ROSTER)
+HEADER_SIZE = 32
+# How many numbers one CREATURE unpacks to.
+_CREATURE_FIELDS = 12 + 3 * MAX_MOVES
+
+# Offsets of the fields we update in place, within a CREATURE.
+_LEVEL_XP_HP = struct.Struct('<IqI')
+_LEVEL_OFFSET = 2 * struct.calcsize('<' + TEXT)
+_PP = struct.Struct('<q')
+_STATS_SIZE = struct.calcsize('<IqIIIIIB')
+_MOVE = struct.Struct('<' + TEXT + 'q')
+
+# A nickname of None (rather than "") is stored with this length.
+_NONE = 0xFFFFFFFF
+# Fields of a move's definition are separated by this character.
+_SEP = '\x1f'
+
+
+def _class_path(cls):
+    return "{}.{}".format(cls.__module__, cls.__qualname__)
+
+
+def _load_class(path):
+    module, _, name = path.rpartition('.')
+    return getattr(importlib.import_module(module), name)
+
+
+class TrainerStore(object):
+    """
+    A file full of trainers.
+
+    :param path: Where to keep the store; '.dat' and '.str' are added to it.
+        The files are created if they don't exist yet.
+    """
+    def __init__(self, path):
+        self.path = path
+        new = not os.path.exists(path + '.dat')
+        self._data = open(path + '.dat', 'w+b' if new else 'r+b')
+        self._text = open(path + '.str', 'w+b' if new else 'r+b')
+        if new:
+            self._data.write(HEADER.pack(MAGIC, VERSION, TRAINER.size, 0).ljust(HEADER_SIZE, b'\0'))
+            self._data.flush()
+        self._map = mmap.mmap(self._data.fileno(), 0)
+        magic, version, size, self._count = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION or size != TRAINER.size:
+            raise ValueError("{}.dat isn't a trainer store this version can read".format(path))
+        self._text_end = os.fstat(self._text.fileno()).st_size
+        # Class names and moves come up over and over again, so we only
+        # write each one to the .str file once per session (and not at all
+        # if the record we're overwriting already points at it).
+        self._symbols = {}
+
+    def __len__(self):
+        return self._count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def flush(self):
+        """Makes sure everything written so far is on disk."""
+        self._map.flush()
+        self._text.flush()
+
+    def close(self):
+        self.flush()
+        self._map.close()
+        self._data.close()
+        self._text.close()
+
+    # TEXT
+
+    def _write_text(self, text, old=(0, _NONE)):
+        """
+        Writes text to the .str file and returns (offset, length). old is
+        where the field being overwritten kept its text: if that already
+        says the same thing we use it again, so saving a trainer that
+        hasn't been renamed doesn't make the file any bigger.
+        """
+        if text is None:
+            return (0, _NONE)
+        data = text.encode()
+        offset, length = old
+        if length == len(data) and os.pread(self._text.fileno(), length, offset) == data:
+            return (offset, length)
+        offset = self._text_end
+        os.pwrite(self._text.fileno(), data, offset)
+        self._text_end += len(data)
+        return (offset, len(data))
+
+    def _read_text(self, offset, length):
+        if length == _NONE:
+            return None
+        return os.pread(self._text.fileno(), length, offset).decode()
+
+    def _symbol(self, text, old=(0, _NONE)):
+        try:
+            return self._symbols[text]
+        except KeyError:
+            self._symbols[text] = self._write_text(text, old)
+            return self._symbols[text]
+
+    # RECORDS
+
+    def _offset(self, index, slot=None):
+        if not 0 <= index < self._count:
+            raise IndexError("No trainer number {} in this store".format(index))
+        offset = HEADER_SIZE + index * TRAINER.size
+        if slot is not None:
+            offset += struct.calcsize('<' + TEXT + 'B') + slot * CREATURE.size
+        return offset
+
+    def _grow(self, count):
+        """Makes room for count trainers, doubling the file so we don't grow it every time."""
+        needed = HEADER_SIZE + count * TRAINER.size
+        if needed > len(self._map):
+            self._map.resize(max(needed, 2 * len(self._map)))
+
+    def _pack_creature(self, pkmn, old):
+        # old is the CREATURE being overwritten, unpacked, so its text can be
+        # used again where it hasn't changed.
+        moves = list(pkmn.moves)
+        if len(moves) > MAX_MOVES:
+            raise ValueError("{} knows more than {} moves".format(pkmn.name, MAX_MOVES))
+        fields = list(self._symbol(_class_path(type(pkmn)), old[0:2]))
+        fields += self._write_text(pkmn.nickname, old[2:4])
+        fields += [pkmn.level, pkmn.xp, pkmn.hp, pkmn.max_hp, pkmn.attack, pkmn.defense, pkmn.speed, len(moves)]
+        for m, move in enumerate(moves):
+            definition = _SEP.join(str(field) for field in (move.name, move.pktype, move.power, move._max_pp))
+            fields += self._symbol(definition, old[12 + 3 * m:14 + 3 * m]) + (move.pp,)
+        fields += [0, 0, 0] * (MAX_MOVES - len(moves))
+        return fields
+
+    def _pack(self, trainer, old):
+        roster = list(trainer.roster)
+        if len(roster) > MAX_ROSTER:
+            raise pk.TooManyPyokemans("A store can only hold {} pyokemon per trainer".format(MAX_ROSTER))
+        fields = list(self._write_text(trainer.name, old[0:2])) + [len(roster)]
+        for slot, pkmn in enumerate(roster):
+            start = 3 + slot * _CREATURE_FIELDS
+            fields += self._pack_creature(pkmn, old[start:start + _CREATURE_FIELDS])
+        fields += [0] * ((MAX_ROSTER - len(roster)) * _CREATURE_FIELDS)
+        return TRAINER.pack(*fields)
+
+    def append(self, trainer):
+        """Adds a trainer to the end of the store. Returns their index."""
+        index = self._count
+        self._grow(index + 1)
+        self._count += 1
+        self.save(index, trainer)
+        HEADER.pack_into(self._map, 0, MAGIC, VERSION, TRAINER.size, self._count)
+        return index
+
+    def save(self, index, trainer):
+        """Overwrites trainer number index with trainer."""
+        offset = self._offset(index)
+        self._map[offset:offset + TRAINER.size] = self._pack(trainer, TRAINER.unpack_from(self._map, offset))
+
+    def name(self, index):
+        """Returns the name of trainer number index, without loading anything else."""
+        offset, length = struct.unpack_from('<' + TEXT, self._map, self._offset(index))
+        return self._read_text(offset, length)
+
+    def roster_size(self, index):
+        """Returns how many pyokemon trainer number index has."""
+        return self._map[self._offset(index) + struct.calcsize('<' + TEXT)]
+
+    def load(self, index):
+        """Loads trainer number index, and all their pyokemon, back into objects."""
+        fields = TRAINER.unpack_from(self._map, self._offset(index))
+        trainer = pk.Trainer(self._read_text(fields[0], fields[1]))
+        count = fields[2]
+        for slot in range(count):
+            start = 3 + slot * _CREATURE_FIELDS
+            trainer.add_pkmn(self._unpack_creature(fields[start:start + _CREATURE_FIELDS]))
+        return trainer
+
+    def load_pyokemon(self, index, slot):
+        """Loads just one of a trainer's pyokemon."""
+        if not 0 <= slot < self.roster_size(index):
+            raise IndexError("Trainer {} has no pyokemon in slot {}".format(index, slot))
+        return self._unpack_creature(CREATURE.unpack_from(self._map, self._offset(index, slot)))
+
+    def _unpack_creature(self, fields):
+        cls = _load_class(self._read_text(fields[0], fields[1]))
+        # A level 0 pyokemon has had no level ups, so it's cheap to make.
+        # Then we put the saved numbers back in place.
+        pkmn = cls(0)
+        pkmn.nickname = self._read_text(fields[2], fields[3])
+        (pkmn._level, pkmn._xp, pkmn._hp, pkmn._max_hp,
+         pkmn._attack, pkmn._defense, pkmn._speed, moves) = fields[4:12]
+        pkmn._moves = []
+        for m in range(moves):
+            offset, length, pp = fields[12 + 3 * m:15 + 3 * m]
+            name, pktype, power, max_pp = self._read_text(offset, length).split(_SEP)
+            move = pk.Move(name, pktype, int(power), int(max_pp))
+            move._pp = pp
+            pkmn._moves.append(move)
+        return pkmn
+
+    # IN-PLACE UPDATES
+
+    def update(self, index, slot, hp=None, xp=None, pp=None):
+        """
+        Changes one pyokemon's HP, XP and/or move PP (a list, one per move)
+        right there in the file, without touching anything else. A new
+        level means new stats too, so for that use save_pyokemon.
+        """
+        if not 0 <= slot < self.roster_size(index):
+            raise IndexError("Trainer {} has no pyokemon in slot {}".format(index, slot))
+        offset = self._offset(index, slot) + _LEVEL_OFFSET
+        old_level, old_xp, old_hp = _LEVEL_XP_HP.unpack_from(self._map, offset)
+        _LEVEL_XP_HP.pack_into(self._map, offset,
+                               old_level,
+                               old_xp if xp is None else xp,
+                               old_hp if hp is None else hp)
+        if pp is not None:
+            moves = self._map[offset + _STATS_SIZE - 1]
+            if len(pp) != moves:
+                raise ValueError("That pyokemon knows {} moves, not {}".format(moves, len(pp)))
+            for m, value in enumerate(pp):
+                _PP.pack_into(self._map, offset + _STATS_SIZE + m * _MOVE.size + _MOVE.size - _PP.size, value)
+
+    def save_pyokemon(self, index, slot, pkmn):
+        """Writes one pyokemon back to its slot, for example after a battle."""
+        if not 0 <= slot < self.roster_size(index):
+            raise IndexError("Trainer {} has no pyokemon in slot {}".format(index, slot))
+        offset = self._offset(index, slot)
+        CREATURE.pack_into(self._map, offset, *self._pack_creature(pkmn, CREATURE.unpack_from(self._map, offset)))
+
@@ -0,0 +1,285 @@
+"""
+What happens to the game if we change the rules?
+
+A sweep fights the same matchups under lots of different Rules (see
+rules.py) and adds up who won each time. You can list the rules to try
+yourself, build every combination of a few values with grid(), or pick
+some at random with random_rules():
+
+    points = sweep.grid(miss_threshold=[0.1, 0.25, 0.5], same_type_bonus=[0, 0.33, 0.66])
+    matchups = [sweep.Matchup("Charmander", 5, "Squirtle", 5),
+                sweep.Matchup("Pikachu", None, "Pidgey", None)]
+    results = sweep.run(points, matchups, seeds=range(4), battles=200, cache=".sweep")
+    for rules, summary in sweep.summarize(results).items():
+        print(rules, summary)
+
+Every (rules, seed, matchup) is a Task. Tasks are fought in parallel
+across a multiprocessing Pool, each with its own random number generators
+(see rng.py), so a Task always comes out the same, however many workers
+there are.
+
+That means a Task's Outcome never has to be worked out twice. Give run() a
+cache directory and every Outcome is saved there under a hash of its Task
+-- the file's name says exactly what's in it, so this is called a
+content-addressed store. Run a sweep that overlaps one you've already done
+and only the new Tasks get fought.
+
+    python sweep.py [cache directory] [workers]
+"""
+import hashlib
+import json
+import multiprocessing
+import os
+import random
+import sys
+from collections import namedtuple
+from itertools import product
+
+import engine
+import pyokemans as pk
+import registry
+import rules
+from rng import derive
+
+# Bump this whenever the way a Task is fought changes, so old Outcomes in
+# a cache aren't mistaken for new ones.
+VERSION = 1
+
+# A battle nobody has won after this many rounds is a draw.
+MAX_ROUNDS = 1000
+
+# Who fights whom. Species go by name, so a Matchup is easy to save and to
+# send to another process. A level of None means a wild level, rolled from
+# the rules' wild_levels for every battle.
+Matchup = namedtuple("Matchup", ["species_a", "level_a", "species_b", "level_b"])
+
+# One point of a sweep: fight matchup battles times under rules. seed
+# decides every roll of the dice.
+Task = namedtuple("Task", ["rules", "seed", "matchup", "battles"])
+
+# How a Task turned out: wins for each side, draws, and rounds fought in all.
+Outcome = namedtuple("Outcome", ["wins_a", "wins_b", "draws", "rounds"])
+
+# A Task and its Outcome. cached is True if the Outcome came from the cache.
+Result = namedtuple("Result", ["task", "outcome", "cached"])
+
+
+# PICKING RULES
+
+def grid(base=rules.DEFAULT, **axes):
+    """
+    Returns a Rules for every combination of the values given, with
+    everything else as in base:
+
+        grid(miss_threshold=[0.1, 0.25], hp_cap=[100, 200])   # 4 Rules
+    """
+    names = list(axes)
+    return [base._replace(**dict(zip(names, values))) for values in product(*(axes[name] for name in names))]
+
+
+def random_rules(n, ranges, seed=0, base=rules.DEFAULT):
+    """
+    Returns n Rules picked at random, with everything not in ranges as in base.
+
+    :param ranges: For each field to change, either a tuple (low, high) --
+        a whole number between them if both are ints, or any number between
+        them otherwise -- or a list of values to choose from.
+    :param seed: The same seed picks the same Rules, so two random sweeps
+        with the same seed share their cached results.
+    """
+    r = random.Random(derive(seed, 'random_rules'))
+    picked = []
+    for _ in range(n):
+        changes = {}
+        for name in sorted(ranges):
+            choices = ranges[name]
+            if isinstance(choices, list):
+                changes[name] = r.choice(choices)
+            elif all(isinstance(end, int) for end in choices):
+                changes[name] = r.randint(*choices)
+            else:
+                changes[name] = r.uniform(*choices)
+        picked.append(base._replace(**changes))
+    return picked
+
+
+# FIGHTING
+
+def _species(name):
+    return getattr(pk, name)
+
+
+def fight(task):
+    """Fights one Task, under its rules, and returns its Outcome."""
+    species_a, level_a, species_b, level_b = task.matchup
+    kinds = _species(species_a), _species(species_b)
+    wins = [0, 0]
+    draws = rounds = 0
+    with rules.use(task.rules):
+        low, high = task.rules.wild_levels
+        for battle in range(task.battles):
+            r = random.Random(derive(task.seed, battle))
+            a = kinds[0](r.randint(low, high) if level_a is None else level_a)
+            b = kinds[1](r.randint(low, high) if level_b is None else level_b)
+            for _ in range(MAX_ROUNDS):
+                fainter = engine.fight_round(a, b, rng=r).fainter
+                rounds += 1
+                if fainter is not None:
+                    wins[fainter is a] += 1
+                    break
+            else:
+                draws += 1
+    return Outcome(wins[0], wins[1], draws, rounds)
+
+
+def _fight(numbered):
+    i, task = numbered
+    return i, fight(task)
+
+
+def tasks(points, matchups, seeds=(0,), battles=100):
+    """Every Task in a sweep: each of the rules in points, with each seed, on each matchup."""
+    found = []
+    for point in points:
+        for seed in seeds:
+            for matchup in matchups:
+                # Each matchup gets its own dice, worked out from the seed.
+                found.append(Task(point, derive(seed, *matchup), Matchup(*matchup), battles))
+    return found
+
+
+# THE CACHE
+
+def task_key(task):
+    """
+    The name a Task's Outcome is saved under: a SHA-256 hash of everything
+    that decides how the Task turns out -- the Task itself, and the game
+    data it's fought with: the species and moves in the registry, and the
+    type chart. Like rng.derive, this is the same on every machine and
+    every time Python starts.
+    """
+    chart = {attacker: dict(row) for attacker, row in pk.pktypes.items()}
+    text = json.dumps({'version': VERSION, 'max_rounds': MAX_ROUNDS, 'rules': task.rules._asdict(),
+                       'seed': task.seed, 'matchup': list(task.matchup), 'battles': task.battles,
+                       'data': registry.default.digest(), 'chart': chart},
+                      sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+class ResultCache(object):
+    """
+    Outcomes saved on disk, one small JSON file each, named by task_key.
+    Files are spread over 256 folders by the first two letters of their
+    name, so no one folder gets too big.
+
+    A file is written under a temporary name and then renamed into place.
+    Renaming is all-or-nothing, so a sweep that gets interrupted never
+    leaves half an Outcome behind, and two sweeps sharing a cache can't
+    trip over each other.
+
+    :param directory: Where to keep the files. It's made if it isn't there.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key[2:] + '.json')
+
+    def get(self, task):
+        """The saved Outcome of task, or None if there isn't one."""
+        try:
+            with open(self._path(task_key(task))) as f:
+                outcome = Outcome(*json.load(f)['outcome'])
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return outcome
+
+    def put(self, task, outcome):
+        """Saves the Outcome of task."""
+        path = self._path(task_key(task))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = "{}.{}.tmp".format(path, os.getpid())
+        with open(temporary, 'w') as f:
+            # The task goes in too, so you can see what a file is about.
+            json.dump({'task': {'rules': task.rules._asdict(), 'seed': task.seed,
+                                'matchup': task.matchup._asdict(), 'battles': task.battles},
+                       'outcome': list(outcome)}, f)
+        os.replace(temporary, path)
+
+
+def run(points, matchups, seeds=(0,), battles=100, cache=None, workers=None, chunksize=4):
+    """
+    Fights a whole sweep and returns a Result for every Task, in the order
+    tasks() lists them.
+
+    :param points: The Rules to try.
+    :param matchups: The Matchups to fight under each of them.
+    :param seeds: Each (rules, matchup) is fought once per seed.
+    :param battles: How many battles each Task fights.
+    :param cache: A ResultCache, or a directory to keep one in. None means no cache.
+    :param workers: How many processes to use. Defaults to one per CPU; 1 means no pool at all.
+    """
+    if isinstance(cache, str):
+        cache = ResultCache(cache)
+    todo = tasks(points, matchups, seeds, battles)
+    outcomes = [None] * len(todo)
+    missing = []
+    for i, task in enumerate(todo):
+        if cache is not None:
+            outcomes[i] = cache.get(task)
+        if outcomes[i] is None:
+            missing.append((i, task))
+
+    def finished(i, outcome):
+        outcomes[i] = outcome
+        # Only this process writes to the cache, as each Outcome arrives, so
+        # whatever got done before an interruption is kept.
+        if cache is not None:
+            cache.put(todo[i], outcome)
+
+    if missing and workers == 1:
+        for i, task in missing:
+            finished(i, fight(task))
+    elif missing:
+        with multiprocessing.Pool(workers) as pool:
+            for i, outcome in pool.imap_unordered(_fight, missing, chunksize):
+                finished(i, outcome)
+    fought = {i for i, _ in missing}
+    return [Result(task, outcomes[i], i not in fought) for i, task in enumerate(todo)]
+
+
+# ADDING UP
+
+# How one set of rules did over every matchup and seed in a sweep.
+Summary = namedtuple("Summary", ["battles", "win_rate_a", "draw_rate", "average_rounds"])
+
+
+def summarize(results):
+    """Returns {rules: Summary}, in the order the rules first appear in results."""
+    totals = {}
+    for result in results:
+        wins_a, battles, draws, rounds = totals.get(result.task.rules, (0, 0, 0, 0))
+        outcome = result.outcome
+        totals[result.task.rules] = (wins_a + outcome.wins_a, battles + result.task.battles,
+                                     draws + outcome.draws, rounds + outcome.rounds)
+    return {point: Summary(battles, wins_a / battles, draws / battles, rounds / battles)
+            for point, (wins_a, battles, draws, rounds) in totals.items()}
+
+
+if __name__ == '__main__':
+    directory = sys.argv[1] if len(sys.argv) > 1 else '.sweep-cache'
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    points = grid(miss_threshold=[0.1, 0.25, 0.5], same_type_bonus=[0, 0.33, 0.66])
+    matchups = [Matchup("Charmander", 5, "Squirtle", 5), Matchup("Bulbasaur", 5, "Charmander", 5),
+                Matchup("Pikachu", None, "Pidgey", None)]
+    results = run(points, matchups, seeds=range(4), battles=100, cache=directory, workers=workers)
+    print("{} tasks, {} from the cache".format(len(results), sum(result.cached for result in results)))
+    print("{:>6} {:>6} {:>10} {:>8} {:>10}".format("miss", "stab", "a wins", "draws", "rounds"))
+    for point, summary in summarize(results).items():
+        print("{:>6} {:>6} {:>10.1%} {:>8.1%} {:>10.2f}".format(
+            point.miss_threshold, point.same_type_bonus, summary.win_rate_a, summary.draw_rate,
+            summary.average_rounds))
@@ -0,0 +1,156 @@
+"""
+A round-robin tournament: every species fights every other species, at every
+combination of levels you ask for, as many times as you like.
+
+Battles are spread across several processes with multiprocessing, so a
+tournament can use every core on the machine. Each match gets its own seed,
+worked out from the tournament's seed and the match itself, and its own
+random number generator (see rng.py), so:
+
+* any one match can be replayed exactly with replay(match),
+* the results are the same no matter how many workers you use, or in which
+  order the matches happen to finish.
+
+Run it from the command line to see a table:
+
+    python tournament.py [workers]
+"""
+import multiprocessing
+import random
+import sys
+from collections import namedtuple
+from itertools import combinations
+
+import engine
+import pyokemans as pk
+import registry
+import rng
+
+# One battle to fight. seed decides every random roll in it.
+Match = namedtuple("Match", ["species_a", "level_a", "species_b", "level_b", "repeat", "seed"])
+
+# How a match turned out. winner is 0 if species_a won, 1 if species_b won.
+Result = namedtuple("Result", ["match", "winner", "turns"])
+
+
+def species_classes(base=pk.Pyokemon):
+    """
+    Returns every species class derived from base: the ones in the registry
+    (see registry.py) in the order they're listed, then any you've written
+    yourself, in the order they were defined.
+    """
+    found = [cls for cls in registry.default.all_species() if issubclass(cls, base) and cls is not base]
+    for cls in _subclasses(base):
+        if cls not in found:
+            found.append(cls)
+    return found
+
+
+def _subclasses(base):
+    found = []
+    for cls in base.__subclasses__():
+        found.append(cls)
+        found.extend(_subclasses(cls))
+    return found
+
+
+def match_seed(seed, species_a, level_a, species_b, level_b, repeat):
+    """
+    Works out the seed for one match from the tournament seed and the match
+    itself. Python's own hash() of a string changes every time Python starts,
+    so rng.derive uses a real hash function, which always gives the same answer.
+    """
+    return rng.derive(seed, species_a.__name__, level_a, species_b.__name__, level_b, repeat)
+
+
+def schedule(species=None, levels=(5,), repeats=1, seed=0):
+    """Generates every Match in the tournament."""
+    if species is None:
+        species = species_classes()
+    for species_a, species_b in combinations(species, 2):
+        for level_a in levels:
+            for level_b in levels:
+                for repeat in range(repeats):
+                    yield Match(species_a, level_a, species_b, level_b, repeat,
+                                match_seed(seed, species_a, level_a, species_b, level_b, repeat))
+
+
+def _battle(match):
+    a = match.species_a(match.level_a)
+    b = match.species_b(match.level_b)
+    return a, b, engine.battle(a, b, rng=random.Random(match.seed))
+
+
+def replay(match):
+    """Fights a match and returns its list of engine.Rounds."""
+    return _battle(match)[2]
+
+
+def fight(match):
+    """Fights a match and returns a Result."""
+    a, b, rounds = _battle(match)
+    winner = 0 if rounds[-1].fainter is b else 1
+    return Result(match, winner, len(rounds))
+
+
+class Table(object):
+    """Adds up wins, losses and turns per species as results come in."""
+    def __init__(self):
+        self.wins = {}
+        self.losses = {}
+        self.turns = {}
+        self.battles = 0
+
+    def add(self, result):
+        match = result.match
+        sides = (match.species_a.__name__, match.species_b.__name__)
+        winner, loser = sides[result.winner], sides[1 - result.winner]
+        for name in sides:
+            self.turns[name] = self.turns.get(name, 0) + result.turns
+        self.wins[winner] = self.wins.get(winner, 0) + 1
+        self.losses[loser] = self.losses.get(loser, 0) + 1
+        self.battles += 1
+
+    def rows(self):
+        """Returns (species, wins, losses, average turns) per species, best first."""
+        names = set(self.wins) | set(self.losses)
+        rows = []
+        for name in names:
+            wins, losses = self.wins.get(name, 0), self.losses.get(name, 0)
+            rows.append((name, wins, losses, self.turns[name] / (wins + losses)))
+        return sorted(rows, key=lambda row: (-row[1], row[0]))
+
+    def __str__(self):
+        lines = ["{:<12} {:>8} {:>8} {:>10}".format("Species", "Wins", "Losses", "Avg turns")]
+        for name, wins, losses, turns in self.rows():
+            lines.append("{:<12} {:>8} {:>8} {:>10.2f}".format(name, wins, losses, turns))
+        return "\n".join(lines)
+
+
+def run(species=None, levels=(5,), repeats=1, seed=0, workers=None, chunksize=64):
+    """
+    Runs a whole tournament and returns its Table.
+
+    :param species: The species classes to enter. Defaults to all of them.
+    :param levels: The levels each species fights at.
+    :param repeats: How many times each (species, level) pairing fights.
+    :param seed: The tournament seed. Same seed, same results.
+    :param workers: How many processes to use. Defaults to one per CPU; 1 means no pool at all.
+    """
+    table = Table()
+    matches = schedule(species, levels, repeats, seed)
+    if workers == 1:
+        for match in matches:
+            table.add(fight(match))
+        return table
+    with multiprocessing.Pool(workers) as pool:
+        # imap_unordered hands us results as soon as they're done, so we
+        # don't have to keep them all in memory at once.
+        for result in pool.imap_unordered(fight, matches, chunksize):
+            table.add(result)
+    return table
+
+
+if __name__ == '__main__':
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else None
+    print(run(levels=(2, 5, 10, 20), repeats=50, workers=workers))
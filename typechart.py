@@ -0,0 +1,203 @@
+"""
+A compiled version of the pyokemon type chart.
+
+pyokemans.pktypes is a dictionary of dictionaries: pktypes["Fire"]["Grass"]
+is 2. That's a nice way to write the chart down, but looking things up by
+name on every single attack means hashing strings over and over again.
+
+Here we give every type a small integer ID, and lay the whole chart out in
+one flat list so an attack can find its multiplier with a bit of arithmetic
+instead. The same-type bonus is folded in ahead of time, too.
+
+Because the notebook encourages adding your own types, the chart keeps
+track of whether anyone has changed it since it was last compiled, and
+recompiles itself when they have.
+
+A type the chart doesn't mention is neither strong nor weak against
+anything, just like pktypes[move].get(defender, 1) always said. You can
+check that (and everything else in here) with python -m doctest typechart.py:
+
+    >>> import pyokemans as pk
+    >>> table = pk.type_table()
+    >>> mew = pk.Pikachu(5)
+    >>> mew._pktype = "Psychic"
+    >>> table = pk.type_table()
+    >>> fire, grass = type_id("Fire"), type_id("Grass")
+    >>> table.multiplier(fire, mew.type_id, mew.type_id)
+    1
+    >>> table.multiplier(fire, mew.type_id, grass), table.multiplier(fire, fire, mew.type_id)
+    (2, 1.33)
+"""
+
+# Type IDs are handed out the first time we see a type name, and never
+# change after that, even if the chart is replaced or a type is deleted.
+# That way a Move made before someone edited the chart still has the right ID.
+_ids = {}
+_names = []
+
+
+def type_id(name):
+    """Returns the integer ID for the type called name, assigning one if needed."""
+    try:
+        return _ids[name]
+    except KeyError:
+        _ids[name] = len(_names)
+        _names.append(name)
+        return _ids[name]
+
+
+def type_name(tid):
+    """Returns the name of the type with ID tid."""
+    return _names[tid]
+
+
+class TypeTable(object):
+    """
+    The compiled chart. For a chart with n types:
+
+    * effectiveness[move * n + defender] is the plain multiplier from the chart,
+    * multipliers[(move * n + attacker) * n + defender] also has the same-type
+      bonus added, and is what goes into the damage formula.
+
+    :param chart: A dict of dicts, shaped like pyokemans.pktypes.
+    :param stab: The same-type attack bonus.
+    """
+    def __init__(self, chart, stab=0.33):
+        for name in chart:
+            type_id(name)
+            for defender in chart[name]:
+                type_id(defender)
+        self.size = n = len(_names)
+        self.effectiveness = [1] * (n * n)
+        for name, row in chart.items():
+            m = type_id(name)
+            for defender, value in row.items():
+                self.effectiveness[m * n + type_id(defender)] = value
+
+        self.multipliers = []
+        for m in range(n):
+            for a in range(n):
+                for d in range(n):
+                    value = self.effectiveness[m * n + d]
+                    if m == a:
+                        value += stab
+                    self.multipliers.append(value)
+
+    def multiplier(self, move, attacker, defender):
+        """The damage multiplier for IDs (move, attacker, defender), including the same-type bonus."""
+        return self.multipliers[(move * self.size + attacker) * self.size + defender]
+
+
+class _Row(dict):
+    """One row of a TypeChart. Tells the chart whenever it's changed."""
+    def __init__(self, chart, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._chart = chart
+
+    def _changed(self):
+        self._chart._version += 1
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self._changed()
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._changed()
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def __reduce__(self):
+        return (dict, (dict(self),))
+
+    def update(self, *args, **kwargs):
+        super().update(*args, **kwargs)
+        self._changed()
+
+    def setdefault(self, key, default=None):
+        value = super().setdefault(key, default)
+        self._changed()
+        return value
+
+    def pop(self, *args):
+        value = super().pop(*args)
+        self._changed()
+        return value
+
+    def popitem(self):
+        item = super().popitem()
+        self._changed()
+        return item
+
+    def clear(self):
+        super().clear()
+        self._changed()
+
+
+class TypeChart(dict):
+    """
+    A dictionary of type effectiveness that works exactly like a normal
+    dict of dicts, but remembers whether it has been changed so that
+    table() can hand back a compiled TypeTable without recompiling every time.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        self._version = 0
+        self._table = None
+        self._table_key = None
+        self.update(*args, **kwargs)
+
+    def _row(self, value):
+        return _Row(self, value)
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, self._row(value))
+        self._version += 1
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._version += 1
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def __reduce__(self):
+        # Pickle as a fresh chart, so the rows get reattached when unpickled.
+        return (TypeChart, ({key: dict(row) for key, row in self.items()},))
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = {} if default is None else default
+        return self[key]
+
+    def pop(self, *args):
+        value = super().pop(*args)
+        self._version += 1
+        return value
+
+    def popitem(self):
+        item = super().popitem()
+        self._version += 1
+        return item
+
+    def clear(self):
+        super().clear()
+        self._version += 1
+
+    def table(self, stab=0.33):
+        """Returns the compiled TypeTable for this chart, recompiling it if the chart has changed."""
+        # type_id() can hand out new IDs without touching the chart -- for a
+        # pyokemon whose type isn't in it, say -- and then the old table's
+        # rows are too short. So the number of IDs is part of the key too.
+        key = (self._version, stab, len(_names))
+        if self._table_key != key:
+            self._table = TypeTable(self, stab=stab)
+            self._table_key = key
+        return self._table